@@ -0,0 +1,89 @@
+from django.db.models import (Case, Count, DateTimeField, F, Max, OuterRef,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.timezone import now
+
+from .models import Application, JobPost
+
+BATCH_SIZE = 1000
+
+
+def _applications():
+    return Application.objects.filter(
+        job_post=OuterRef('pk')).order_by().values('job_post')
+
+
+def actual_count():
+    return Coalesce(Subquery(
+        _applications().annotate(count=Count('id')).values('count')), 0)
+
+
+def actual_last_application_at():
+    return Subquery(
+        _applications().annotate(latest=Max('application_date'))
+        .values('latest'))
+
+
+# Both updates are a single UPDATE computed by the database from the row
+# as it is then, so concurrent applications to the same post cannot lose
+# a count. They run in the transaction of the insert or delete, and also
+# move updated_at for the conditional GET versions.
+
+def application_added(application):
+    applications_added({application.job_post_id: application.application_date})
+
+
+def applications_added(added):
+    """
+    Count one new application for each job post in ``added``, a dict of job
+    post id to the application's date, in a single UPDATE.
+    """
+    if len(added) == 1:
+        [added_at] = map(Value, added.values())
+    else:
+        added_at = Case(*[When(pk=pk, then=Value(at))
+                          for pk, at in added.items()],
+                        output_field=DateTimeField())
+    JobPost.objects.filter(pk__in=added).update(
+        application_count=F('application_count') + 1,
+        last_application_at=Greatest(
+            Coalesce('last_application_at', added_at), added_at),
+        updated_at=now())
+
+
+def application_removed(application):
+    JobPost.objects.filter(pk=application.job_post_id).update(
+        application_count=Greatest(F('application_count') - 1, 0),
+        last_application_at=actual_last_application_at(),
+        updated_at=now())
+
+
+def repair_application_counts(batch_size=BATCH_SIZE):
+    """
+    Recompute application_count and last_application_at of every job post
+    from its applications, in batches of ``batch_size`` posts, and fix the
+    ones that drifted, e.g. after applications were bulk created. Returns
+    the number of job posts fixed.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        batch = list(JobPost.objects.filter(id__gt=last_id).order_by(
+            'id').annotate(
+            actual_count=actual_count(),
+            actual_last_application_at=actual_last_application_at(),
+        ).values('id', 'application_count', 'last_application_at',
+                 'actual_count', 'actual_last_application_at')[:batch_size])
+        if not batch:
+            return fixed
+        last_id = batch[-1]['id']
+        drifted = [
+            row['id'] for row in batch
+            if row['application_count'] != row['actual_count']
+            or row['last_application_at']
+            != row['actual_last_application_at']]
+        if drifted:
+            fixed += JobPost.objects.filter(id__in=drifted).update(
+                application_count=actual_count(),
+                last_application_at=actual_last_application_at(),
+                updated_at=now())
@@ -0,0 +1,141 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.utils.timezone import now
+
+from . import application_counts
+from .models import Application, JobPost, JobSeekerCv
+
+# Job posts that one request may apply to at once.
+MAX_BATCH_SIZE = 100
+
+# Results of apply_many() per job post.
+APPLIED = 'applied'
+ALREADY_APPLIED = 'already_applied'
+CLOSED = 'closed'
+NOT_FOUND = 'not_found'
+
+
+def _insert(user, job_post_id, applied_at):
+    """
+    Insert the application in one statement, which also checks that the job
+    post exists and picks the user's CV. The unique constraint on user and
+    job post makes it a no-op when the user has applied already, also when
+    the other application is being inserted at the same moment. Returns
+    the ``(id, job_seeker_cv_id)`` of the new row, or None.
+    """
+    quote = connection.ops.quote_name
+
+    def columns(*names):
+        return ', '.join(quote(Application._meta.get_field(name).column)
+                         for name in names)
+
+    stored_at = connection.ops.adapt_datetimefield_value(applied_at)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO %s (%s) '
+            'SELECT %%s, job_post.id, cv.id, %%s, %%s '
+            'FROM %s job_post, %s cv '
+            'WHERE job_post.id = %%s AND cv.profile_id = %%s '
+            'ORDER BY cv.id LIMIT 1 '
+            'ON CONFLICT (%s) DO NOTHING '
+            'RETURNING id, %s' % (
+                quote(Application._meta.db_table),
+                columns('profile_id', 'job_post', 'job_seeker_cv',
+                        'application_date', 'updated_at'),
+                quote(JobPost._meta.db_table),
+                quote(JobSeekerCv._meta.db_table),
+                columns('profile_id', 'job_post'), columns('job_seeker_cv')),
+            [user.pk, stored_at, stored_at, job_post_id, user.pk])
+        return cursor.fetchone()
+
+
+def apply(user, job_post_id):
+    """
+    Apply ``user`` to the job post with their CV, creating an empty CV
+    first if they have none. Returns True if the application was created,
+    False if it existed already. Raises JobPost.DoesNotExist.
+    """
+    try:
+        job_post_id = int(job_post_id)
+    except (TypeError, ValueError):
+        raise JobPost.DoesNotExist
+    applied_at = now()
+    with transaction.atomic():
+        row = _insert(user, job_post_id, applied_at)
+        if row is None:
+            # Nothing inserted, which is rare enough to look up why.
+            if not JobPost.objects.filter(pk=job_post_id).exists():
+                raise JobPost.DoesNotExist
+            if Application.objects.filter(
+                    profile_id=user, job_post_id=job_post_id).exists():
+                return False
+            JobSeekerCv.objects.get_or_create(profile=user, defaults={
+                'email': user.email, 'mobile_number': user.mobile_number})
+            row = _insert(user, job_post_id, applied_at)
+            if row is None:
+                return False
+        application_id, cv_id = row
+        # The row was not saved through the ORM, so send its signal here:
+        # the job post counters are updated in this transaction.
+        post_save.send(
+            sender=Application, created=True, raw=False,
+            using=connection.alias, update_fields=None,
+            instance=Application(
+                id=application_id, profile_id=user, job_post_id=job_post_id,
+                job_seeker_cv_id=cv_id, application_date=applied_at,
+                updated_at=applied_at))
+    return True
+
+
+def _apply_many(user, job_post_ids):
+    results = dict.fromkeys(job_post_ids, NOT_FOUND)
+    today = now().date()
+    open_ids = set()
+    for pk, is_published, expiration_date in JobPost.objects.filter(
+            pk__in=job_post_ids).values_list(
+            'pk', 'is_published', 'expiration_date'):
+        if is_published and expiration_date >= today:
+            open_ids.add(pk)
+        else:
+            results[pk] = CLOSED
+    applied = set(Application.objects.filter(
+        profile_id=user, job_post_id__in=open_ids).values_list(
+        'job_post_id', flat=True))
+    results.update(dict.fromkeys(applied, ALREADY_APPLIED))
+    new_ids = [pk for pk in job_post_ids
+               if pk in open_ids and pk not in applied]
+    if not new_ids:
+        return results
+
+    cv = JobSeekerCv.objects.filter(profile=user).order_by('pk').first()
+    if cv is None:
+        cv = JobSeekerCv.objects.create(
+            profile=user, email=user.email, mobile_number=user.mobile_number)
+    # bulk_create() sends no post_save, the counters are updated at once.
+    applications = Application.objects.bulk_create([
+        Application(profile_id=user, job_post_id=pk, job_seeker_cv=cv)
+        for pk in new_ids])
+    application_counts.applications_added({
+        application.job_post_id: application.application_date
+        for application in applications})
+    results.update(dict.fromkeys(new_ids, APPLIED))
+    return results
+
+
+def apply_many(user, job_post_ids):
+    """
+    Apply ``user`` to each of the job posts, with a fixed number of queries
+    however many there are. Only published job posts that have not expired
+    are applied to. Returns a dict of job post id to APPLIED,
+    ALREADY_APPLIED, CLOSED or NOT_FOUND, in the order of ``job_post_ids``.
+    """
+    job_post_ids = list(dict.fromkeys(job_post_ids))
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _apply_many(user, job_post_ids)
+        except IntegrityError:
+            # An application inserted since the lookup, by a concurrent
+            # request; the second attempt finds it applied.
+            if attempt:
+                raise
@@ -0,0 +1,107 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from . import facets, feed, matching
+from .models import (Application, ArchivedApplication, ArchivedJobPost,
+                     JobPost)
+
+BATCH_SIZE = 500
+
+JOB_POST_FIELDS = [
+    'job_post_id', 'job_post_title', 'company_name', 'location',
+    'employment_type', 'job_description', 'phone_number', 'expiration_date',
+    'is_published', 'updated_at',
+]
+
+APPLICATION_FIELDS = [
+    'id', 'profile_id_id', 'job_post_id', 'job_seeker_cv_id',
+    'application_date',
+]
+
+# Set while archive_batch() deletes the posts it copied. The delete
+# signals skip their per row work then (see signals.py); the caches are
+# invalidated once per sweep instead.
+_archiving = threading.local()
+
+
+def is_archiving():
+    return getattr(_archiving, 'active', False)
+
+
+def archive_batch(batch_size=BATCH_SIZE):
+    """
+    Move up to ``batch_size`` job posts that expired more than
+    ARCHIVE_AFTER_DAYS ago, with their applications, into the archive
+    tables. One short transaction, so a batch only holds its own rows
+    locked; posts another sweeper has locked are skipped. Returns the
+    number of posts moved.
+    """
+    cutoff = now().date() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    with transaction.atomic():
+        job_posts = list(JobPost.objects.select_for_update(
+            skip_locked=True).filter(
+            expiration_date__lt=cutoff,
+        ).order_by('expiration_date', 'id').values('id', *JOB_POST_FIELDS)[
+            :batch_size])
+        if not job_posts:
+            return 0
+        ids = [job_post['id'] for job_post in job_posts]
+        ArchivedJobPost.objects.bulk_create(
+            [ArchivedJobPost(**job_post) for job_post in job_posts])
+        ArchivedApplication.objects.bulk_create([
+            ArchivedApplication(**application)
+            for application in Application.objects.filter(
+                job_post__in=ids).values(*APPLICATION_FIELDS)
+        ], batch_size=1000)
+
+        _archiving.active = True
+        try:
+            # Cascades to the applications, search terms and match scores.
+            JobPost.objects.filter(id__in=ids).delete()
+        finally:
+            _archiving.active = False
+        facets.count_job_posts(removed=job_posts)
+    return len(ids)
+
+
+def purge_batch(batch_size=BATCH_SIZE):
+    """
+    Delete up to ``batch_size`` archived job posts, with their
+    applications, that were archived more than ARCHIVE_RETENTION_DAYS ago.
+    Returns the number of posts deleted.
+    """
+    if not settings.ARCHIVE_RETENTION_DAYS:
+        return 0
+    cutoff = now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+    ids = list(ArchivedJobPost.objects.filter(
+        archived_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+    ArchivedJobPost.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def sweep(batch_size=BATCH_SIZE, pause=0):
+    """
+    Archive and purge in batches until nothing is left, sleeping ``pause``
+    seconds between batches to leave room for other writers. Returns
+    ``(archived, purged)`` post counts.
+    """
+    totals = []
+    for step in (archive_batch, purge_batch):
+        total = 0
+        while True:
+            count = step(batch_size)
+            total += count
+            if count < batch_size:
+                break
+            time.sleep(pause)
+        totals.append(total)
+    if totals[0]:
+        facets.prune()
+        feed.job_posts_changed()
+        matching.job_posts_changed()
+    return tuple(totals)
@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StaticFilesApplication:
+    """
+    Serve the static files in front of the Django ASGI application, with
+    WhiteNoise's file index and headers. WhiteNoiseMiddleware is sync only,
+    and one sync middleware makes Django run every request, async views
+    included, in a thread. With ASYNC_READ_VIEWS it is left out of
+    MIDDLEWARE and asgi.py wraps the application in this instead.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            static_file = self.find_file(scope['path'])
+            if static_file is not None:
+                return await self.serve(static_file, scope, send)
+        return await self.application(scope, receive, send)
+
+    def find_file(self, path):
+        if self.whitenoise.autorefresh:
+            # Looks on disk on every request, DEBUG only.
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+    async def serve(self, static_file, scope, send):
+        # WhiteNoise reads the request headers the way WSGI names them.
+        request_headers = {
+            'HTTP_' + name.decode('latin-1').upper().replace('-', '_'):
+                value.decode('latin-1')
+            for name, value in scope['headers']}
+        response = static_file.get_response(scope['method'], request_headers)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin-1'),
+                         value.encode('latin-1'))
+                        for name, value in response.headers],
+        })
+        if response.file is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        # File reads go to the thread pool, not the event loop.
+        read = sync_to_async(response.file.read, thread_sensitive=False)
+        try:
+            while True:
+                chunk = await read(CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': more})
+                if not more:
+                    break
+        finally:
+            response.file.close()
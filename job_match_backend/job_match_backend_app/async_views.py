@@ -0,0 +1,187 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils.timezone import now
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import feed
+from .authentication import CachedJWTAuthentication
+from .conditional import (conditional_get, employer_job_posts_version,
+                          job_seeker_applications_version,
+                          job_seeker_cv_version)
+from .fast_serializers import values_serializer
+from .models import Application, JobPost, JobSeekerCv
+from .pagination import KeysetPagination
+from .search import search_job_posts
+from .serializers import (ApplicationsSerializer, AvailableJobPostsSerializer,
+                          JobPostSerializer, JobPostSummarySerializer,
+                          JobSeekerCVSerializer)
+
+# Async versions of the read endpoints in views.py, served instead of them
+# when ASYNC_READ_VIEWS is set (see urls.py) and the app runs under an ASGI
+# server. They return the same responses. Rows are fetched with the async
+# ORM and serialized in the event loop, so a serializer that would run a
+# query fails loudly instead of blocking it.
+
+authenticator = CachedJWTAuthentication()
+renderer = JSONRenderer()
+
+
+def api_view(view):
+    """
+    What DRF's @api_view does for the sync GET views: authenticate the JWT
+    and turn API exceptions (bad token, bad cursor) into JSON responses.
+    """
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            result = await authenticator.aauthenticate(request)
+            request.user = result[0] if result else AnonymousUser()
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail
+            if not isinstance(data, (list, dict)):
+                data = {'detail': data}
+            response = render(data, status=exc.status_code)
+            if exc.status_code == 401:
+                response.headers['WWW-Authenticate'] = (
+                    authenticator.authenticate_header(request))
+            return response
+    return inner
+
+
+def render(data, status=200):
+    """Render like a DRF Response with the default JSON renderer."""
+    return HttpResponse(renderer.render(data), status=status,
+                        content_type='application/json')
+
+
+def render_list(data):
+    """Render like the JsonResponse of the unpaginated sync views."""
+    return JsonResponse(data, safe=False,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+@conditional_get(employer_job_posts_version)
+async def retrieveEmployerJobPosts(request):
+    if not (request.user.is_authenticated and request.user.is_ag):
+        return JsonResponse(
+            {"Error": "You are not logged in or not authorized"}, status=401)
+
+    job_posts = JobPost.objects.filter(job_post=request.user)
+    if request.GET.get('applicants') == 'count':
+        serializer_class = JobPostSummarySerializer
+    else:
+        job_posts = job_posts.with_applicants()
+        serializer_class = JobPostSerializer
+
+    paginator = KeysetPagination(ordering=('expiration_date', 'id'))
+    drf_request = Request(request)
+    if not paginator.is_disabled(drf_request):
+        page = await paginator.apaginate_queryset(job_posts, drf_request)
+        data = serializer_class(page, many=True).data
+        return render(paginator.get_paginated_response(data).data)
+
+    job_posts = [job_post async for job_post in job_posts]
+    return render_list(serializer_class(job_posts, many=True).data)
+
+
+@api_view
+async def retrieveAvailableJobPosts(request):
+    if not (request.user.is_authenticated and not request.user.is_ag):
+        return JsonResponse(
+            {"Error": "You are not logged in or not authorized"}, status=401)
+
+    location = request.GET.get('location', None)
+    query = request.GET.get('q', None)
+
+    applied_job_posts = Application.objects.filter(
+        profile_id=request.user).values_list('job_post_id', flat=True)
+    job_posts = JobPost.objects.filter(
+        is_published=True,
+        expiration_date__gte=now()).exclude(id__in=applied_job_posts)
+
+    if location:
+        job_posts = job_posts.filter(location__icontains=location)
+
+    if query:
+        # Looks up the document frequencies of the query terms.
+        job_posts = await sync_to_async(search_job_posts)(job_posts, query)
+        paginator = KeysetPagination(ordering=('-search_rank', 'id'))
+    else:
+        paginator = KeysetPagination(ordering=('expiration_date', 'id'))
+
+    serializer = values_serializer(AvailableJobPostsSerializer)
+    drf_request = Request(request)
+    if not paginator.is_disabled(drf_request):
+        if not query and feed.enabled():
+            # Pages of the feed are cut from the cached list.
+            applied = {job_post_id async for job_post_id in applied_job_posts}
+            rows = await sync_to_async(feed.active_job_posts)(location)
+            paginator.paginate_rows(
+                rows, job_posts, drf_request, exclude_ids=applied)
+            return render(
+                paginator.get_paginated_response(paginator.page).data)
+        page = await paginator.apaginate_queryset(
+            serializer.values(job_posts, *paginator.fields), drf_request)
+        data = serializer.serialize(page)
+        return render(paginator.get_paginated_response(data).data)
+
+    if query:
+        data = serializer.serialize(
+            [row async for row in serializer.values(job_posts)])
+    else:
+        applied = {job_post_id async for job_post_id in applied_job_posts}
+        job_posts = await sync_to_async(feed.active_job_posts)(location)
+        data = [job_post for job_post in job_posts
+                if job_post['id'] not in applied]
+    return render_list(data)
+
+
+@api_view
+@conditional_get(job_seeker_applications_version)
+async def retrieveApplications(request):
+    if not (request.user.is_authenticated and not request.user.is_ag):
+        return render(
+            {"Error": "You are not logged in or not authorized"}, status=401)
+
+    applications = Application.objects.filter(profile_id=request.user)
+    serializer = values_serializer(ApplicationsSerializer)
+
+    paginator = KeysetPagination(ordering=('-application_date', '-id'))
+    drf_request = Request(request)
+    if not paginator.is_disabled(drf_request):
+        page = await paginator.apaginate_queryset(
+            serializer.values(applications, *paginator.fields), drf_request)
+        data = serializer.serialize(page)
+        return render(paginator.get_paginated_response(data).data)
+
+    return render(serializer.serialize(
+        [row async for row in serializer.values(applications)]))
+
+
+@api_view
+@conditional_get(job_seeker_cv_version)
+async def getJobSeekerCv(request):
+    if not (request.user.is_authenticated and not request.user.is_ag):
+        return JsonResponse({"Error": "You are not logged in"}, status=401)
+
+    cvs = JobSeekerCv.objects.prefetch_related(
+        'work_experiences', 'educations')
+    try:
+        cv = await cvs.aget(profile=request.user)
+    except JobSeekerCv.DoesNotExist:
+        await JobSeekerCv.objects.acreate(
+            profile=request.user,
+            email=request.user.email,
+            mobile_number=request.user.mobile_number
+        )
+        cv = await cvs.aget(profile=request.user)
+    return render(JobSeekerCVSerializer(cv).data)
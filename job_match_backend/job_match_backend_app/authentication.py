@@ -0,0 +1,103 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """
+    A bounded, thread safe LRU of users, each kept for USER_CACHE_TIMEOUT
+    seconds at most. Writes to a user evict it in this process (see
+    signals.py); other processes see the change when their entry expires.
+    """
+
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._users[user_id] = (
+                time.monotonic() + settings.USER_CACHE_TIMEOUT, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > settings.USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+users = UserCache()
+
+
+def forget_user(user_id):
+    users.delete(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the user query on every request: the user
+    a token belongs to is loaded once and then served from ``users``.
+
+    Only active users are cached, and every request gets its own copy, so
+    views cannot leak state into each other through request.user. With
+    CHECK_REVOKE_TOKEN (which compares the password hash) or a timeout of
+    0 every request loads the user as before.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if (user_id is None or not settings.USER_CACHE_TIMEOUT
+                or api_settings.CHECK_REVOKE_TOKEN):
+            return super().get_user(validated_token)
+
+        user = users.get(str(user_id))
+        if user is None:
+            user = super().get_user(validated_token)
+            users.set(str(user_id), user)
+        return copy.copy(user)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views, on a plain Django request. Only a
+        cache miss leaves the event loop to load the user.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = None
+        if settings.USER_CACHE_TIMEOUT and not api_settings.CHECK_REVOKE_TOKEN:
+            user = users.get(str(user_id))
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+        else:
+            user = copy.copy(user)
+        return user, validated_token
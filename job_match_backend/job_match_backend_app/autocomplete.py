@@ -0,0 +1,160 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from .models import JobPost
+from .search import fold
+
+# Typeahead field -> JobPost field.
+FIELDS = {
+    'title': 'job_post_title',
+    'location': 'location',
+}
+
+VERSION_CACHE_KEY = 'autocomplete:version'
+MAX_LIMIT = 50
+
+
+def normalize(value):
+    """The spelling shown for a value: trimmed, single spaces."""
+    return ' '.join(value.split())
+
+
+class PrefixIndex:
+    """
+    The distinct values of one field as a sorted array of folded keys, so
+    that a prefix lookup is one bisect and a slice. Spellings that fold to
+    the same key ("Goteborg", "göteborg ", "Göteborg") are one entry,
+    shown in its most common spelling, with the number of posts.
+    """
+
+    def __init__(self, values=()):
+        self.spellings = defaultdict(Counter)
+        for value in values:
+            key = fold(normalize(value))
+            if key:
+                self.spellings[key][normalize(value)] += 1
+        self.keys = sorted(self.spellings)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, value, count=1):
+        """Count ``count`` more (or, if negative, fewer) posts with value."""
+        key = fold(normalize(value))
+        if not key:
+            return
+        if key not in self.spellings:
+            insort(self.keys, key)
+        spellings = self.spellings[key]
+        spellings[normalize(value)] += count
+        if spellings[normalize(value)] <= 0:
+            del spellings[normalize(value)]
+        if not spellings:
+            del self.spellings[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def lookup(self, prefix, limit=10):
+        """Up to ``limit`` values starting with ``prefix``, in order."""
+        prefix = fold(normalize(prefix))
+        start = bisect_left(self.keys, prefix)
+        results = []
+        for key in self.keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            spellings = self.spellings[key]
+            results.append({
+                'value': spellings.most_common(1)[0][0],
+                'count': sum(spellings.values()),
+            })
+        return results
+
+
+# The indexes of this process, rebuilt when another process changed the
+# job posts, when the date changes (posts expire) and at least every
+# AUTOCOMPLETE_MAX_AGE seconds. Writes made by this process are applied
+# to them in place. The shared version is read at most every
+# AUTOCOMPLETE_CHECK_INTERVAL seconds, so that a lookup in between costs
+# no query.
+_state = {}
+_lock = threading.Lock()
+
+
+def is_active(values):
+    return (values['is_published']
+            and values['expiration_date'] >= now().date())
+
+
+def _build():
+    indexes = {field: PrefixIndex() for field in FIELDS}
+    rows = JobPost.objects.filter(
+        is_published=True, expiration_date__gte=now().date(),
+    ).values_list(*FIELDS.values())
+    counts = Counter(rows.iterator(chunk_size=5000))
+    for row, count in counts.items():
+        for index, value in zip(indexes.values(), row):
+            index.add(value, count)
+    return indexes
+
+
+def _current_key():
+    version = cache.get_or_set(
+        VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+    return version, now().date()
+
+
+def indexes():
+    """The prefix index of every field in FIELDS, built if out of date."""
+    with _lock:
+        checked = _state.get('checked_at')
+        if (checked is not None
+                and checked + settings.AUTOCOMPLETE_CHECK_INTERVAL
+                > time.monotonic()
+                and _state['key'][1] == now().date()
+                and _state['built_at'] + settings.AUTOCOMPLETE_MAX_AGE
+                >= time.monotonic()):
+            return _state['indexes']
+
+    key = _current_key()
+    with _lock:
+        if (_state.get('key') != key
+                or _state['built_at'] + settings.AUTOCOMPLETE_MAX_AGE
+                < time.monotonic()):
+            _state.update(key=key, indexes=_build(),
+                          built_at=time.monotonic())
+        _state['checked_at'] = time.monotonic()
+        return _state['indexes']
+
+
+def suggest(field, prefix, limit=10):
+    return indexes()[field].lookup(prefix, max(1, min(limit, MAX_LIMIT)))
+
+
+def job_post_changed(old=None, new=None):
+    """
+    Apply a committed write of one job post, given the values of its
+    fields before and after (None if it did not exist), to the indexes of
+    this process, and make the other processes rebuild theirs.
+    """
+    key = _current_key()
+    version = uuid.uuid4().hex
+    cache.set(VERSION_CACHE_KEY, version, None)
+    with _lock:
+        if _state.get('key') != key:
+            return
+        for values, count in ((old, -1), (new, 1)):
+            if values is not None and is_active(values):
+                for field, name in FIELDS.items():
+                    _state['indexes'][field].add(values[name], count)
+        _state['key'] = (version, key[1])
+
+
+def job_posts_changed():
+    """Rebuild the indexes of every process, e.g. after a bulk write."""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
@@ -3,3 +3,15 @@ EMPLOYMENT_TYPES = [
     ("Provanställning", "Provanställning"),
     ("Deltid", "Deltid"),
 ]
+
+EMAIL_STATUSES = [
+    ("pending", "Pending"),
+    ("sent", "Sent"),
+    ("failed", "Failed"),
+]
+
+MATCH_SCORE_UPDATE_KINDS = [
+    ("cv", "CV"),
+    ("job_post", "Job post"),
+    ("all", "All"),
+]
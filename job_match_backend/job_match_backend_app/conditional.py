@@ -0,0 +1,116 @@
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Application, JobPost, JobSeekerCv
+
+
+def conditional_get(version):
+    """
+    Answer a GET with 304 Not Modified, without running the view, when the
+    client already has the current representation.
+
+    ``version(request, *args, **kwargs)`` returns ``(token, last_modified)``
+    or None to skip the check. The token must change whenever the response
+    body would; it is hashed together with the user and the query string
+    (which carries the pagination cursor) into the ETag. ``last_modified``
+    may be None for lists, where a deleted row does not move the newest
+    timestamp. Works for sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async_version = sync_to_async(version)
+
+            @wraps(view)
+            async def ainner(request, *args, **kwargs):
+                current = None
+                if request.method in ('GET', 'HEAD'):
+                    current = await async_version(request, *args, **kwargs)
+                validators, response = not_modified(request, current)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return add_validators(response, validators)
+            return ainner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            current = None
+            if request.method in ('GET', 'HEAD'):
+                current = version(request, *args, **kwargs)
+            validators, response = not_modified(request, current)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return add_validators(response, validators)
+        return inner
+    return decorator
+
+
+def not_modified(request, current):
+    """
+    Return ``((etag, last_modified), response)`` for a version from
+    conditional_get, where response is the 304 if the client is current.
+    """
+    if current is None:
+        return None, None
+    token, modified = current
+    key = '%s|%s|%s' % (request.user.pk, request.get_full_path(), token)
+    etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+    last_modified = int(modified.timestamp()) if modified else None
+    return (etag, last_modified), get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, validators):
+    if validators and response.status_code in (200, 304):
+        etag, last_modified = validators
+        response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # Let the browser keep the body, but always revalidate it.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def is_job_seeker(user):
+    return user.is_authenticated and not user.is_ag
+
+
+def is_employer(user):
+    return user.is_authenticated and user.is_ag
+
+
+def job_seeker_cv_version(request):
+    if not is_job_seeker(request.user):
+        return None
+    cv = JobSeekerCv.objects.filter(profile=request.user).values_list(
+        'id', 'updated_at').first()
+    if cv is None:
+        return None
+    return cv, cv[1]
+
+
+def employer_job_posts_version(request):
+    # Application and CV writes touch the job posts they belong to, so the
+    # newest post timestamp covers the nested applicants too. The count
+    # covers deleted posts.
+    if not is_employer(request.user):
+        return None
+    posts = JobPost.objects.filter(job_post=request.user).aggregate(
+        count=Count('id'), updated_at=Max('updated_at'))
+    return (posts['count'], posts['updated_at']), None
+
+
+def job_seeker_applications_version(request):
+    if not is_job_seeker(request.user):
+        return None
+    applications = Application.objects.filter(
+        profile_id=request.user).aggregate(
+        count=Count('id'),
+        updated_at=Max('updated_at'),
+        job_post_updated_at=Max('job_post__updated_at'))
+    return tuple(applications.values()), None
@@ -0,0 +1,79 @@
+import threading
+
+from django.db import transaction
+
+from . import matching
+from .models import Education, WorkExperince
+
+ITEM_MODELS = {
+    'work_experiences': WorkExperince,
+    'educations': Education,
+}
+
+# The CV whose items save_cv() is writing in this thread. The item signals
+# skip it, the CV is touched and rescored once instead (see signals.py).
+_writing = threading.local()
+
+
+def writing_items_of(cv_id):
+    return getattr(_writing, 'cv_id', None) == cv_id
+
+
+def save_cv(cv, data):
+    """
+    Write a whole CV document in one transaction. ``data`` holds the CV
+    fields and, for each relation in ITEM_MODELS that is given, the full
+    list of its items: items with an id are updated, items without one
+    are created and the rest are deleted. The number of queries does not
+    depend on the number of items. The items of ``cv`` must be prefetched.
+    """
+    items = {relation: data.pop(relation) for relation in ITEM_MODELS
+             if relation in data}
+    with transaction.atomic():
+        for attr, value in data.items():
+            setattr(cv, attr, value)
+        # Moves updated_at and touches the job posts it applied to.
+        cv.save()
+        if not items:
+            return cv
+        _writing.cv_id = cv.pk
+        try:
+            for relation, rows in items.items():
+                sync_items(ITEM_MODELS[relation], cv,
+                           getattr(cv, relation).all(), rows)
+        finally:
+            _writing.cv_id = None
+        matching.queue_update('cv', cv.pk)
+    return cv
+
+
+def sync_items(model, cv, existing, rows):
+    """
+    Make the items of ``cv`` match ``rows`` with one delete, one
+    bulk_create and one bulk_update at most. Unchanged items are left
+    alone.
+    """
+    existing = {item.pk: item for item in existing}
+    created = []
+    changed = []
+    fields = set()
+    for row in rows:
+        row = dict(row)
+        item = existing.pop(row.pop('id', None), None)
+        if item is None:
+            created.append(model(job_seeker=cv, **row))
+            continue
+        updates = {field: value for field, value in row.items()
+                   if getattr(item, field) != value}
+        if updates:
+            for field, value in updates.items():
+                setattr(item, field, value)
+            changed.append(item)
+            fields.update(updates)
+
+    if existing:
+        model.objects.filter(pk__in=list(existing)).delete()
+    if created:
+        model.objects.bulk_create(created)
+    if changed:
+        model.objects.bulk_update(changed, sorted(fields))
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+from .models import Application, Education, WorkExperince
+
+CHUNK_SIZE = 2000
+
+# Export column -> Application lookup.
+APPLICATION_FIELDS = {
+    'application_id': 'id',
+    'application_date': 'application_date',
+    'job_post_id': 'job_post_id',
+    'job_post_title': 'job_post__job_post_title',
+    'first_name': 'profile_id__first_name',
+    'last_name': 'profile_id__last_name',
+    'email': 'job_seeker_cv__email',
+    'mobile_number': 'job_seeker_cv__mobile_number',
+}
+
+ITEM_FIELDS = {
+    'work_experiences': (WorkExperince, [
+        'occupation_title', 'company_name', 'years', 'description']),
+    'educations': (Education, [
+        'school_name', 'level', 'orientation', 'description', 'years']),
+}
+
+COLUMNS = [*APPLICATION_FIELDS, *ITEM_FIELDS]
+
+# Spreadsheets run a cell that starts with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def applicant_chunks(job_posts, chunk_size=None):
+    """
+    Yield the applicants of a JobPost queryset as lists of at most
+    ``chunk_size`` dicts, each with the CV items nested, ordered by job
+    post and application. Applications are read in keyset pages per job
+    post, which the job post index serves in order without sorting, and
+    items with one query per type and chunk. Memory use does not depend on
+    the number of applications.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    lookups = [*APPLICATION_FIELDS.values(), 'job_seeker_cv_id']
+    rows = []
+    for job_post_id in job_posts.order_by('pk').values_list('pk', flat=True):
+        last_id = 0
+        while True:
+            page = list(Application.objects.filter(
+                job_post_id=job_post_id, id__gt=last_id,
+            ).order_by('pk').values(*lookups)[:chunk_size - len(rows)])
+            if not page:
+                break
+            last_id = page[-1]['id']
+            rows.extend(page)
+            if len(rows) == chunk_size:
+                yield _applicants(rows)
+                rows = []
+    if rows:
+        yield _applicants(rows)
+
+
+def _applicants(rows):
+    cv_ids = {row['job_seeker_cv_id'] for row in rows}
+    items = {relation: _items_by_cv(model, fields, cv_ids)
+             for relation, (model, fields) in ITEM_FIELDS.items()}
+    applicants = []
+    for row in rows:
+        applicant = {column: row[lookup]
+                     for column, lookup in APPLICATION_FIELDS.items()}
+        applicant['application_date'] = (
+            applicant['application_date'].isoformat())
+        for relation in ITEM_FIELDS:
+            applicant[relation] = items[relation].get(
+                row['job_seeker_cv_id'], [])
+        applicants.append(applicant)
+    return applicants
+
+
+def _items_by_cv(model, fields, cv_ids):
+    items = defaultdict(list)
+    for item in model.objects.filter(job_seeker_id__in=cv_ids).order_by(
+            'id').values('job_seeker_id', *fields):
+        items[item.pop('job_seeker_id')].append(item)
+    return items
+
+
+def ndjson_lines(chunks):
+    """One JSON object per line, one string per chunk."""
+    for chunk in chunks:
+        yield ''.join(json.dumps(applicant, ensure_ascii=False) + '\n'
+                      for applicant in chunk)
+
+
+def csv_cell(value):
+    """Quote text a spreadsheet would otherwise run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(chunks):
+    """
+    A header row, then one row per applicant with the CV items as JSON
+    lists. One string per chunk. Cells that look like formulas get a
+    leading ``'``.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in chunks:
+        for applicant in chunk:
+            writer.writerow([
+                json.dumps(applicant[column], ensure_ascii=False)
+                if column in ITEM_FIELDS else csv_cell(applicant[column])
+                for column in COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
@@ -0,0 +1,111 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils.timezone import now
+
+from .choices import EMPLOYMENT_TYPES
+from .models import Application, JobPost, JobPostFacet
+
+KEY_FIELDS = ('location', 'employment_type', 'expiration_date')
+
+
+def facet_of(job_post):
+    """
+    The ``(location, employment_type, expiration_date)`` a job post counts
+    towards, None if it is not published. Takes a model instance or a dict
+    of its values.
+    """
+    values = job_post if isinstance(job_post, dict) else vars(job_post)
+    if not values['is_published']:
+        return None
+    return tuple(values[field] for field in KEY_FIELDS)
+
+
+def count_job_posts(added=(), removed=()):
+    """
+    Add the job posts in ``added`` to their facets and take the ones in
+    ``removed`` out; None entries are skipped. One statement per call, an
+    upsert that adds to the stored counts, so concurrent writers do not
+    lose each other's changes.
+    """
+    deltas = Counter()
+    for job_post in added:
+        if job_post is not None:
+            deltas[facet_of(job_post)] += 1
+    for job_post in removed:
+        if job_post is not None:
+            deltas[facet_of(job_post)] -= 1
+    rows = [(*key, delta) for key, delta in deltas.items()
+            if key is not None and delta]
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(JobPostFacet._meta.db_table)
+    columns = ', '.join(quote(field) for field in (*KEY_FIELDS, 'count'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO %s (%s) VALUES %s ON CONFLICT (%s) '
+            'DO UPDATE SET %s = %s.%s + excluded.%s' % (
+                table, columns, ', '.join(['(%s, %s, %s, %s)'] * len(rows)),
+                ', '.join(quote(field) for field in KEY_FIELDS),
+                quote('count'), table, quote('count'), quote('count')),
+            [value for row in rows for value in row])
+
+
+def prune():
+    """Delete the facets no job post counts towards any more."""
+    JobPostFacet.objects.filter(count__lte=0).delete()
+
+
+def rebuild_facets():
+    """Recount every facet from the job posts. Returns the number of rows."""
+    with transaction.atomic():
+        JobPostFacet.objects.all().delete()
+        facets = JobPostFacet.objects.bulk_create([
+            JobPostFacet(**row) for row in JobPost.objects.filter(
+                is_published=True,
+            ).values(*KEY_FIELDS).annotate(count=Count('id')).order_by()
+        ], batch_size=1000)
+    return len(facets)
+
+
+def feed_facets(location=None, user=None):
+    """
+    Count the posts of the job seeker feed per location and per employment
+    type, optionally filtered on location like the feed. Reads the facet
+    rows of the dates that have not expired yet. The posts ``user`` has
+    applied to are left out, as they are from the feed.
+    """
+    today = now().date()
+    facets = JobPostFacet.objects.filter(
+        expiration_date__gte=today, count__gt=0)
+    applied = Application.objects.filter(
+        profile_id=user, job_post__is_published=True,
+        job_post__expiration_date__gte=today)
+    if location:
+        facets = facets.filter(location__icontains=location)
+        applied = applied.filter(job_post__location__icontains=location)
+
+    locations = Counter()
+    employment_types = Counter()
+    for row in facets.values('location', 'employment_type').annotate(
+            total=Sum('count')).order_by():
+        locations[row['location']] += row['total']
+        employment_types[row['employment_type']] += row['total']
+    if user is not None:
+        for location, employment_type in applied.values_list(
+                'job_post__location', 'job_post__employment_type'):
+            locations[location] -= 1
+            employment_types[employment_type] -= 1
+
+    return {
+        'location': [
+            {'value': value, 'count': count}
+            for value, count in sorted(
+                locations.items(), key=lambda item: (-item[1], item[0]))
+            if count > 0],
+        'employment_type': [
+            {'value': value, 'count': max(employment_types[value], 0)}
+            for value, _ in EMPLOYMENT_TYPES],
+    }
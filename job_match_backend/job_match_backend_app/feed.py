@@ -0,0 +1,84 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from . import fast_serializers
+from .models import JobPost
+from .serializers import AvailableJobPostsSerializer
+
+VERSION_CACHE_KEY = 'feed:version'
+MAX_ENTRIES = 256
+
+# Serialized feeds of this process, {key: (expires_at, data)}. Kept in a
+# plain dict rather than a cache backend so that a hit does not have to
+# unpickle tens of thousands of posts.
+_entries = {}
+_lock = threading.Lock()
+
+# Hit and miss counts of this process, see cache_stats().
+stats = {'hits': 0, 'misses': 0}
+
+
+def job_posts_changed():
+    """Invalidate the cached feed in every process sharing the cache."""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def enabled():
+    return bool(settings.FEED_CACHE_TIMEOUT)
+
+
+def active_job_posts(location=None):
+    """
+    Return the serialized published, unexpired job posts (optionally
+    filtered on location) in feed order. The list is shared by all job
+    seekers and must not be modified; callers remove the posts a user has
+    already applied to.
+    """
+    if not enabled():
+        return _serialize(location)
+
+    # The date is part of the key, so posts that expire at midnight drop
+    # out of the feed without anyone having to invalidate it.
+    version = cache.get_or_set(
+        VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+    key = (version, now().date(), location or '')
+    entry = _entries.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        stats['hits'] += 1
+        return entry[1]
+
+    stats['misses'] += 1
+    data = _serialize(location)
+    with _lock:
+        for stale in [k for k in _entries if k[:2] != key[:2]]:
+            del _entries[stale]
+        while len(_entries) >= MAX_ENTRIES:
+            del _entries[next(iter(_entries))]
+        _entries[key] = (
+            time.monotonic() + settings.FEED_CACHE_TIMEOUT, data)
+    return data
+
+
+def _serialize(location):
+    job_posts = JobPost.objects.filter(
+        is_published=True,
+        expiration_date__gte=now()).order_by('expiration_date', 'id')
+    if location:
+        job_posts = job_posts.filter(location__icontains=location)
+    if fast_serializers.enabled('availableJobPosts'):
+        fast = fast_serializers.values_serializer(AvailableJobPostsSerializer)
+        return fast.serialize(fast.values(job_posts))
+    return AvailableJobPostsSerializer(job_posts, many=True).data
+
+
+def cache_stats():
+    lookups = stats['hits'] + stats['misses']
+    return {
+        **stats,
+        'hit_rate': round(stats['hits'] / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,78 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+MAX_KEY_LENGTH = 255
+
+# Seconds a key stays claimed by a request that is still running, longer
+# than any request takes. Should storing the response fail, retries are
+# refused for no longer than this.
+PENDING_TIMEOUT = 60
+
+
+def idempotent(view):
+    """
+    Let clients retry a POST safely with an ``Idempotency-Key`` header.
+
+    The first request with a key runs the view; its response is kept in
+    the cache for IDEMPOTENCY_KEY_TIMEOUT seconds and replayed, with an
+    ``Idempotent-Replayed`` header, for later requests of the same user
+    with the same key. A key reused for a different request is answered
+    with 422, and a retry while the first request still runs with 409.
+    Requests without the header run as usual. Put it below @api_view.
+    """
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"Error": "Idempotency-Key must be 1 to %s characters"
+                 % MAX_KEY_LENGTH}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = 'idempotency:%s:%s' % (
+            request.user.pk, hashlib.sha256(key.encode()).hexdigest())
+        fingerprint = hashlib.sha256(b'\n'.join([
+            request.method.encode(), request.get_full_path().encode(),
+            request.body])).hexdigest()
+        # Retries read the stored response. Otherwise add() claims the key,
+        # which only one of several concurrent requests manages.
+        stored = cache.get(cache_key)
+        if stored is None and cache.add(
+                cache_key, {'fingerprint': fingerprint}, PENDING_TIMEOUT):
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            # Server errors are not kept, the client may retry those.
+            if (isinstance(response, Response)
+                    and response.status_code < 500):
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, settings.IDEMPOTENCY_KEY_TIMEOUT)
+            else:
+                cache.delete(cache_key)
+            return response
+
+        if stored is None:
+            stored = cache.get(cache_key)
+        if stored is not None and stored['fingerprint'] != fingerprint:
+            return Response(
+                {"Error": "Idempotency-Key was used for another request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if stored is None or 'status' not in stored:
+            return Response(
+                {"Error": "A request with this Idempotency-Key is in "
+                          "progress"},
+                status=status.HTTP_409_CONFLICT)
+        return Response(stored['data'], status=stored['status'],
+                        headers={'Idempotent-Replayed': 'true'})
+    return inner
@@ -0,0 +1,128 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ValidationError
+
+from . import autocomplete, facets, feed, matching, search
+from .models import JobPost
+from .serializers import JobPostSerializer
+
+CHUNK_SIZE = 1000
+
+
+def read_csv(lines):
+    """One dict per CSV row, keyed by the header row."""
+    for row in csv.DictReader(lines):
+        # Empty cells count as missing, so optional fields get their
+        # default and required ones a "required" error.
+        yield {key: value for key, value in row.items()
+               if key is not None and value not in ('', None)}
+
+
+def read_ndjson(lines):
+    """One value per non-blank line of newline delimited JSON."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported by the serializer as not being an object.
+            yield line
+
+
+READERS = {
+    'text/csv': read_csv,
+    'application/x-ndjson': read_ndjson,
+    'application/jsonl': read_ndjson,
+}
+
+
+def reader_for(content_type):
+    """Return the row reader for a Content-Type header, None if unknown."""
+    return READERS.get(parse_header_parameters(content_type or '')[0])
+
+
+def read_rows(content_type, stream):
+    """
+    Rows from an uploaded byte ``stream``, decoded as they are read so
+    the upload never has to fit in memory.
+    """
+    return reader_for(content_type)(codecs.iterdecode(stream, 'utf-8-sig'))
+
+
+class UnreadableUpload(Exception):
+    """
+    Reading the upload failed at row ``row``. The ``created`` posts from
+    the rows before it were imported all the same; ``errors`` are the rows
+    among them that were skipped.
+    """
+
+    def __init__(self, error, row, created, errors):
+        super().__init__('Unreadable upload at row %s: %s' % (row, error))
+        self.row = row
+        self.created = created
+        self.errors = errors
+
+
+def import_job_posts(employer, rows, chunk_size=CHUNK_SIZE):
+    """
+    Create job posts for ``employer`` from ``rows`` of JobPostSerializer
+    input. Each chunk of rows is validated, then its valid rows are
+    inserted and indexed in one transaction. Invalid rows are skipped and
+    reported as ``{'row': number, 'errors': {...}}``, numbered from 1.
+
+    Returns ``(created, errors)``. Raises UnreadableUpload when the rows
+    cannot be read to the end, after importing the ones before.
+    """
+    # One serializer validates every row; building one per row would copy
+    # all its fields each time.
+    serializer = JobPostSerializer()
+    rows = enumerate(rows, 1)
+    created = 0
+    errors = []
+    read = 0
+    read_error = None
+    try:
+        while read_error is None:
+            chunk = []
+            try:
+                chunk.extend(islice(rows, chunk_size))
+            except (UnicodeDecodeError, csv.Error) as error:
+                read_error = error
+            if not chunk:
+                break
+            read = chunk[-1][0]
+            created += _import_chunk(employer, serializer, chunk, errors)
+    finally:
+        if created:
+            autocomplete.job_posts_changed()
+            feed.job_posts_changed()
+            matching.job_posts_changed()
+            # bulk_create skips the post_save signal that queues the posts
+            # one by one; a rebuild is one pass over the CVs for them all.
+            matching.queue_update('all')
+    if read_error is not None:
+        raise UnreadableUpload(read_error, read + 1, created, errors)
+    return created, errors
+
+
+def _import_chunk(employer, serializer, chunk, errors):
+    job_posts = []
+    for number, row in chunk:
+        try:
+            data = serializer.run_validation(row)
+        except ValidationError as error:
+            errors.append({'row': number, 'errors': error.detail})
+            continue
+        job_posts.append(JobPost(job_post=employer, **data))
+    with transaction.atomic():
+        # bulk_create skips the post_save signal, so do its work here.
+        JobPost.objects.bulk_create(job_posts)
+        search.index_job_posts(job_posts)
+        facets.count_job_posts(added=job_posts)
+    return len(job_posts)
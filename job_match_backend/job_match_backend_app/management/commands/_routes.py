@@ -0,0 +1,388 @@
+"""
+The per route driver of ``benchmark routes``: a request for every route
+in urls.py, sent with concurrent clients against a seeded data set.
+"""
+import os
+import random
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import URLResolver, get_resolver, resolve
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from job_match_backend_app import matching, metrics, seeding
+from job_match_backend_app.models import (Application, CustomUser, Education,
+                                          JobPost, WorkExperince)
+
+SCALES = {
+    '1k': {'employers': 10, 'job_seekers': 1000, 'job_posts': 1000,
+           'applications': 5000},
+    '100k': {'employers': 100, 'job_seekers': 20000, 'job_posts': 100000,
+             'applications': 200000},
+    '1m': {'employers': 1000, 'job_seekers': 100000, 'job_posts': 1000000,
+           'applications': 2000000},
+}
+
+PASSWORD = 'benchmark-password'
+METRICS_TOKEN = 'benchmark'
+
+JOB_POST = {
+    'job_post_title': 'Kock', 'company_name': 'Skärgårdens Kök',
+    'location': 'Lund', 'employment_type': 'Deltid',
+    'job_description': 'Matlagning', 'phone_number': '0701234567',
+    'expiration_date': '2099-01-01', 'is_published': True,
+}
+WORK_EXPERIENCE = {
+    'occupation_title': 'Kock', 'company_name': 'Skärgårdens Kök',
+    'years': '2', 'description': 'Matlagning',
+}
+EDUCATION = {
+    'school_name': 'Chalmers', 'level': 'Master', 'orientation': 'Data',
+    'description': 'Datateknik', 'years': '5',
+}
+
+
+def email_prefix(scale):
+    return 'benchmark-%s' % scale
+
+
+def seeded(scale):
+    return CustomUser.objects.filter(
+        email=seeding.email(email_prefix(scale), 'employer', 0)).exists()
+
+
+def url_routes():
+    """The route of every URL pattern the site serves, the admin aside."""
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.app_name != 'admin':
+                    yield from walk(
+                        pattern.url_patterns, prefix + str(pattern.pattern))
+            else:
+                yield prefix + str(pattern.pattern)
+    return set(walk(get_resolver().url_patterns, ''))
+
+
+class Context:
+    """The seeded users that drive the requests, and throwaway rows."""
+
+    def __init__(self, scale, clients):
+        users = CustomUser.objects.filter(
+            email__startswith=email_prefix(scale) + '-').order_by('id')
+        self.employers = list(users.filter(is_ag=True)[:clients])
+        self.seekers = list(users.filter(
+            is_ag=False, email__contains='-seeker-')[:clients])
+        self.posts = {
+            employer.pk: list(employer.job_posts.values_list('id', flat=True))
+            for employer in self.employers}
+        self.applied = {
+            seeker.pk: set(seeker.applications.values_list(
+                'job_post_id', flat=True))
+            for seeker in self.seekers}
+        self.active_posts = list(JobPost.objects.filter(
+            is_published=True, expiration_date__gte=now(),
+        ).values_list('id', flat=True)[:10000])
+        random.Random(0).shuffle(self.active_posts)
+        self.password = make_password(PASSWORD)
+        for seeker in self.seekers:
+            matching.update_cv_match_scores(
+                seeker.job_seeker_profile.get().pk)
+
+    def throwaway_user(self, **fields):
+        return CustomUser.objects.create(
+            email='benchmark-tmp-%s@example.com' % uuid.uuid4().hex,
+            password=self.password, first_name='Bench',
+            last_name='Mark', mobile_number='0701234567', **fields)
+
+    def post_with_applicants(self, employer):
+        return (Application.objects.filter(job_post__job_post=employer)
+                .values_list('job_post_id', 'profile_id_id').first())
+
+    def unapplied_post(self, seeker):
+        for post_id in self.active_posts:
+            if post_id not in self.applied[seeker.pk]:
+                self.applied[seeker.pk].add(post_id)
+                return post_id
+        raise CommandError('No job post left to apply to')
+
+    def applied_post(self, seeker):
+        post_id = self.unapplied_post(seeker)
+        Application.objects.create(
+            profile_id=seeker, job_post_id=post_id,
+            job_seeker_cv=seeker.job_seeker_profile.get())
+        return post_id
+
+
+def authenticated(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION='Bearer %s' % AccessToken.for_user(user))
+    return client
+
+
+def import_csv():
+    header = ','.join(JOB_POST)
+    row = ','.join(str(value) for value in JOB_POST.values())
+    return '\n'.join([header] + [row] * 10).encode()
+
+
+# (method, route, actor, prepare). prepare(context, user) runs before the
+# timed part and returns the path and the keyword arguments of the test
+# client call, and optionally a "client" to send it with. The actor is the
+# kind of user whose client sends the request.
+ROUTES = [
+    ('GET', '', 'anonymous', lambda ctx, user: {'path': '/'}),
+    ('POST', 'create/user', 'anonymous', lambda ctx, user: {
+        'path': '/create/user', 'format': 'json', 'data': {
+            'email': 'benchmark-tmp-%s@example.com' % uuid.uuid4().hex,
+            'first_name': 'Bench', 'last_name': 'Mark',
+            'mobile_number': '0701234567', 'password': PASSWORD}}),
+    ('DELETE', 'delete/user', 'seeker', lambda ctx, user: {
+        'path': '/delete/user',
+        'client': authenticated(ctx.throwaway_user())}),
+    ('GET', 'user/info', 'seeker', lambda ctx, user: {'path': '/user/info'}),
+    ('GET', 'metrics', 'anonymous', lambda ctx, user: {
+        'path': '/metrics',
+        'HTTP_AUTHORIZATION': 'Bearer %s' % METRICS_TOKEN}),
+    ('POST', 'login', 'anonymous', lambda ctx, user: {
+        'path': '/login', 'format': 'json',
+        'data': {'email': ctx.seekers[0].email, 'password': PASSWORD}}),
+    ('POST', 'refresh/token', 'anonymous', lambda ctx, user: {
+        'path': '/refresh/token', 'format': 'json',
+        'data': {'refresh': str(RefreshToken.for_user(ctx.seekers[0]))}}),
+    ('POST', 'password-reset', 'anonymous', lambda ctx, user: {
+        'path': '/password-reset', 'format': 'json',
+        'data': {'email': ctx.seekers[0].email}}),
+    ('POST', 'reset/confirm/<str:uid>/<str:token>/', 'anonymous',
+     lambda ctx, user: (lambda target: {
+         'path': '/reset/confirm/%s/%s/' % (
+             urlsafe_base64_encode(force_bytes(target.pk)),
+             default_token_generator.make_token(target)),
+         'format': 'json', 'data': {'password': PASSWORD}})(
+             ctx.throwaway_user())),
+
+    ('GET', 'employer/jobposts', 'employer', lambda ctx, user: {
+        'path': '/employer/jobposts'}),
+    ('GET', 'employer/jobposts', 'employer', lambda ctx, user: {
+        'path': '/employer/jobposts?applicants=count&page_size=100'}),
+    ('GET', 'employer/jobposts/archived', 'employer', lambda ctx, user: {
+        'path': '/employer/jobposts/archived'}),
+    ('POST', 'employer/jobpost/create', 'employer', lambda ctx, user: {
+        'path': '/employer/jobpost/create', 'format': 'json',
+        'data': JOB_POST}),
+    ('POST', 'employer/jobpost/import', 'employer', lambda ctx, user: {
+        'path': '/employer/jobpost/import', 'data': import_csv(),
+        'content_type': 'text/csv'}),
+    ('GET', 'employer/applicants/export', 'employer', lambda ctx, user: {
+        'path': '/employer/applicants/export?job_post=%s'
+        % ctx.post_with_applicants(user)[0]}),
+    ('PATCH', 'employer/jobpost/update/<str:id>', 'employer',
+     lambda ctx, user: {
+         'path': '/employer/jobpost/update/%s' % ctx.posts[user.pk][0],
+         'format': 'json', 'data': {'job_description': uuid.uuid4().hex}}),
+    ('DELETE', 'employer/jobpost/delete/<str:id>', 'employer',
+     lambda ctx, user: {'path': '/employer/jobpost/delete/%s' % (
+         JobPost.objects.create(job_post=user, **JOB_POST).pk)}),
+    ('GET', 'employer/jobpost/get/<str:id>', 'employer', lambda ctx, user: {
+        'path': '/employer/jobpost/get/%s' % (
+            ctx.post_with_applicants(user)[0])}),
+    ('GET', 'employer/jobpost/<str:job_id>/application/<str:application_id>',
+     'employer', lambda ctx, user: {
+         'path': '/employer/jobpost/%s/application/%s' % (
+             ctx.post_with_applicants(user))}),
+    ('GET', 'employer/jobpost/<str:id>/applicants/ranked', 'employer',
+     lambda ctx, user: {
+         'path': '/employer/jobpost/%s/applicants/ranked' % (
+             ctx.post_with_applicants(user)[0])}),
+
+    ('GET', 'jobseeker/availableJobPosts', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/availableJobPosts'}),
+    ('GET', 'jobseeker/availableJobPosts', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/availableJobPosts?q=python'}),
+    ('GET', 'jobseeker/availableJobPosts', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/availableJobPosts?location=Lund'}),
+    ('GET', 'jobseeker/availableJobPosts/facets', 'seeker',
+     lambda ctx, user: {'path': '/jobseeker/availableJobPosts/facets'}),
+    ('GET', 'jobseeker/autocomplete', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/autocomplete?field=location&prefix=g'}),
+    ('GET', 'jobseeker/recommendedJobPosts', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/recommendedJobPosts'}),
+    ('GET', 'jobseeker/applications', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/applications'}),
+    ('PATCH', 'jobseeker/info/update', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/info/update', 'format': 'json',
+        'data': {'mobile_number': '0701234567'}}),
+    ('GET', 'jobseeker/retrive/profile', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/retrive/profile'}),
+    ('PATCH', 'jobseeker/cv', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/cv', 'format': 'json',
+        'data': {'work_experiences': [
+            {**WORK_EXPERIENCE, 'description': uuid.uuid4().hex}]}}),
+    ('POST', 'jobseeker/workexperince/create', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/workexperince/create', 'format': 'json',
+        'data': WORK_EXPERIENCE}),
+    ('DELETE', 'jobseeker/workexperince/delete/<str:id>', 'seeker',
+     lambda ctx, user: {'path': '/jobseeker/workexperince/delete/%s' % (
+         WorkExperince.objects.create(
+             job_seeker=user.job_seeker_profile.get(),
+             **WORK_EXPERIENCE).pk)}),
+    ('PUT', 'jobseeker/workexperince/update/<str:id>', 'seeker',
+     lambda ctx, user: {
+         'path': '/jobseeker/workexperince/update/%s' % (
+             WorkExperince.objects.filter(
+                 job_seeker__profile=user).values_list(
+                 'id', flat=True).first()),
+         'format': 'json', 'data': WORK_EXPERIENCE}),
+    ('POST', 'jobseeker/education/create', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/education/create', 'format': 'json',
+        'data': EDUCATION}),
+    ('DELETE', 'jobseeker/education/delete/<str:id>', 'seeker',
+     lambda ctx, user: {'path': '/jobseeker/education/delete/%s' % (
+         Education.objects.create(
+             job_seeker=user.job_seeker_profile.get(), **EDUCATION).pk)}),
+    ('PUT', 'jobseeker/education/update/<str:id>', 'seeker',
+     lambda ctx, user: {
+         'path': '/jobseeker/education/update/%s' % (
+             Education.objects.filter(
+                 job_seeker__profile=user).values_list(
+                 'id', flat=True).first()),
+         'format': 'json', 'data': EDUCATION}),
+    ('POST', 'jobseeker/apply', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/apply', 'format': 'json',
+        'data': {'job_post_ids': [
+            ctx.unapplied_post(user) for _ in range(10)]}}),
+    ('POST', 'jobseeker/apply/<str:id>', 'seeker', lambda ctx, user: {
+        'path': '/jobseeker/apply/%s' % ctx.unapplied_post(user)}),
+    ('DELETE', 'jobseeker/delete/application/<int:id>', 'seeker',
+     lambda ctx, user: {
+         'path': '/jobseeker/delete/application/%s'
+         % ctx.applied_post(user)}),
+]
+
+
+def uncovered_routes():
+    """URL routes no entry of ROUTES requests."""
+    return url_routes() - {route for _, route, _, _ in ROUTES}
+
+
+def drive(method, route, prepare, ctx, clients, requests):
+    """
+    Prepare ``requests`` requests spread over ``clients`` (a list of
+    ``(user, client)``), then send them from one thread per client. Returns
+    the name of the benchmark, the route and the query string, which stays
+    the same between runs, the latency of every request in milliseconds,
+    and the throughput, status and query figures.
+    """
+    per_client = max(1, requests // len(clients))
+    plans = []
+    for user, client in clients:
+        calls = []
+        for _ in range(per_client + 1):
+            call = prepare(ctx, user)
+            if resolve(call['path'].split('?')[0]).route != route:
+                raise CommandError('%s is not %s' % (call['path'], route))
+            calls.append((call.pop('client', client), call))
+        plans.append(calls)
+
+    def send(client, call):
+        call = dict(call)
+        response = getattr(client, method.lower())(call.pop('path'), **call)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    _, _, query = plans[0][0][1]['path'].partition('?')
+    name = '%s %s' % (method, route + ('?' + query if query else ''))
+    # One untimed request first, for the caches a real server has warm.
+    send(*plans[0].pop(0))
+    for calls in plans[1:]:
+        calls.pop(0)
+
+    def worker(calls):
+        timings = []
+        statuses = []
+        try:
+            for client, call in calls:
+                start = time.perf_counter()
+                statuses.append(send(client, call))
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+        return timings, statuses
+
+    before = metrics.route_stats(method, route)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(plans)) as executor:
+        results = list(executor.map(worker, plans))
+    elapsed = time.perf_counter() - start
+    after = metrics.route_stats(method, route)
+
+    timings = [timing for result in results for timing in result[0]]
+    statuses = [status for result in results for status in result[1]]
+    counted = after['count'] - before['count']
+    return name, timings, {
+        'requests': len(timings),
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'errors': sum(status >= 400 for status in statuses),
+        'queries_per_request': round(
+            (after['queries'] - before['queries']) / counted, 2)
+        if counted else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def use_database(scale):
+    """
+    Point the default connection at a SQLite file of its own per scale, so
+    the seeded data is kept for the next run and never mixes with the
+    development database. Other engines use the configured database as is.
+    """
+    if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+        return
+    connection.close()
+    name = os.path.join(settings.BASE_DIR, 'benchmark_%s.sqlite3' % scale)
+    settings.DATABASES['default']['NAME'] = name
+    connection.settings_dict['NAME'] = name
+
+
+def compare(old, new, write):
+    """Print the changes of a run against an earlier one."""
+    write('\nchanges since %s (%s):' % (
+        old.get('commit'), old.get('created_at')))
+    for name, result in new['results'].items():
+        previous = old['results'].get(name)
+        if previous is None:
+            write('%-64s new' % name)
+            continue
+        changes = [
+            '%s %+.1f %%' % (field, (result[field] / previous[field] - 1)
+                             * 100)
+            for field in ('p50_ms', 'p95_ms', 'p99_ms')
+            if previous[field]]
+        if previous['queries_per_request'] != (
+                result['queries_per_request']):
+            changes.append('queries %s -> %s' % (
+                previous['queries_per_request'],
+                result['queries_per_request']))
+        write('%-64s %s' % (name, ', '.join(changes)))
@@ -0,0 +1,29 @@
+"""
+WSGI and ASGI entry points for ``benchmark servers``. Every query gets a
+fixed extra round trip of BENCHMARK_DB_LATENCY milliseconds, like a
+database on another host, so waiting on the database shows up the way it
+does in production.
+"""
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+LATENCY = float(os.environ.get('BENCHMARK_DB_LATENCY', 0)) / 1000
+
+
+def delay(execute, sql, params, many, context):
+    time.sleep(LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_latency(sender, connection, **kwargs):
+    # Fires on every reconnect of the same connection object.
+    if delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(delay)
+
+
+connection_created.connect(add_latency)
+
+from job_match_backend_project.asgi import application as asgi  # noqa: E402
+from job_match_backend_project.wsgi import application as wsgi  # noqa: E402
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import archive
+
+
+class Command(BaseCommand):
+    help = ('Move long expired job posts and their applications to the '
+            'archive tables, and delete archived posts past retention.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=archive.BATCH_SIZE,
+            help='Number of job posts moved per transaction.')
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        archived, purged = archive.sweep(
+            options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            'Archived %s job posts, purged %s' % (archived, purged)))
@@ -0,0 +1,755 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from job_match_backend_app import (application_counts, authentication,
+                                   autocomplete, exports, facets,
+                                   fast_serializers, feed, matching, search,
+                                   synthetic)
+from job_match_backend_app.models import (Application, CustomUser, Education,
+                                          JobPost, JobSeekerCv, WorkExperince)
+from job_match_backend_app.serializers import (ApplicationsSerializer,
+                                               AvailableJobPostsSerializer)
+
+from . import _routes
+
+COMMANDS = 'job_match_backend_app.management.commands'
+
+
+class Rollback(Exception):
+    pass
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        'p99_ms': round(timings[int(len(timings) * 0.99) - 1], 3),
+    }
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def concurrently(request, clients, requests):
+    """
+    Call ``request(client)`` ``requests`` times spread over one thread per
+    client and return latency and throughput figures.
+    """
+    def worker(client, count):
+        timings = []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                request(client)
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+        return timings
+
+    per_client = max(1, requests // len(clients))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        results = executor.map(
+            worker, clients, [per_client] * len(clients))
+        timings = [timing for result in results for timing in result]
+    elapsed = time.perf_counter() - start
+    return {
+        **summarize(timings),
+        'requests_per_second': round(len(timings) / elapsed, 1),
+    }
+
+
+def create_job_seeker(index):
+    return CustomUser.objects.create(
+        email='benchmark-seeker-%s@example.com' % index, first_name='Bench',
+        last_name='Mark', mobile_number='0701234567')
+
+
+def seed_job_posts(count, rng, batch_size=2000, index=True):
+    employer = CustomUser.objects.create(
+        email='benchmark-employer@example.com', first_name='Bench',
+        last_name='Mark', org_number='5560000000', is_ag=True)
+    for start in range(0, count, batch_size):
+        posts = JobPost.objects.bulk_create([
+            JobPost(job_post=employer, **synthetic.job_post_fields(rng))
+            for _ in range(min(batch_size, count - start))
+        ])
+        if index:
+            search.index_job_posts(posts)
+    return employer
+
+
+def search_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng)
+    queries = rng.sample(
+        synthetic.VOCABULARY + synthetic.LOCATIONS, options['repeat'])
+    active = JobPost.objects.filter(
+        is_published=True, expiration_date__gte=now())
+
+    def icontains():
+        word = queries[rng.randrange(len(queries))]
+        list(active.filter(
+            Q(job_post_title__icontains=word)
+            | Q(company_name__icontains=word)
+            | Q(job_description__icontains=word)).values_list('id', flat=True))
+
+    def indexed():
+        word = queries[rng.randrange(len(queries))]
+        list(search.search_job_posts(active, word).values_list(
+            'id', flat=True))
+
+    for label, func in (('icontains', icontains), ('search', indexed)):
+        write('%-10s %s' % (label, timed(func, options['repeat'])))
+
+
+def autocomplete_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    start = time.perf_counter()
+    autocomplete._state.clear()
+    autocomplete.indexes()
+    write('build      %s posts in %.0f ms' % (
+        options['posts'], (time.perf_counter() - start) * 1000))
+    prefixes = [location[:rng.randrange(1, 4)]
+                for location in synthetic.LOCATIONS]
+    active = JobPost.objects.filter(
+        is_published=True, expiration_date__gte=now())
+
+    def icontains():
+        prefix = prefixes[rng.randrange(len(prefixes))]
+        list(active.filter(location__icontains=prefix).values(
+            'location').distinct())
+
+    def indexed():
+        autocomplete.suggest(
+            'location', prefixes[rng.randrange(len(prefixes))])
+
+    for label, func in (('icontains', icontains), ('index', indexed)):
+        write('%-10s %s' % (label, timed(func, options['repeat'])))
+
+    # 100k distinct values, looked up without the request around them.
+    values = ['%s %s %s' % (rng.choice(synthetic.TITLES),
+                            rng.choice(synthetic.VOCABULARY), number)
+              for number in range(100000)]
+    start = time.perf_counter()
+    index = autocomplete.PrefixIndex(values)
+    write('build      %s values in %.0f ms' % (
+        len(index), (time.perf_counter() - start) * 1000))
+    prefixes = [value[:rng.randrange(1, 12)] for value in values[:1000]]
+    write('lookup     %s' % timed(
+        lambda: index.lookup(prefixes[rng.randrange(len(prefixes))]),
+        max(options['repeat'], 1000)))
+
+
+def metrics_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    seeker = create_job_seeker(0)
+    without = [name for name in settings.MIDDLEWARE
+               if not name.endswith('.MetricsMiddleware')]
+    clients = {}
+    for label, middleware in (('without', without),
+                              ('with', settings.MIDDLEWARE)):
+        # The test client loads the middleware when it is created.
+        with override_settings(MIDDLEWARE=middleware):
+            clients[label] = APIClient()
+            clients[label].force_authenticate(seeker)
+
+    for url in ('/jobseeker/availableJobPosts',
+                '/jobseeker/availableJobPosts?paginate=false'):
+        timings = {label: [] for label in clients}
+        # Interleaved, so that drift in the machine hits both alike.
+        for _ in range(options['repeat']):
+            for label, client in clients.items():
+                start = time.perf_counter()
+                response = client.get(url)
+                timings[label].append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.status_code
+        results = {label: summarize(values)
+                   for label, values in timings.items()}
+        overhead = (results['with']['p50_ms'] / results['without']['p50_ms']
+                    - 1) * 100
+        for label, result in results.items():
+            write('%-7s %-44s %s' % (label, url, result))
+        write('overhead %-43s %.1f %%' % (url, overhead))
+
+
+def facets_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    facets.rebuild_facets()
+    locations = rng.sample(synthetic.LOCATIONS, min(
+        options['repeat'], len(synthetic.LOCATIONS)))
+    active = JobPost.objects.filter(
+        is_published=True, expiration_date__gte=now())
+
+    def group_by(location):
+        job_posts = active
+        if location:
+            job_posts = job_posts.filter(location__icontains=location)
+        for field in ('location', 'employment_type'):
+            list(job_posts.values(field).annotate(Count('id')).order_by())
+
+    for label, func in (('group_by', group_by),
+                        ('facets', facets.feed_facets)):
+        write('%-12s %s' % (label, timed(lambda: func(None),
+                                         options['repeat'])))
+        write('%-12s %s' % (label + '+loc', timed(
+            lambda: func(locations[rng.randrange(len(locations))]),
+            options['repeat'])))
+
+
+def matching_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    active = JobPost.objects.filter(
+        is_published=True, expiration_date__gte=now())
+
+    start = time.perf_counter()
+    job_post_matrix = matching.active_job_post_matrix(force_rebuild=True)
+    write('build      %.0f ms for %s posts x %s terms' % (
+        (time.perf_counter() - start) * 1000, *job_post_matrix.matrix.shape))
+
+    cvs = [Counter(search.tokenize(' '.join(synthetic.words(rng, 60))))
+           for _ in range(options['repeat'])]
+    write('top_k      %s' % timed(
+        lambda: job_post_matrix.top_k(cvs[rng.randrange(len(cvs))], k=20),
+        options['repeat']))
+
+    # The endpoint reads the stored scores of the CV, which are written
+    # when the CV changes; both ends are timed as a whole.
+    seeker = create_job_seeker(0)
+    cv = JobSeekerCv.objects.create(
+        profile=seeker, email=seeker.email,
+        mobile_number=seeker.mobile_number)
+    WorkExperince.objects.bulk_create([
+        WorkExperince(job_seeker=cv, **synthetic.work_experience_fields(rng))
+        for _ in range(3)])
+    write('score_cv   %s' % timed(
+        lambda: matching.update_cv_match_scores(cv.pk), options['repeat']))
+    client = APIClient()
+    client.force_authenticate(seeker)
+
+    def request():
+        response = client.get('/jobseeker/recommendedJobPosts')
+        assert response.status_code == 200, response.status_code
+
+    write('request    %s' % timed(request, options['repeat']))
+
+
+def serializers_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    seeker = create_job_seeker(0)
+    cv = JobSeekerCv.objects.create(
+        profile=seeker, email=seeker.email,
+        mobile_number=seeker.mobile_number)
+    Application.objects.bulk_create([
+        Application(profile_id=seeker, job_post_id=job_post_id,
+                    job_seeker_cv=cv)
+        for job_post_id in JobPost.objects.values_list('id', flat=True)
+    ], batch_size=2000)
+
+    cases = (
+        (AvailableJobPostsSerializer, JobPost.objects.all()),
+        (ApplicationsSerializer, Application.objects.select_related(
+            'job_post').filter(profile_id=seeker)),
+    )
+    for serializer_class, queryset in cases:
+        fast = fast_serializers.values_serializer(serializer_class)
+        rows = queryset.count()
+
+        def drf():
+            return serializer_class(queryset.all(), many=True).data
+
+        def values():
+            return fast.serialize(fast.values(queryset))
+
+        assert JSONRenderer().render(drf()) == JSONRenderer().render(values())
+        for label, func in (('drf', drf), ('values', values)):
+            result = timed(func, options['repeat'])
+            result['rows_per_second'] = round(
+                rows / result['mean_ms'] * 1000)
+            write('%-28s %-7s %s' % (serializer_class.__name__, label, result))
+
+
+def feed_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    job_post_ids = list(JobPost.objects.filter(
+        job_post__email='benchmark-employer@example.com',
+    ).values_list('id', flat=True))
+
+    clients = []
+    for index in range(options['clients']):
+        seeker = create_job_seeker(index)
+        cv = JobSeekerCv.objects.create(
+            profile=seeker, email=seeker.email,
+            mobile_number=seeker.mobile_number)
+        Application.objects.bulk_create([
+            Application(profile_id=seeker, job_post_id=job_post_id,
+                        job_seeker_cv=cv)
+            for job_post_id in rng.sample(job_post_ids, 5)])
+        client = APIClient()
+        client.force_authenticate(seeker)
+        clients.append(client)
+
+    for name, query in (('full', 'paginate=false'), ('page', 'page_size=20')):
+        def request(client):
+            response = client.get('/jobseeker/availableJobPosts?' + query)
+            assert response.status_code == 200, response.status_code
+
+        for label, timeout in (('uncached', 0), ('cached', 300)):
+            with override_settings(FEED_CACHE_TIMEOUT=timeout):
+                feed.stats.update(hits=0, misses=0)
+                result = concurrently(request, clients, options['repeat'])
+                write('%-4s %-10s %s %s' % (
+                    name, label, result, feed.cache_stats()))
+
+
+def auth_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    clients = []
+    for index in range(options['clients']):
+        token = AccessToken.for_user(create_job_seeker(index))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+        clients.append(client)
+
+    for url in ('/user/info', '/jobseeker/availableJobPosts'):
+        def request(client):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        for label, timeout in (('uncached', 0), ('cached', 60)):
+            with override_settings(USER_CACHE_TIMEOUT=timeout):
+                authentication.users.clear()
+                request(clients[0])
+                with CaptureQueriesContext(connection) as queries:
+                    request(clients[0])
+                result = concurrently(request, clients, options['repeat'])
+                write('%-28s %-9s %s queries %s' % (
+                    url, label, len(queries), result))
+
+
+def apply_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    job_post_ids = list(JobPost.objects.filter(
+        job_post__email='benchmark-employer@example.com',
+    ).values_list('id', flat=True))
+    rng.shuffle(job_post_ids)
+    seekers = []
+    clients = []
+    for index in range(options['clients']):
+        seeker = create_job_seeker(index)
+        seekers.append(seeker)
+        JobSeekerCv.objects.create(
+            profile=seeker, email=seeker.email,
+            mobile_number=seeker.mobile_number)
+        client = APIClient()
+        client.force_authenticate(seeker)
+        clients.append(client)
+
+    # New applications, every request to another post. Then the clients
+    # all as one user, applying to one post again and again as on repeated
+    # clicks, and retrying one request with the same Idempotency-Key.
+    same_user = []
+    for _ in clients:
+        client = APIClient()
+        client.force_authenticate(seekers[0])
+        same_user.append(client)
+    fresh = iter(job_post_ids)
+    runs = {
+        'new': (clients, lambda: next(fresh), {}),
+        'duplicate': (same_user, lambda: job_post_ids[-1], {}),
+        'retry': (same_user, lambda: job_post_ids[-2],
+                  {'Idempotency-Key': 'click'}),
+    }
+    for label, (run_clients, job_post_id, headers) in runs.items():
+        statuses = []
+
+        def request(client):
+            response = client.post(
+                '/jobseeker/apply/%s' % job_post_id(), headers=headers)
+            statuses.append(response.status_code)
+
+        result = concurrently(request, run_clients, options['repeat'])
+        write('%-10s %s statuses %s' % (
+            label, result, dict(Counter(statuses))))
+    duplicates = Application.objects.filter(
+        profile_id__email__startswith='benchmark-').values(
+        'profile_id', 'job_post').annotate(count=Count('id')).filter(
+        count__gt=1)
+    write('duplicate applications: %s' % duplicates.count())
+
+
+def import_scenario(options, rng, write):
+    employer = seed_job_posts(0, rng)
+    client = APIClient()
+    client.force_authenticate(employer)
+    rows = [synthetic.job_post_fields(rng) for _ in range(options['posts'])]
+    for row in rows:
+        row['expiration_date'] = row['expiration_date'].isoformat()
+
+    start = time.perf_counter()
+    for row in rows[:options['repeat']]:
+        response = client.post('/employer/jobpost/create', row, format='json')
+        assert response.status_code == 201, response.status_code
+    elapsed = time.perf_counter() - start
+    write('create     %s posts/s' % round(options['repeat'] / elapsed))
+
+    body = '\n'.join(json.dumps(row) for row in rows).encode()
+    start = time.perf_counter()
+    response = client.generic(
+        'POST', '/employer/jobpost/import', body,
+        content_type='application/x-ndjson')
+    elapsed = time.perf_counter() - start
+    assert response.json()['created'] == len(rows), response.json()
+    write('import     %s posts in %.1f s, %s posts/s' % (
+        len(rows), elapsed, round(len(rows) / elapsed)))
+
+    # The match scores are computed afterwards by the worker.
+    start = time.perf_counter()
+    while matching.update_pending():
+        pass
+    write('scores     %.1f s in update_match_scores' % (
+        time.perf_counter() - start))
+
+
+def seed_applicants(job_post_ids, applications, rng):
+    """
+    Job seekers with a CV that each apply to all ``job_post_ids``, enough
+    of them for about ``applications`` applications. Bulk created, so the
+    job post counters are not updated.
+    """
+    seekers = -(-applications // len(job_post_ids))
+    for start in range(0, seekers, 1000):
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email='benchmark-seeker-%s@example.com' % index,
+                       first_name='Bench', last_name='Mark',
+                       mobile_number='0701234567')
+            for index in range(start, min(start + 1000, seekers))])
+        cvs = JobSeekerCv.objects.bulk_create([
+            JobSeekerCv(profile=user, email=user.email,
+                        mobile_number=user.mobile_number)
+            for user in users])
+        WorkExperince.objects.bulk_create([
+            WorkExperince(job_seeker=cv, occupation_title=title,
+                          company_name=rng.choice(synthetic.COMPANIES),
+                          years='2', description=' '.join(
+                              synthetic.words(rng, 20)))
+            for cv in cvs for title in rng.sample(synthetic.TITLES, 2)])
+        Education.objects.bulk_create([
+            Education(job_seeker=cv, school_name='Chalmers', level='Master',
+                      orientation='Data', years='5',
+                      description=' '.join(synthetic.words(rng, 10)))
+            for cv in cvs])
+        Application.objects.bulk_create([
+            Application(profile_id=cv.profile, job_post_id=job_post_id,
+                        job_seeker_cv=cv)
+            for cv in cvs for job_post_id in job_post_ids
+        ], batch_size=5000)
+
+
+def export_scenario(options, rng, write):
+    employer = seed_job_posts(options['posts'], rng, index=False)
+    job_post_ids = list(JobPost.objects.values_list('id', flat=True))
+    seed_applicants(job_post_ids, options['applications'], rng)
+
+    client = APIClient()
+    client.force_authenticate(employer)
+
+    def export(export_type, query):
+        response = client.get(
+            '/employer/applicants/export?type=%s%s' % (export_type, query))
+        return sum(len(part) for part in response.streaming_content)
+
+    for label, query in (('one post', '&job_post=%s' % job_post_ids[0]),
+                         ('all posts', '')):
+        for export_type in exports.FORMATS:
+            start = time.perf_counter()
+            size = export(export_type, query)
+            elapsed = time.perf_counter() - start
+            # Traced separately, tracemalloc slows the export down a lot.
+            tracemalloc.start()
+            export(export_type, query)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            write('%-9s %-6s %.1f MB in %.1f s, peak %.1f MB allocated' % (
+                label, export_type, size / 2 ** 20, elapsed, peak / 2 ** 20))
+
+
+def dashboard_scenario(options, rng, write):
+    employer = seed_job_posts(options['posts'], rng, index=False)
+    job_post_ids = list(JobPost.objects.values_list('id', flat=True))
+    seed_applicants(job_post_ids, options['applications'], rng)
+    start = time.perf_counter()
+    fixed = application_counts.repair_application_counts()
+    write('repair     %s posts in %.1f s' % (
+        fixed, time.perf_counter() - start))
+
+    client = APIClient()
+    client.force_authenticate(employer)
+    for label, query in (('applicants', ''), ('counts', '&applicants=count')):
+        def request():
+            response = client.get(
+                '/employer/jobposts?page_size=100%s' % query)
+            assert response.status_code == 200, response.status_code
+
+        write('%-10s %s' % (label, timed(request, options['repeat'])))
+
+
+SERVERS = {
+    # The WSGI setup of the Render web service: sync gunicorn workers.
+    'gunicorn': ['gunicorn', COMMANDS + '._servers:wsgi',
+                 '--workers', '1', '--bind', '127.0.0.1:%(port)s'],
+    # The ASGI setup from DEPLOYMENT.md, serving the async read views.
+    'uvicorn': ['gunicorn', COMMANDS + '._servers:asgi',
+                '--workers', '1', '--bind', '127.0.0.1:%(port)s',
+                '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+@contextmanager
+def server(name, port, **environ):
+    """Run one worker process of ``name`` from SERVERS until exit."""
+    env = dict(os.environ, RENDER_EXTERNAL_HOSTNAME='127.0.0.1', **environ)
+    command = [sys.executable, '-m'] + [
+        part % {'port': port} for part in SERVERS[name]]
+    process = subprocess.Popen(
+        command, cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), 0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise CommandError('%s did not start' % name)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def get(port, path, token):
+    """A bare HTTP/1.1 GET, returning the status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write((
+            'GET %s HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            'Authorization: Bearer %s\r\nConnection: close\r\n\r\n'
+            % (path, token)).encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, path, tokens, requests):
+    """Send ``requests`` GETs from one concurrent client per token."""
+    timings = []
+    remaining = iter(range(requests))
+
+    async def client(token):
+        for _ in remaining:
+            start = time.perf_counter()
+            status = await get(port, path, token)
+            assert status == 200, status
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(token) for token in tokens))
+    elapsed = time.perf_counter() - start
+    return {
+        **summarize(timings),
+        'requests_per_second': round(len(timings) / elapsed, 1),
+    }
+
+
+def servers_scenario(options, rng, write):
+    seed_job_posts(options['posts'], rng, index=False)
+    tokens = [str(AccessToken.for_user(create_job_seeker(index)))
+              for index in range(options['clients'])]
+    port = options['port']
+    latency = str(options['db_latency'])
+    for name, environ in (('gunicorn', {}),
+                          ('uvicorn', {'ASYNC_READ_VIEWS': 'True'})):
+        with server(name, port, BENCHMARK_DB_LATENCY=latency, **environ):
+            for path in ('/jobseeker/availableJobPosts',
+                         '/jobseeker/applications',
+                         '/jobseeker/retrive/profile'):
+                # Warm up: imports, user caches and the CVs created on the
+                # first profile request.
+                asyncio.run(load(port, path, tokens, len(tokens)))
+                result = asyncio.run(load(
+                    port, path, tokens, options['repeat']))
+                write('%-9s %-28s %s' % (name, path, result))
+
+
+def routes_scenario(options, rng, write):
+    uncovered = _routes.uncovered_routes()
+    if uncovered:
+        raise CommandError('No benchmark for %s' % ', '.join(
+            sorted(uncovered)))
+    os.environ.setdefault('FRONTEND_BASE_URL', 'http://localhost:3000')
+
+    scale = options['scale']
+    _routes.use_database(scale)
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    if not _routes.seeded(scale):
+        call_command('seed', prefix=_routes.email_prefix(scale),
+                     password=_routes.PASSWORD, seed=options['seed'],
+                     stdout=sys.stdout, **_routes.SCALES[scale])
+    ctx = _routes.Context(scale, options['clients'])
+    actors = {
+        'anonymous': [(None, APIClient())
+                      for _ in range(options['clients'])],
+        'employer': [(user, _routes.authenticated(user))
+                     for user in ctx.employers],
+        'seeker': [(user, _routes.authenticated(user))
+                   for user in ctx.seekers],
+    }
+
+    results = {}
+    with override_settings(
+            METRICS_TOKEN=_routes.METRICS_TOKEN,
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+        for method, route, actor, prepare in _routes.ROUTES:
+            if options['route'] and not any(
+                    text in route for text in options['route']):
+                continue
+            name, timings, figures = _routes.drive(
+                method, route, prepare, ctx, actors[actor],
+                options['repeat'])
+            result = results[name] = {**summarize(timings), **figures}
+            write('%-64s p50 %8.1f ms  p95 %8.1f ms  p99 %8.1f ms  '
+                  '%7.1f req/s  %5s queries  %s errors' % (
+                      name, result['p50_ms'], result['p95_ms'],
+                      result['p99_ms'], result['requests_per_second'],
+                      result['queries_per_request'], result['errors']))
+
+    report = {
+        'commit': _routes.git_commit(),
+        'created_at': now().isoformat(),
+        'scale': scale,
+        'sizes': _routes.SCALES[scale],
+        'clients': options['clients'],
+        'requests_per_route': options['repeat'],
+        'results': results,
+    }
+    if options['output']:
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+    if options['compare']:
+        with open(options['compare']) as file:
+            _routes.compare(json.load(file), report, write)
+
+
+SCENARIOS = {
+    'apply': apply_scenario,
+    'auth': auth_scenario,
+    'autocomplete': autocomplete_scenario,
+    'dashboard': dashboard_scenario,
+    'export': export_scenario,
+    'facets': facets_scenario,
+    'feed': feed_scenario,
+    'import': import_scenario,
+    'matching': matching_scenario,
+    'metrics': metrics_scenario,
+    'routes': routes_scenario,
+    'search': search_scenario,
+    'serializers': serializers_scenario,
+    'servers': servers_scenario,
+}
+
+# Scenarios that drive requests from several threads or server processes.
+# Those have their own database connections, so the seeded data has to be
+# committed and is deleted again afterwards instead of being rolled back.
+COMMITTED_SCENARIOS = {'apply', 'auth', 'feed', 'servers'}
+
+# Scenarios that seed a database of their own and keep it for the next run.
+KEPT_SCENARIOS = {'routes'}
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway data set, time a scenario and remove the '
+            'data again. The routes scenario times every route in urls.py '
+            'on a kept data set of a given scale and writes JSON that can '
+            'be compared between commits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Timed runs, or requests per route for the routes '
+                 'scenario.')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument(
+            '--applications', type=int, default=500000,
+            help='Applications seeded by the export and dashboard '
+                 'scenarios.')
+        parser.add_argument(
+            '--db-latency', type=float, default=5,
+            help='Milliseconds added to every query by the servers scenario.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--scale', choices=sorted(_routes.SCALES), default='1k',
+            help='Data set of the routes scenario.')
+        parser.add_argument(
+            '--route', action='append', default=[],
+            help='Only time the routes containing this text.')
+        parser.add_argument('--output', help='File to write the JSON to.')
+        parser.add_argument(
+            '--compare', help='JSON of an earlier run to print changes to.')
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        scenario = SCENARIOS[options['scenario']]
+        if options['scenario'] in KEPT_SCENARIOS:
+            scenario(options, rng, self.stdout.write)
+            return
+        if options['scenario'] in COMMITTED_SCENARIOS:
+            try:
+                scenario(options, rng, self.stdout.write)
+            finally:
+                CustomUser.objects.filter(
+                    email__startswith='benchmark-').delete()
+            return
+        try:
+            with transaction.atomic():
+                scenario(options, rng, self.stdout.write)
+                raise Rollback
+        except Rollback:
+            pass
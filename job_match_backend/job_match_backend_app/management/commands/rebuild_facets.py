@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import facets
+
+
+class Command(BaseCommand):
+    help = ('Recount the job post facets (posts per location, employment '
+            'type and expiration date) from scratch.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = facets.rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(
+            'Counted %s facets in %.1f s'
+            % (total, time.perf_counter() - start)))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import matching
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored CV to job post match scores from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=matching.CV_BATCH_SIZE,
+            help='Number of CVs scored per matrix product.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = matching.rebuild_match_scores(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Scored %s CVs in %.1f s' % (total, time.perf_counter() - start)))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import application_counts
+
+
+class Command(BaseCommand):
+    help = ('Recompute the application counts stored on the job posts and '
+            'fix the ones that drifted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=application_counts.BATCH_SIZE,
+            help='Number of job posts checked per query.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        fixed = application_counts.repair_application_counts(
+            options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Fixed %s job posts in %.1f s'
+            % (fixed, time.perf_counter() - start)))
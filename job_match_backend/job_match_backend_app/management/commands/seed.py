@@ -0,0 +1,83 @@
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from job_match_backend_app import matching, seeding
+from job_match_backend_app.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic employers, job seekers with '
+            'CVs, job posts and applications, using bulk inserts on several '
+            'processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employers', type=int, default=100)
+        parser.add_argument('--job-seekers', type=int, default=1000)
+        parser.add_argument('--job-posts', type=int, default=10000)
+        parser.add_argument('--applications', type=int, default=20000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Start of the generated email addresses, '
+                 '<prefix>-employer-<n>@example.com and '
+                 '<prefix>-seeker-<n>@example.com.')
+        parser.add_argument(
+            '--password', default='seed-password',
+            help='Password of all generated users, hashed once.')
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='The same seed generates the same data.')
+        parser.add_argument(
+            '--processes', type=int,
+            help='Default: 1 with SQLite, which allows one writer at a '
+                 'time, otherwise the number of CPUs.')
+        parser.add_argument(
+            '--batch-size', type=int, default=seeding.BATCH_SIZE,
+            help='Rows inserted per transaction.')
+        parser.add_argument(
+            '--match-scores', action='store_true',
+            help='Also score every CV against the job posts, which takes '
+                 'much longer than the rest.')
+
+    def handle(self, *args, **options):
+        if options['employers'] < 1 and options['job_posts']:
+            raise CommandError('Job posts need at least one employer')
+        prefix = options['prefix']
+        if CustomUser.objects.filter(email__in=[
+                seeding.email(prefix, 'employer', 0),
+                seeding.email(prefix, 'seeker', 0)]).exists():
+            raise CommandError(
+                'Users with the prefix "%s" exist already, pick another '
+                '--prefix' % prefix)
+        processes = options['processes']
+        if processes is None:
+            sqlite = (settings.DATABASES['default']['ENGINE']
+                      == 'django.db.backends.sqlite3')
+            processes = 1 if sqlite else os.cpu_count() or 1
+
+        start = time.perf_counter()
+        done = Counter()
+
+        def progress(name, rows):
+            done[name] += rows
+            self.stdout.write('%-12s %9s rows, %.0f s' % (
+                name, done[name], time.perf_counter() - start))
+
+        created = seeding.seed(
+            prefix, options['employers'], options['job_seekers'],
+            options['job_posts'], options['applications'],
+            make_password(options['password']), seed=options['seed'],
+            processes=processes, batch_size=options['batch_size'],
+            progress=progress)
+        if options['match_scores']:
+            matching.rebuild_match_scores()
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded %s employers, %s job seekers, %s job posts and %s '
+            'applications in %.1f s. Users log in with the password "%s".' % (
+                created['employers'], created['job_seekers'],
+                created['job_posts'], created['applications'],
+                time.perf_counter() - start, options['password'])))
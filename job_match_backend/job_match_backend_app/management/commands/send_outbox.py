@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import outbox
+
+
+class Command(BaseCommand):
+    help = ('Deliver the queued mails of the outbox. Sends everything that '
+            'is due and exits, or keeps polling with --loop.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=outbox.BATCH_SIZE,
+            help='Number of mails sent over one SMTP connection.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running and poll for new mails.')
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = outbox.send_pending(options['batch_size'])
+            if sent or failed:
+                self.stdout.write('Sent %s, failed %s' % (sent, failed))
+                # More may be due, do not wait.
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_match_backend_app import matching
+
+
+class Command(BaseCommand):
+    help = ('Recompute the match scores of the CVs and job posts changed '
+            'since the last run. Works off everything queued and exits, '
+            'or keeps polling with --loop.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=matching.PENDING_BATCH_SIZE,
+            help='Number of queued updates handled per pass.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running and poll for new updates.')
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            done = matching.update_pending(options['batch_size'])
+            if done:
+                self.stdout.write('Updated %s in %.1f s' % (
+                    done, time.perf_counter() - start))
+                # More may be queued, do not wait.
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,416 @@
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils.timezone import now
+from scipy import sparse
+
+from .models import (Application, JobPost, JobSeekerCv, MatchScore,
+                     MatchScoreUpdate)
+from .search import FIELD_WEIGHTS, job_post_terms, tokenize
+
+CV_FIELD_WEIGHTS = {
+    'work_experiences': {
+        'occupation_title': 3,
+        'company_name': 1,
+        'description': 1,
+    },
+    'educations': {
+        'orientation': 2,
+        'level': 1,
+        'school_name': 1,
+        'description': 1,
+    },
+}
+
+VERSION_CACHE_KEY = 'matching:job-posts-version'
+
+# How many matches are stored per CV, and the lowest score worth storing.
+MATCH_SCORES_PER_CV = 100
+MATCH_SCORE_THRESHOLD = 0.05
+CV_BATCH_SIZE = 100
+# Queued updates worked off per update_pending() call.
+PENDING_BATCH_SIZE = 500
+
+
+def cv_terms(cv):
+    """
+    Return a Counter of term -> weight for a JobSeekerCv. Work experiences
+    and educations should be prefetched when this is called in a loop.
+    """
+    weights = Counter()
+    for relation, fields in CV_FIELD_WEIGHTS.items():
+        for item in getattr(cv, relation).all():
+            _add_item_terms(weights, item, fields)
+    return weights
+
+
+def _add_item_terms(weights, item, fields):
+    # Items are model instances or values() dicts.
+    for field, field_weight in fields.items():
+        value = item[field] if isinstance(item, dict) else getattr(item, field)
+        for token in tokenize(value):
+            weights[token] += field_weight
+
+
+def applicant_cv_terms(job_post):
+    """
+    Return {cv id: Counter of term -> weight} for the CVs that applied to a
+    job post. Only the text of the CV items is read, one query per item
+    type, without building model instances.
+    """
+    cv_ids = Application.objects.filter(
+        job_post=job_post).values('job_seeker_cv_id')
+    weights = defaultdict(Counter)
+    for relation, fields in CV_FIELD_WEIGHTS.items():
+        model = JobSeekerCv._meta.get_field(relation).related_model
+        for item in model.objects.filter(job_seeker_id__in=cv_ids).values(
+                'job_seeker_id', *fields).iterator():
+            _add_item_terms(weights[item['job_seeker_id']], item, fields)
+    return weights
+
+
+def job_posts_changed():
+    """Invalidate the job post matrix in every process sharing the cache."""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+class TermMatrix:
+    """
+    TF-IDF vectors of a set of documents (job posts or CVs) as one
+    L2-normalised sparse matrix (documents x terms), so that scoring
+    against every document is a single sparse matrix product.
+    """
+
+    def __init__(self, ids, vocabulary, idf, matrix):
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, job_posts):
+        """Build the matrix for a JobPost queryset."""
+        posts = job_posts.values('id', *FIELD_WEIGHTS)
+        return cls.from_terms(
+            [post['id'] for post in posts],
+            [job_post_terms(post) for post in posts])
+
+    @classmethod
+    def from_terms(cls, ids, term_weights):
+        """Build the matrix from one term Counter per document id."""
+        rows, columns, counts = [], [], []
+        vocabulary = {}
+        for row, weights in enumerate(term_weights):
+            for term, weight in weights.items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(weight)
+
+        shape = (len(ids), len(vocabulary))
+        tf = sparse.csr_matrix(
+            (1 + np.log(np.asarray(counts, dtype=np.float64)),
+             (rows, columns)), shape=shape)
+        document_frequency = np.bincount(columns, minlength=shape[1])
+        idf = np.log((1 + shape[0]) / (1 + document_frequency)) + 1
+        return cls(np.asarray(ids, dtype=np.int64), vocabulary, idf,
+                   normalize(tf @ sparse.diags(idf)))
+
+    def vectorize(self, term_weights):
+        """Turn one or more term Counters into normalised TF-IDF rows."""
+        rows, columns, counts = [], [], []
+        for row, weights in enumerate(term_weights):
+            for term, weight in weights.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    counts.append(weight)
+        shape = (len(term_weights), len(self.vocabulary))
+        tf = sparse.csr_matrix(
+            (1 + np.log(np.asarray(counts, dtype=np.float64)),
+             (rows, columns)), shape=shape)
+        return normalize(tf @ sparse.diags(self.idf))
+
+    def scores(self, vectors):
+        """
+        Cosine similarity of every vector against every job post, as a
+        dense (vectors x posts) array. The query side is made dense so the
+        product is a plain CSR matrix-vector multiplication.
+        """
+        return np.asarray(self.matrix @ vectors.T.toarray()).T
+
+    def top_k(self, term_weights, k=20, exclude_ids=()):
+        """Return [(id, score), ...] best first for one term Counter."""
+        if not len(self.ids):
+            return []
+        scores = self.scores(self.vectorize([term_weights]))[0]
+        if exclude_ids:
+            scores[np.isin(self.ids, list(exclude_ids))] = 0
+        return self.best(scores, k)
+
+    def best(self, scores, k, minimum=0):
+        """Return the k best (id, score) pairs of one row of scores."""
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(self.ids[index]), float(scores[index]))
+                for index in best if scores[index] > minimum]
+
+
+def normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_matrix = None
+_matrix_key = None
+_matrix_built_at = 0
+_rebuild_thread = None
+
+
+def _current_key():
+    return (cache.get_or_set(
+        VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None), now().date())
+
+
+def _build(key, force=False):
+    """Build the matrix for ``key`` and swap it in for the old one."""
+    global _matrix, _matrix_key, _matrix_built_at
+    # Only the reference swap is locked, readers are never kept waiting on
+    # a build. _build_lock keeps two builds from running at once.
+    with _build_lock:
+        if not force and _matrix_key == key:
+            return _matrix
+        matrix = TermMatrix.build(JobPost.objects.filter(
+            is_published=True, expiration_date__gte=key[1]))
+        with _lock:
+            _matrix, _matrix_key = matrix, key
+            _matrix_built_at = time.monotonic()
+    return matrix
+
+
+def _rebuild_in_background(key):
+    global _rebuild_thread
+    try:
+        _build(key)
+    finally:
+        connection.close()
+        with _lock:
+            _rebuild_thread = None
+
+
+def active_job_post_matrix(force_rebuild=False, current=False):
+    """
+    Return the matrix of currently active job posts. When a job post was
+    written or the date changed since it was built, the matrix in use is
+    returned while a background thread builds the new one, at most once per
+    MATCHING_REBUILD_INTERVAL seconds, so callers must still check that the
+    posts they get back are active. Only the first call in a process waits
+    for a build; ``current`` waits for one when the matrix is out of date,
+    ``force_rebuild`` always.
+    """
+    global _rebuild_thread
+    key = _current_key()
+    with _lock:
+        matrix = _matrix
+        age = time.monotonic() - _matrix_built_at
+        stale = _matrix_key != key
+        if (matrix is not None and stale and not current
+                and not force_rebuild and _rebuild_thread is None
+                and age >= settings.MATCHING_REBUILD_INTERVAL):
+            _rebuild_thread = threading.Thread(
+                target=_rebuild_in_background, args=(key,), daemon=True)
+            _rebuild_thread.start()
+    if force_rebuild or matrix is None or (stale and current):
+        return _build(key, force=force_rebuild)
+    return matrix
+
+
+def rank_applications(job_post):
+    """
+    Score the CV of every application to a job post in one batched
+    computation and return [(application id, score), ...] best first,
+    ties most recent first. The IDF is taken from the CVs themselves, so
+    terms every applicant shares count for less than the ones that set an
+    applicant apart.
+    """
+    applications = list(Application.objects.filter(
+        job_post=job_post).order_by('-id').values_list(
+        'id', 'job_seeker_cv_id'))
+    if not applications:
+        return []
+    terms = applicant_cv_terms(job_post)
+    cv_matrix = TermMatrix.from_terms(
+        [cv_id for _, cv_id in applications],
+        [terms[cv_id] for _, cv_id in applications])
+    scores = cv_matrix.scores(
+        cv_matrix.vectorize([job_post_terms(job_post)]))[0]
+    return [(applications[index][0], float(scores[index]))
+            for index in np.argsort(-scores, kind='stable')]
+
+
+def _cvs_in_batches(cvs, batch_size=CV_BATCH_SIZE):
+    # The ids are read up front, so that no cursor is left open while the
+    # scores of a batch are written.
+    ids = list(cvs.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        yield list(JobSeekerCv.objects.filter(
+            pk__in=ids[start:start + batch_size],
+        ).order_by('pk').prefetch_related('work_experiences', 'educations'))
+
+
+def _active_job_post_ids(ids):
+    return set(JobPost.objects.filter(
+        id__in=ids, is_published=True, expiration_date__gte=now().date(),
+    ).values_list('id', flat=True))
+
+
+def _store_cv_scores(job_post_matrix, cvs):
+    """Replace the stored scores of a batch of CVs, one matrix product."""
+    scores = job_post_matrix.scores(
+        job_post_matrix.vectorize([cv_terms(cv) for cv in cvs]))
+    matches = {
+        cv.pk: job_post_matrix.best(
+            row, MATCH_SCORES_PER_CV, minimum=MATCH_SCORE_THRESHOLD)
+        for cv, row in zip(cvs, scores)
+    }
+    active = _active_job_post_ids(
+        {job_post_id for pairs in matches.values()
+         for job_post_id, score in pairs})
+    with transaction.atomic():
+        MatchScore.objects.filter(job_seeker_cv__in=list(matches)).delete()
+        MatchScore.objects.bulk_create([
+            MatchScore(job_seeker_cv_id=cv_id, job_post_id=job_post_id,
+                       score=score)
+            for cv_id, pairs in matches.items()
+            for job_post_id, score in pairs if job_post_id in active
+        ], batch_size=1000)
+
+
+def update_cv_match_scores(cv_id, job_post_matrix=None):
+    """Recompute the stored matches of one CV after its content changed."""
+    update_cvs_match_scores([cv_id], job_post_matrix)
+
+
+def update_cvs_match_scores(cv_ids, job_post_matrix=None):
+    if job_post_matrix is None:
+        job_post_matrix = active_job_post_matrix(current=True)
+    for cvs in _cvs_in_batches(JobSeekerCv.objects.filter(pk__in=cv_ids)):
+        _store_cv_scores(job_post_matrix, cvs)
+
+
+def _matrix_with_terms(term_weights):
+    """
+    The current matrix, rebuilt if it misses any of the terms. The version
+    of a job post written just now may still be moving when its queued
+    update is read.
+    """
+    job_post_matrix = active_job_post_matrix(current=True)
+    if any(term not in job_post_matrix.vocabulary
+           for weights in term_weights for term in weights):
+        job_post_matrix = active_job_post_matrix(force_rebuild=True)
+    return job_post_matrix
+
+
+def update_job_post_match_scores(job_post_ids, batch_size=CV_BATCH_SIZE):
+    """
+    Recompute the stored matches of the job posts against every CV, in one
+    pass over the CVs with a transaction per batch of them, so no lock is
+    held for long. Scores are only kept above MATCH_SCORE_THRESHOLD, and
+    the CVs that got new ones are trimmed back to their best
+    MATCH_SCORES_PER_CV. Inactive posts just lose their scores.
+    """
+    job_posts = list(JobPost.objects.filter(
+        pk__in=job_post_ids, is_published=True,
+        expiration_date__gte=now().date()))
+    MatchScore.objects.filter(job_post_id__in=set(job_post_ids) - {
+        job_post.pk for job_post in job_posts}).delete()
+    if not job_posts:
+        return
+    terms = [job_post_terms(job_post) for job_post in job_posts]
+    job_post_matrix = _matrix_with_terms(terms)
+    queries = job_post_matrix.vectorize(terms)
+    for cvs in _cvs_in_batches(JobSeekerCv.objects.all(), batch_size):
+        cv_vectors = job_post_matrix.vectorize([cv_terms(cv) for cv in cvs])
+        scores = (cv_vectors @ queries.T).toarray()
+        matches = [
+            MatchScore(job_seeker_cv_id=cv.pk, job_post_id=job_post.pk,
+                       score=float(score))
+            for cv, row in zip(cvs, scores)
+            for job_post, score in zip(job_posts, row)
+            if score > MATCH_SCORE_THRESHOLD
+        ]
+        with transaction.atomic():
+            MatchScore.objects.filter(
+                job_post__in=job_posts, job_seeker_cv__in=cvs).delete()
+            MatchScore.objects.bulk_create(matches, batch_size=1000)
+            _trim_match_scores({match.job_seeker_cv_id for match in matches})
+
+
+def _trim_match_scores(cv_ids):
+    """Delete the matches of the CVs ranked below MATCH_SCORES_PER_CV."""
+    if not cv_ids:
+        return
+    ranked = MatchScore.objects.filter(job_seeker_cv_id__in=cv_ids).annotate(
+        rank=Window(RowNumber(), partition_by='job_seeker_cv_id',
+                    order_by=[F('score').desc(), 'job_post_id']))
+    excess = list(ranked.filter(rank__gt=MATCH_SCORES_PER_CV).values_list(
+        'pk', flat=True))
+    MatchScore.objects.filter(pk__in=excess).delete()
+
+
+def rebuild_match_scores(batch_size=CV_BATCH_SIZE):
+    """Recompute every stored match from a freshly built job post matrix."""
+    job_post_matrix = active_job_post_matrix(force_rebuild=True)
+    total = 0
+    for cvs in _cvs_in_batches(JobSeekerCv.objects.all(), batch_size):
+        _store_cv_scores(job_post_matrix, cvs)
+        total += len(cvs)
+    return total
+
+
+def queue_update(kind, object_id=None):
+    """
+    Mark the scores of a CV or job post, or with kind "all" every score,
+    as out of date, in the current transaction. update_pending() computes
+    them outside the request.
+    """
+    MatchScoreUpdate.objects.create(kind=kind, object_id=object_id)
+
+
+def update_pending(limit=PENDING_BATCH_SIZE):
+    """
+    Work off up to ``limit`` queued updates, oldest first: the job posts
+    against every CV in one pass, then the CVs, or everything when a full
+    rebuild was asked for. Returns the number of queued updates done.
+    """
+    updates = list(MatchScoreUpdate.objects.order_by('id')[:limit])
+    if not updates:
+        return 0
+    ids = defaultdict(set)
+    for update in updates:
+        ids[update.kind].add(update.object_id)
+    if 'all' in ids:
+        rebuild_match_scores()
+    else:
+        if ids['job_post']:
+            update_job_post_match_scores(ids['job_post'])
+        if ids['cv']:
+            update_cvs_match_scores(ids['cv'])
+    # Updates queued in the meantime are left for the next call.
+    MatchScoreUpdate.objects.filter(
+        pk__in=[update.pk for update in updates]).delete()
+    return len(updates)
@@ -0,0 +1,254 @@
+import contextvars
+import copy
+import glob
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Per route and method sums of this process since it started, written to a
+# file of its own in METRICS_DIR every METRICS_FLUSH_INTERVAL seconds so
+# that the metrics endpoint can add up all workers. Files rather than the
+# database, so that recording never adds a query to a request.
+_stats = {}
+_lock = threading.Lock()
+_worker = {'pid': None, 'id': None, 'flushed_at': 0}
+
+# [queries, seconds] of the request being handled. A context variable, so
+# that the ORM calls async views make in other threads count as well.
+_queries = contextvars.ContextVar('metrics_queries', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    queries = _queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - start
+
+
+def install(db_connection):
+    if count_queries not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(count_queries)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install(connection)
+
+
+def worker_id():
+    """Unique per process, also when gunicorn forks a preloaded app."""
+    if _worker['pid'] != os.getpid():
+        _stats.clear()
+        _worker.update(
+            pid=os.getpid(), flushed_at=time.monotonic(), id='%s-%s-%s' % (
+                socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8]))
+    return _worker['id']
+
+
+def _empty():
+    return {'count': 0, 'seconds': 0.0, 'buckets': [0] * len(BUCKETS),
+            'statuses': {}, 'queries': 0, 'query_seconds': 0.0, 'bytes': 0}
+
+
+def route_stats(method, route):
+    """A copy of this process's sums for one route, zeros if it had none."""
+    with _lock:
+        return copy.deepcopy(
+            _stats.get('%s %s' % (method, route)) or _empty())
+
+
+def record(route, method, status, seconds, queries, query_seconds, size):
+    key = '%s %s' % (method, route)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = _empty()
+        stats['count'] += 1
+        stats['seconds'] += seconds
+        bucket = bisect_left(BUCKETS, seconds)
+        if bucket < len(BUCKETS):
+            stats['buckets'][bucket] += 1
+        status = str(status)
+        stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+        stats['queries'] += queries
+        stats['query_seconds'] += query_seconds
+        stats['bytes'] += size
+
+
+def flush_due():
+    return (time.monotonic() - _worker['flushed_at']
+            >= settings.METRICS_FLUSH_INTERVAL)
+
+
+def flush():
+    """Write the sums of this process to its file."""
+    path = os.path.join(settings.METRICS_DIR, '%s.json' % worker_id())
+    _worker['flushed_at'] = time.monotonic()
+    with _lock:
+        data = json.dumps(_stats)
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    # A file per thread, threads of one worker can flush at the same time.
+    temporary = '%s.%s.tmp' % (path, threading.get_ident())
+    with open(temporary, 'w') as file:
+        file.write(data)
+    # Readers see the old or the new file, never half of one.
+    os.replace(temporary, path)
+
+
+def collect():
+    """
+    The sums of all workers, keyed like _stats. Files of workers that
+    stopped more than METRICS_RETENTION_DAYS ago are deleted.
+    """
+    totals = {}
+    cutoff = time.time() - settings.METRICS_RETENTION_DAYS * 86400
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                continue
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for key, stats in data.items():
+            total = totals.setdefault(key, _empty())
+            for field in ('count', 'seconds', 'queries', 'query_seconds',
+                          'bytes'):
+                total[field] += stats[field]
+            for index, count in enumerate(stats['buckets']):
+                total['buckets'][index] += count
+            for status, count in stats['statuses'].items():
+                total['statuses'][status] = (
+                    total['statuses'].get(status, 0) + count)
+    return totals
+
+
+def _labels(key, **extra):
+    method, route = key.split(' ', 1)
+    labels = {'method': method, 'route': route, **extra}
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, value.replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels.items())
+
+
+def render(totals):
+    """Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append('# HELP job_match_%s %s' % (name, help_text))
+        lines.append('# TYPE job_match_%s %s' % (name, kind))
+        for suffix, labels, value in samples:
+            lines.append('job_match_%s%s%s %s' % (
+                name, suffix, labels, repr(value)))
+
+    keys = sorted(totals)
+    metric('requests_total', 'counter', 'Requests by route and status.', [
+        ('', _labels(key, status=status), count)
+        for key in keys
+        for status, count in sorted(totals[key]['statuses'].items())])
+    duration = []
+    for key in keys:
+        stats = totals[key]
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats['buckets']):
+            cumulative += count
+            duration.append(
+                ('_bucket', _labels(key, le=repr(float(bound))), cumulative))
+        duration.append(('_bucket', _labels(key, le='+Inf'), stats['count']))
+        duration.append(('_sum', _labels(key), stats['seconds']))
+        duration.append(('_count', _labels(key), stats['count']))
+    metric('request_duration_seconds', 'histogram',
+           'Time spent handling a request.', duration)
+    metric('db_queries_total', 'counter', 'Database queries run.', [
+        ('', _labels(key), totals[key]['queries']) for key in keys])
+    metric('db_query_seconds_total', 'counter',
+           'Time spent in database queries.', [
+               ('', _labels(key), totals[key]['query_seconds'])
+               for key in keys])
+    metric('response_bytes_total', 'counter', 'Response body bytes sent.', [
+        ('', _labels(key), totals[key]['bytes']) for key in keys])
+    return '\n'.join(lines) + '\n'
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    # Unresolved paths share one label, so that scans for random URLs do
+    # not add a time series each.
+    return match.route if match is not None else '<unmatched>'
+
+
+def _size(response):
+    # Streamed bodies are not counted, measuring them would mean wrapping
+    # the stream.
+    return 0 if response.streaming else len(response.content)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, the database queries and the response size of every
+    request per route. Put it first in MIDDLEWARE to time the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        worker_id()
+        install(connection)
+        queries = [0, 0.0]
+        token = _queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _queries.reset(token)
+        record(_route(request), request.method, response.status_code,
+               time.perf_counter() - start, queries[0], queries[1],
+               _size(response))
+        if flush_due():
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        worker_id()
+        queries = [0, 0.0]
+        token = _queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _queries.reset(token)
+        record(_route(request), request.method, response.status_code,
+               time.perf_counter() - start, queries[0], queries[1],
+               _size(response))
+        if flush_due():
+            await sync_to_async(flush)()
+        return response
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:54
+
+import re
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of the tokenizer in search.py as it was when this
+# migration was written, so later changes to search.py cannot change (or
+# break) what this migration does.
+FIELD_WEIGHTS = {
+    'job_post_title': 3,
+    'company_name': 2,
+    'location': 2,
+    'job_description': 1,
+}
+
+STOP_WORDS = {
+    'alla', 'att', 'av', 'de', 'den', 'det', 'du', 'en', 'er', 'ett',
+    'for', 'fran', 'har', 'hos', 'i', 'inom', 'ja', 'kan', 'med', 'men',
+    'mot', 'nar', 'och', 'om', 'pa', 'sa', 'sin', 'ska', 'som', 'till',
+    'under', 'vi', 'vid', 'ar', 'the', 'and', 'of', 'to', 'in',
+}
+
+TERM_MAX_LENGTH = 50
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def job_post_terms(post):
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for token in re.findall(r'\w+', fold(post[field] or '')):
+            if len(token) > 1 and token not in STOP_WORDS:
+                weights[token[:TERM_MAX_LENGTH]] += field_weight
+    return weights
+
+
+def index_existing_job_posts(apps, schema_editor):
+    JobPost = apps.get_model('job_match_backend_app', 'JobPost')
+    JobPostSearchTerm = apps.get_model(
+        'job_match_backend_app', 'JobPostSearchTerm')
+    rows = []
+    for post in JobPost.objects.values('id', *FIELD_WEIGHTS).iterator():
+        rows.extend(
+            JobPostSearchTerm(job_post_id=post['id'], term=term, weight=weight)
+            for term, weight in job_post_terms(post).items())
+    JobPostSearchTerm.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobPostSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('job_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='job_match_backend_app.jobpost')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'job_post', 'weight'], name='search_term_post_idx')],
+            },
+        ),
+        migrations.RunPython(
+            index_existing_job_posts, migrations.RunPython.noop),
+    ]
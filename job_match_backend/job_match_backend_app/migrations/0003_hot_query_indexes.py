@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:16
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_applications(apps, schema_editor):
+    # Keep the first application per (profile, job post) so that the
+    # unique constraint below can be created.
+    Application = apps.get_model('job_match_backend_app', 'Application')
+    duplicates = (
+        Application.objects.values('profile_id', 'job_post')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1))
+    for duplicate in duplicates:
+        Application.objects.filter(
+            profile_id=duplicate['profile_id'],
+            job_post=duplicate['job_post'],
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0002_job_post_search_term'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['profile_id', 'application_date', 'id'], name='application_profile_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['expiration_date', 'id'], name='jobpost_active_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=models.Index(fields=['job_post', 'expiration_date', 'id'], name='jobpost_employer_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_applications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='application',
+            constraint=models.UniqueConstraint(fields=('profile_id', 'job_post'), name='unique_application_per_job_post'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('job_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_scores', to='job_match_backend_app.jobpost')),
+                ('job_seeker_cv', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_scores', to='job_match_backend_app.jobseekercv')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_seeker_cv', '-score'], name='match_score_cv_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job_seeker_cv', 'job_post'), name='unique_match_score')],
+            },
+        ),
+    ]
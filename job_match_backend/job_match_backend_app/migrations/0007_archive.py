@@ -0,0 +1,71 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0006_outbound_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('application_date', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedJobPost',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('job_post_title', models.CharField(max_length=50)),
+                ('company_name', models.CharField(max_length=50)),
+                ('location', models.CharField(max_length=50)),
+                ('employment_type', models.CharField(choices=[('Tillsvidareanställning', 'Tillsvidareanställning'), ('Provanställning', 'Provanställning'), ('Deltid', 'Deltid')], max_length=22)),
+                ('job_description', models.CharField(max_length=1000)),
+                ('phone_number', models.CharField(max_length=10)),
+                ('expiration_date', models.DateField()),
+                ('is_published', models.BooleanField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=models.Index(fields=['expiration_date', 'id'], name='jobpost_expiration_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='job_seeker_cv',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to='job_match_backend_app.jobseekercv'),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='profile_id',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedjobpost',
+            name='job_post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_posts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='job_post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='job_match_backend_app.archivedjobpost'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedjobpost',
+            index=models.Index(fields=['job_post', 'expiration_date', 'id'], name='archived_jobpost_employer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedjobpost',
+            index=models.Index(fields=['archived_at'], name='archived_jobpost_age_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:56
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_applications(apps, schema_editor):
+    Application = apps.get_model('job_match_backend_app', 'Application')
+    JobPost = apps.get_model('job_match_backend_app', 'JobPost')
+    applications = Application.objects.filter(
+        job_post=OuterRef('pk')).order_by().values('job_post')
+    JobPost.objects.update(
+        application_count=Coalesce(Subquery(
+            applications.annotate(count=Count('id')).values('count')), 0),
+        last_application_at=Subquery(
+            applications.annotate(latest=Max('application_date'))
+            .values('latest')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0007_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobpost',
+            name='application_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='last_application_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_job_posts(apps, schema_editor):
+    JobPost = apps.get_model('job_match_backend_app', 'JobPost')
+    JobPostFacet = apps.get_model('job_match_backend_app', 'JobPostFacet')
+    JobPostFacet.objects.bulk_create([
+        JobPostFacet(**row) for row in JobPost.objects.filter(
+            is_published=True,
+        ).values('location', 'employment_type', 'expiration_date').annotate(
+            count=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0008_application_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobPostFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=50)),
+                ('employment_type', models.CharField(choices=[('Tillsvidareanställning', 'Tillsvidareanställning'), ('Provanställning', 'Provanställning'), ('Deltid', 'Deltid')], max_length=22)),
+                ('expiration_date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('expiration_date', 'location', 'employment_type'), name='unique_job_post_facet')],
+            },
+        ),
+        migrations.RunPython(count_job_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0009_job_post_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchScoreUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('cv', 'CV'), ('job_post', 'Job post'), ('all', 'All')], max_length=10)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    OutboundEmail = apps.get_model('job_match_backend_app', 'OutboundEmail')
+    OutboundEmail.objects.exclude(status='pending').update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_match_backend_app', '0010_match_score_update'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, migrations.RunPython.noop),
+    ]
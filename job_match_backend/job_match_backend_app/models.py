@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.contrib.auth.base_user import BaseUserManager
+from django.utils import timezone
 
 from job_match_backend_project import settings
 from .choices import *
@@ -43,6 +44,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class JobPostQuerySet(models.QuerySet):
+    def with_applicants(self):
+        return self.prefetch_related(
+            models.Prefetch(
+                'job_applications',
+                queryset=Application.objects.with_cv()))
+
+
 class JobPost(models.Model):
     job_post = models.ForeignKey(
         CustomUser,
@@ -56,11 +65,41 @@ class JobPost(models.Model):
     phone_number = models.CharField(max_length=10)
     expiration_date = models.DateField()
     is_published = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Kept up to date by the Application signals, see application_counts.py.
+    application_count = models.PositiveIntegerField(default=0)
+    last_application_at = models.DateTimeField(null=True, blank=True)
     applications = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         through='Application',
         related_name='job_applications')
 
+    objects = JobPostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Job seeker feed: published, not expired, keyset ordered.
+            models.Index(
+                fields=['expiration_date', 'id'],
+                condition=models.Q(is_published=True),
+                name='jobpost_active_feed_idx'),
+            # Employer listing, keyset ordered.
+            models.Index(
+                fields=['job_post', 'expiration_date', 'id'],
+                name='jobpost_employer_idx'),
+            # The archive sweeper looks for long expired posts.
+            models.Index(
+                fields=['expiration_date', 'id'],
+                name='jobpost_expiration_idx'),
+        ]
+
+
+class ApplicationQuerySet(models.QuerySet):
+    def with_cv(self):
+        return self.select_related('job_seeker_cv').prefetch_related(
+            'job_seeker_cv__work_experiences',
+            'job_seeker_cv__educations')
+
 
 class Application(models.Model):
     profile_id = models.ForeignKey(
@@ -76,6 +115,21 @@ class Application(models.Model):
         on_delete=models.CASCADE,
         related_name='applications')
     application_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ApplicationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile_id', 'job_post'],
+                name='unique_application_per_job_post'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['profile_id', 'application_date', 'id'],
+                name='application_profile_date_idx'),
+        ]
 
 
 class JobSeekerCv(models.Model):
@@ -85,6 +139,7 @@ class JobSeekerCv(models.Model):
         related_name='job_seeker_profile')
     email = models.EmailField(unique=True)
     mobile_number = models.CharField(max_length=30)
+    updated_at = models.DateTimeField(auto_now=True)
     applied_profiles = models.ManyToManyField(
         JobPost, related_name='applicants')
 
@@ -110,3 +165,159 @@ class Education(models.Model):
     orientation = models.CharField(max_length=50)
     description = models.CharField(max_length=500)
     years = models.CharField(max_length=10, null=True)
+
+
+class JobPostSearchTerm(models.Model):
+    job_post = models.ForeignKey(
+        JobPost,
+        on_delete=models.CASCADE,
+        related_name='search_terms')
+    term = models.CharField(max_length=50)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'job_post', 'weight'],
+                         name='search_term_post_idx'),
+        ]
+
+
+class JobPostFacet(models.Model):
+    """
+    Number of published job posts per location, employment type and
+    expiration date, maintained by facets.py.
+    """
+    location = models.CharField(max_length=50)
+    employment_type = models.CharField(
+        choices=EMPLOYMENT_TYPES, max_length=22)
+    expiration_date = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['expiration_date', 'location', 'employment_type'],
+                name='unique_job_post_facet'),
+        ]
+
+
+class MatchScore(models.Model):
+    job_seeker_cv = models.ForeignKey(
+        JobSeekerCv,
+        on_delete=models.CASCADE,
+        related_name='match_scores')
+    job_post = models.ForeignKey(
+        JobPost,
+        on_delete=models.CASCADE,
+        related_name='match_scores')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job_seeker_cv', 'job_post'],
+                name='unique_match_score'),
+        ]
+        indexes = [
+            models.Index(fields=['job_seeker_cv', '-score'],
+                         name='match_score_cv_idx'),
+        ]
+
+
+class MatchScoreUpdate(models.Model):
+    """
+    A CV or job post whose match scores are out of date, or with kind
+    "all" every score. Written in the transaction that changes the row and
+    worked off by the update_match_scores command.
+    """
+    kind = models.CharField(choices=MATCH_SCORE_UPDATE_KINDS, max_length=10)
+    object_id = models.PositiveIntegerField(blank=True, null=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+
+class OutboundEmail(models.Model):
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True, null=True)
+    to = models.EmailField()
+    status = models.CharField(
+        choices=EMAIL_STATUSES, max_length=10, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # The sender polls for due pending mails.
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return '%s to %s (%s)' % (self.subject, self.to, self.status)
+
+
+class ArchivedJobPostQuerySet(models.QuerySet):
+    def with_applicants(self):
+        return self.prefetch_related(
+            models.Prefetch(
+                'applications',
+                queryset=ArchivedApplication.objects.select_related(
+                    'job_seeker_cv').prefetch_related(
+                    'job_seeker_cv__work_experiences',
+                    'job_seeker_cv__educations')))
+
+
+class ArchivedJobPost(models.Model):
+    """A JobPost moved out of the hot table after it expired."""
+    # The id it had as a JobPost.
+    id = models.BigIntegerField(primary_key=True)
+    job_post = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='archived_job_posts')
+    job_post_title = models.CharField(max_length=50)
+    company_name = models.CharField(max_length=50)
+    location = models.CharField(max_length=50)
+    employment_type = models.CharField(choices=EMPLOYMENT_TYPES, max_length=22)
+    job_description = models.CharField(max_length=1000)
+    phone_number = models.CharField(max_length=10)
+    expiration_date = models.DateField()
+    is_published = models.BooleanField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = ArchivedJobPostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['job_post', 'expiration_date', 'id'],
+                name='archived_jobpost_employer_idx'),
+            models.Index(
+                fields=['archived_at'],
+                name='archived_jobpost_age_idx'),
+        ]
+
+
+class ArchivedApplication(models.Model):
+    """An Application to a job post that has been archived."""
+    # The id it had as an Application.
+    id = models.BigIntegerField(primary_key=True)
+    profile_id = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_applications')
+    job_post = models.ForeignKey(
+        ArchivedJobPost,
+        on_delete=models.CASCADE,
+        related_name='applications')
+    job_seeker_cv = models.ForeignKey(
+        JobSeekerCv,
+        on_delete=models.CASCADE,
+        related_name='archived_applications')
+    application_date = models.DateTimeField()
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import OutboundEmail
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# A claimed mail is not picked up by another sender for this long, so a
+# sender that dies mid-batch only delays its mails.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def queue_email(subject, body, to, from_email=None):
+    """Store a mail for the sender (see send_outbox) and return at once."""
+    return OutboundEmail.objects.create(
+        subject=subject, body=body, to=to, from_email=from_email)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30 s, 1 min, 2 min, ... capped at one hour."""
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim_due(batch_size=BATCH_SIZE):
+    """
+    Claim up to ``batch_size`` due mails by moving their next attempt past
+    CLAIM_TIMEOUT. Rows locked by another sender are skipped (on databases
+    that support it), so several senders can run side by side.
+    """
+    with transaction.atomic():
+        emails = list(OutboundEmail.objects.select_for_update(
+            skip_locked=True).filter(
+            status='pending', next_attempt_at__lte=now(),
+        ).order_by('next_attempt_at', 'id')[:batch_size])
+        OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in emails],
+        ).update(next_attempt_at=now() + CLAIM_TIMEOUT)
+    return emails
+
+
+def send_pending(batch_size=BATCH_SIZE):
+    """
+    Deliver one batch of due mails over a single SMTP connection and record
+    the outcome of each. Returns ``(sent, failed)`` counts; failed mails
+    are retried with backoff until MAX_ATTEMPTS.
+    """
+    emails = claim_due(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to],
+                connection=connection)
+            try:
+                # Opens the connection if it is not (or no longer) open.
+                connection.open()
+                message.send()
+            except Exception as error:
+                # The connection may be broken, start a new one for the
+                # next mail.
+                connection.close()
+                record_failure(email, error)
+                failed += 1
+            else:
+                record_success(email)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+# The body of a mail may hold a password reset link. It is cleared once
+# the mail will not be sent again, only the subject and status are kept.
+
+def record_success(email):
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status='sent', sent_at=now(), attempts=email.attempts + 1,
+        last_error='', body='')
+
+
+def record_failure(email, error):
+    attempts = email.attempts + 1
+    fields = {'status': 'pending'}
+    if attempts >= MAX_ATTEMPTS:
+        fields = {'status': 'failed', 'body': ''}
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        attempts=attempts,
+        next_attempt_at=now() + retry_delay(attempts),
+        last_error='%s: %s' % (type(error).__name__, error),
+        **fields)
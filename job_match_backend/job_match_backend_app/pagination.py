@@ -0,0 +1,177 @@
+import json
+from base64 import b64decode, b64encode
+from bisect import bisect_right
+from datetime import date, datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique ordering key such as
+    ``('expiration_date', 'id')``. The cursor is the key of the last row on
+    the page, so every page is a single indexed range query no matter how
+    far into the result the client is.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    disable_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('id',)):
+        self.ordering = tuple(ordering)
+
+    def is_disabled(self, request):
+        value = request.query_params.get(self.disable_query_param, '')
+        return value.lower() in ('false', '0', 'no')
+
+    @property
+    def fields(self):
+        """The names of the ordering fields, without direction."""
+        return tuple(field.lstrip('-') for field in self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.PAGE_SIZE
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views."""
+        return self.set_page(
+            [row async for row in self.page_queryset(queryset, request)])
+
+    def paginate_rows(self, rows, queryset, request, exclude_ids=()):
+        """
+        paginate_queryset() for dicts that are already sorted on an
+        ascending ``ordering``, such as the cached feed. The page starts
+        after the cursor by bisection, and rows whose id is in
+        ``exclude_ids`` are skipped. ``queryset`` gives the field types
+        the cursor is checked against.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        def key(row):
+            return [row[field] for field in self.fields]
+
+        start = 0
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.clean_cursor(queryset, self.decode_cursor(cursor))
+            # The rows hold dates as serialized, in ISO format.
+            start = bisect_right(rows, [
+                value.isoformat() if isinstance(value, (date, datetime))
+                else value for value in values], key=key)
+        page = []
+        for row in islice(rows, start, None):
+            if row['id'] not in exclude_ids:
+                page.append(row)
+                if len(page) > self.page_size:
+                    break
+        return self.set_page(page)
+
+    def page_queryset(self, queryset, request):
+        """The query for the requested page plus one row to see if more."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.clean_cursor(queryset, self.decode_cursor(cursor))
+            queryset = queryset.filter(self.after(values))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def after(self, values):
+        """Build the lexicographic "row comes after ``values``" filter."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            equal = {
+                prior.lstrip('-'): values[position]
+                for position, prior in enumerate(self.ordering[:index])
+            }
+            condition |= Q(**equal, **{name + lookup: values[index]})
+        return condition
+
+    def encode_cursor(self, row):
+        values = []
+        for field in self.fields:
+            # Rows are model instances or values() dicts.
+            if isinstance(row, dict):
+                value = row[field]
+            else:
+                value = getattr(row, field)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return b64encode(json.dumps(values).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        try:
+            values = json.loads(b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def clean_cursor(self, queryset, values):
+        """
+        Convert the cursor values to the types of the ordering fields, or
+        annotations, of ``queryset``. A value that does not fit is an
+        invalid cursor rather than a database error.
+        """
+        cleaned = []
+        for name, value in zip(self.fields, values):
+            annotation = queryset.query.annotations.get(name)
+            field = (annotation.output_field if annotation is not None
+                     else queryset.model._meta.get_field(name))
+            try:
+                if value is None:
+                    raise ValidationError('null')
+                cleaned.append(field.clean(value, None))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class RankedPagination(PageNumberPagination):
+    """Page numbers for lists that are ranked in memory, not in the DB."""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        self.page_size = settings.PAGE_SIZE
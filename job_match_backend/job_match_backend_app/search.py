@@ -0,0 +1,148 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .models import JobPost, JobPostSearchTerm
+
+# Field weights used when a term is found in a job post. A hit in the
+# title says more about the post than a hit somewhere in the description.
+FIELD_WEIGHTS = {
+    'job_post_title': 3,
+    'company_name': 2,
+    'location': 2,
+    'job_description': 1,
+}
+
+STOP_WORDS = {
+    'alla', 'att', 'av', 'de', 'den', 'det', 'du', 'en', 'er', 'ett',
+    'for', 'fran', 'har', 'hos', 'i', 'inom', 'ja', 'kan', 'med', 'men',
+    'mot', 'nar', 'och', 'om', 'pa', 'sa', 'sin', 'ska', 'som', 'till',
+    'under', 'vi', 'vid', 'ar', 'the', 'and', 'of', 'to', 'in',
+}
+
+TERM_MAX_LENGTH = 50
+INDEX_BATCH_SIZE = 500
+
+_token_pattern = re.compile(r'\w+')
+
+# Fast path for the letters that actually occur in Swedish job ads; any
+# other non-ASCII text goes through Unicode decomposition.
+_swedish_letters = (('å', 'a'), ('ä', 'a'), ('ö', 'o'), ('é', 'e'))
+
+
+def fold(text):
+    """Lowercase and strip diacritics so that å/ä fold to a and ö to o."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    for letter, replacement in _swedish_letters:
+        text = text.replace(letter, replacement)
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return [
+        token[:TERM_MAX_LENGTH]
+        for token in _token_pattern.findall(fold(text or ''))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def job_post_terms(job_post):
+    """Return a Counter of term -> weight for a job post (or a dict)."""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        value = (job_post[field] if isinstance(job_post, dict)
+                 else getattr(job_post, field))
+        for token in tokenize(value):
+            weights[token] += field_weight
+    return weights
+
+
+def _search_term_rows(job_post_id, job_post):
+    return [(job_post_id, term, weight)
+            for term, weight in job_post_terms(job_post).items()]
+
+
+def _insert_search_terms(rows):
+    """
+    Insert ``(job_post_id, term, weight)`` rows. Does what bulk_create
+    would, without building a model instance for each of the hundreds of
+    thousands of rows an import or a rebuild writes.
+    """
+    table = connection.ops.quote_name(JobPostSearchTerm._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INDEX_BATCH_SIZE):
+            batch = rows[start:start + INDEX_BATCH_SIZE]
+            cursor.execute(
+                'INSERT INTO %s (job_post_id, term, weight) VALUES %s' % (
+                    table, ', '.join(['(%s, %s, %s)'] * len(batch))),
+                [value for row in batch for value in row])
+
+
+def index_job_post(job_post):
+    JobPostSearchTerm.objects.filter(job_post=job_post).delete()
+    _insert_search_terms(_search_term_rows(job_post.pk, job_post))
+
+
+def index_job_posts(job_posts):
+    """Index many job posts at once, replacing any existing entries."""
+    job_posts = list(job_posts)
+    JobPostSearchTerm.objects.filter(
+        job_post__in=[post.pk for post in job_posts]).delete()
+    rows = []
+    for job_post in job_posts:
+        rows.extend(_search_term_rows(job_post.pk, job_post))
+    _insert_search_terms(rows)
+
+
+def rebuild_search_index(chunk_size=2000):
+    JobPostSearchTerm.objects.all().delete()
+    fields = ['id', *FIELD_WEIGHTS]
+    rows = []
+    for post in JobPost.objects.values(*fields).iterator(
+            chunk_size=chunk_size):
+        rows.extend(_search_term_rows(post['id'], post))
+        if len(rows) >= chunk_size * 10:
+            _insert_search_terms(rows)
+            rows = []
+    _insert_search_terms(rows)
+
+
+def search_job_posts(queryset, query):
+    """
+    Restrict a JobPost queryset to posts matching any term of the query and
+    annotate them with a ``search_rank`` (weighted tf * idf), best first.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return queryset.none()
+
+    document_frequencies = dict(
+        JobPostSearchTerm.objects.filter(term__in=terms)
+        .values_list('term')
+        .annotate(df=Count('job_post')))
+    if not document_frequencies:
+        return queryset.none()
+
+    total = JobPost.objects.count() or 1
+    rank = Sum(
+        Case(
+            *[When(search_terms__term=term,
+                   then=F('search_terms__weight') * Value(
+                       math.log(1 + total / df)))
+              for term, df in document_frequencies.items()],
+            default=Value(0.0),
+            output_field=FloatField()))
+
+    return (queryset
+            .filter(search_terms__term__in=list(document_frequencies))
+            .annotate(search_rank=rank)
+            .order_by('-search_rank', 'id'))
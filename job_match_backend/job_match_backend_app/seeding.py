@@ -0,0 +1,193 @@
+import multiprocessing
+import random
+
+import django
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from . import (application_counts, autocomplete, facets, feed, matching,
+               search, synthetic)
+from .models import (Application, CustomUser, Education, JobPost,
+                     JobSeekerCv, WorkExperince)
+
+# Rows generated and inserted per task, one transaction each.
+BATCH_SIZE = 5000
+
+
+def email(prefix, kind, index):
+    return '%s-%s-%s@example.com' % (prefix, kind, index)
+
+
+class Plan:
+    """
+    What to generate and the primary keys it gets. The keys are assigned up
+    front, from the highest one in use, so that the tasks can reference
+    rows other tasks create without looking them up, and so that the same
+    seed gives the same rows however the tasks are spread over processes.
+    Employer i is user ``first_user + i``, job seeker i is user
+    ``first_user + employers + i`` and CV ``first_cv + i``, job post i is
+    ``first_job_post + i``.
+    """
+
+    def __init__(self, prefix, employers, job_seekers, job_posts,
+                 applications, password, seed):
+        self.prefix = prefix
+        self.employers = employers
+        self.job_seekers = job_seekers
+        self.job_posts = job_posts
+        self.applications = applications
+        self.password = password
+        self.seed = seed
+        self.first_user = next_id(CustomUser)
+        self.first_cv = next_id(JobSeekerCv)
+        self.first_job_post = next_id(JobPost)
+
+    def rng(self, kind, start):
+        # Seeded per task, so a task's rows do not depend on the others.
+        return random.Random('%s:%s:%s' % (self.seed, kind, start))
+
+    def applications_of(self, job_seeker):
+        count, extra = divmod(self.applications, self.job_seekers)
+        return min(count + (job_seeker < extra), self.job_posts)
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+def create_employers(plan, start, stop):
+    rng = plan.rng('employers', start)
+    return CustomUser.objects.bulk_create([
+        CustomUser(id=plan.first_user + index, is_ag=True,
+                   email=email(plan.prefix, 'employer', index),
+                   password=plan.password,
+                   org_number='55%08d' % rng.randrange(10 ** 8),
+                   **synthetic.user_fields(rng))
+        for index in range(start, stop)])
+
+
+def create_job_seekers(plan, start, stop):
+    """Job seekers with a CV of one to three jobs and one or two schools."""
+    rng = plan.rng('job_seekers', start)
+    users = CustomUser.objects.bulk_create([
+        CustomUser(id=plan.first_user + plan.employers + index,
+                   email=email(plan.prefix, 'seeker', index),
+                   password=plan.password, **synthetic.user_fields(rng))
+        for index in range(start, stop)])
+    cvs = JobSeekerCv.objects.bulk_create([
+        JobSeekerCv(id=plan.first_cv + index, profile=user, email=user.email,
+                    mobile_number=user.mobile_number)
+        for index, user in zip(range(start, stop), users)])
+    WorkExperince.objects.bulk_create([
+        WorkExperince(job_seeker=cv,
+                      **synthetic.work_experience_fields(rng))
+        for cv in cvs for _ in range(rng.randint(1, 3))])
+    Education.objects.bulk_create([
+        Education(job_seeker=cv, **synthetic.education_fields(rng))
+        for cv in cvs for _ in range(rng.randint(1, 2))])
+    return users
+
+
+def create_job_posts(plan, start, stop):
+    """Job posts spread evenly over the employers, search indexed."""
+    rng = plan.rng('job_posts', start)
+    job_posts = JobPost.objects.bulk_create([
+        JobPost(id=plan.first_job_post + index,
+                job_post_id=plan.first_user
+                + index * plan.employers // plan.job_posts,
+                **synthetic.job_post_fields(rng))
+        for index in range(start, stop)])
+    search.index_job_posts(job_posts)
+    return job_posts
+
+
+def create_applications(plan, start, stop):
+    """The applications of job seekers ``start`` to ``stop``."""
+    rng = plan.rng('applications', start)
+    return Application.objects.bulk_create([
+        Application(profile_id_id=plan.first_user + plan.employers + index,
+                    job_seeker_cv_id=plan.first_cv + index,
+                    job_post_id=plan.first_job_post + job_post)
+        for index in range(start, stop)
+        for job_post in rng.sample(
+            range(plan.job_posts), plan.applications_of(index))
+    ], batch_size=BATCH_SIZE)
+
+
+TASKS = {
+    'employers': create_employers,
+    'job_seekers': create_job_seekers,
+    'job_posts': create_job_posts,
+    'applications': create_applications,
+}
+
+
+def run_task(task):
+    name, plan, start, stop = task
+    with transaction.atomic():
+        return name, len(TASKS[name](plan, start, stop))
+
+
+def start_worker(database):
+    # Needed where processes are spawned rather than forked.
+    django.setup()
+    settings.DATABASES['default'].update(database)
+    connection.settings_dict.update(database)
+
+
+def seed(prefix, employers, job_seekers, job_posts, applications, password,
+         seed=1, processes=1, batch_size=BATCH_SIZE, progress=None):
+    """
+    Generate the users, CVs, job posts and applications with bulk inserts
+    of ``batch_size`` rows, on ``processes`` processes, and bring the
+    tables derived from them up to date. The users share ``password``, an
+    already hashed password. ``progress(name, rows)`` is called with the
+    number of rows of each task. Returns the number of rows per name in
+    TASKS.
+    """
+    plan = Plan(prefix, employers, job_seekers, job_posts, applications,
+                password, seed)
+    # The job posts reference the users and the applications all three,
+    # so each phase waits for the ones before it.
+    phases = [
+        [('employers', employers), ('job_seekers', job_seekers)],
+        [('job_posts', job_posts)],
+        [('applications', job_seekers if job_posts else 0)],
+    ]
+    created = dict.fromkeys(TASKS, 0)
+    pool = None
+    if processes > 1:
+        # Forked children must not share the parent's connection.
+        connections.close_all()
+        pool = multiprocessing.Pool(
+            processes, initializer=start_worker,
+            initargs=(dict(settings.DATABASES['default']),))
+    try:
+        for phase in phases:
+            tasks = [(name, plan, start, min(start + batch_size, total))
+                     for name, total in phase
+                     for start in range(0, total, batch_size)]
+            results = (pool.imap_unordered(run_task, tasks) if pool
+                       else map(run_task, tasks))
+            for name, rows in results:
+                created[name] += rows
+                if progress:
+                    progress(name, rows)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    # The keys were set explicitly, move the sequences past them.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), [CustomUser, JobSeekerCv, JobPost]):
+            cursor.execute(sql)
+    application_counts.repair_application_counts()
+    facets.rebuild_facets()
+    feed.job_posts_changed()
+    autocomplete.job_posts_changed()
+    matching.job_posts_changed()
+    return created
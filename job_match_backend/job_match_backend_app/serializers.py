@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import *
 from django.contrib.auth.hashers import make_password
+from . import applying, cv_documents
 
 
 class WorkExperinceSerializer(serializers.ModelSerializer):
@@ -56,6 +57,80 @@ class JobSeekerCVSerializer(serializers.ModelSerializer):
         return instance
 
 
+class CvWorkExperienceSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = WorkExperince
+        fields = [
+            'id',
+            'occupation_title',
+            'company_name',
+            'years',
+            'description']
+
+
+class CvEducationSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Education
+        fields = [
+            'id',
+            'school_name',
+            'level',
+            'orientation',
+            'description',
+            'years']
+
+
+class JobSeekerCvDocumentSerializer(serializers.ModelSerializer):
+    """
+    The whole CV as one writable document. The lists replace the current
+    items: send ``id`` to keep (and update) an item, leave it out for a
+    new one. The CV's items must be prefetched.
+    """
+    work_experiences = CvWorkExperienceSerializer(many=True)
+    educations = CvEducationSerializer(many=True)
+
+    class Meta:
+        model = JobSeekerCv
+        fields = [
+            'email',
+            'mobile_number',
+            'work_experiences',
+            'educations']
+
+    def validate(self, data):
+        errors = {}
+        for relation in cv_documents.ITEM_MODELS:
+            ids = {item.pk for item in getattr(self.instance, relation).all()}
+            child = self.fields[relation].child
+            required = [name for name, field in child.fields.items()
+                        if field.required]
+            item_errors = []
+            for item in data.get(relation, []):
+                if 'id' in item:
+                    valid = item['id'] in ids
+                    ids.discard(item['id'])
+                    item_errors.append(
+                        {} if valid else {'id': ['Not an item of this CV.']})
+                else:
+                    # A PATCH may leave fields of existing items out, but
+                    # not of new ones.
+                    item_errors.append({
+                        name: [child.fields[name].error_messages['required']]
+                        for name in required if name not in item})
+            if any(item_errors):
+                errors[relation] = item_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+    def update(self, instance, validated_data):
+        return cv_documents.save_cv(instance, validated_data)
+
+
 class ApplicationSerializer(serializers.ModelSerializer):
     job_seeker_cv = JobSeekerCVSerializer(read_only=True)
 
@@ -65,6 +140,13 @@ class ApplicationSerializer(serializers.ModelSerializer):
                   'job_seeker_cv']
 
 
+class RankedApplicationSerializer(ApplicationSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(ApplicationSerializer.Meta):
+        fields = ApplicationSerializer.Meta.fields + ['score']
+
+
 class JobPostSerializer(serializers.ModelSerializer):
     expiration_date = serializers.DateField(
         format="%Y-%m-%d", input_formats=["%Y-%m-%d"])
@@ -92,6 +174,36 @@ class JobPostSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ArchivedApplicationSerializer(serializers.ModelSerializer):
+    job_seeker_cv = JobSeekerCVSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedApplication
+        fields = ['profile_id',
+                  'job_seeker_cv',
+                  'application_date']
+
+
+class ArchivedJobPostSerializer(serializers.ModelSerializer):
+    expiration_date = serializers.DateField(format="%Y-%m-%d")
+    applications = ArchivedApplicationSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedJobPost
+        fields = [
+            'id',
+            'job_post_title',
+            'company_name',
+            'location',
+            'employment_type',
+            'job_description',
+            'phone_number',
+            'expiration_date',
+            'is_published',
+            'archived_at',
+            'applications']
+
+
 class AvailableJobPostsSerializer(serializers.ModelSerializer):
     expiration_date = serializers.DateField(
         format="%Y-%m-%d", input_formats=["%Y-%m-%d"])
@@ -114,6 +226,13 @@ class AvailableJobPostsSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class RecommendedJobPostSerializer(AvailableJobPostsSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(AvailableJobPostsSerializer.Meta):
+        fields = AvailableJobPostsSerializer.Meta.fields + ['score']
+
+
 class CustomUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
@@ -164,6 +283,14 @@ class SimplifiedJobPostSerializer(serializers.ModelSerializer):
         ]
 
 
+class JobPostSummarySerializer(SimplifiedJobPostSerializer):
+    """A job post with its applicant counts instead of the applicants."""
+
+    class Meta(SimplifiedJobPostSerializer.Meta):
+        fields = SimplifiedJobPostSerializer.Meta.fields + [
+            'application_count', 'last_application_at']
+
+
 class ApplicationsSerializer(serializers.ModelSerializer):
     job_post = SimplifiedJobPostSerializer(read_only=True)
     id = serializers.IntegerField(source='job_post.id', read_only=True)
@@ -171,3 +298,9 @@ class ApplicationsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Application
         fields = ['id', 'job_post']
+
+
+class BatchApplicationSerializer(serializers.Serializer):
+    job_post_ids = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1,
+        max_length=applying.MAX_BATCH_SIZE)
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from .models import (Application, CustomUser, Education, JobPost,
+                     JobSeekerCv, WorkExperince)
+from . import (application_counts, archive, authentication, autocomplete,
+               cv_documents, facets, feed, matching, search)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+# The JobPost fields the facets and the typeahead index are keyed on. A
+# save reads their stored values first, so both can drop the old ones.
+INDEXED_FIELDS = ['is_published', 'expiration_date', 'location',
+                  'employment_type', 'job_post_title']
+
+
+def indexed_values(job_post):
+    return {field: getattr(job_post, field) for field in INDEXED_FIELDS}
+
+
+@receiver(pre_save, sender=JobPost)
+def job_post_saving(sender, instance, **kwargs):
+    instance._saved_values = None
+    if not instance._state.adding:
+        instance._saved_values = JobPost.objects.filter(
+            pk=instance.pk).values(*INDEXED_FIELDS).first()
+
+
+@receiver(post_save, sender=JobPost)
+def job_post_saved(sender, instance, **kwargs):
+    old, new = instance._saved_values, indexed_values(instance)
+    facets.count_job_posts(added=[new], removed=[old])
+    search.index_job_post(instance)
+    # The feed and the matrix are rebuilt from what is committed, so the
+    # new versions must not be seen before the post is.
+    transaction.on_commit(feed.job_posts_changed)
+    transaction.on_commit(matching.job_posts_changed)
+    transaction.on_commit(
+        lambda: autocomplete.job_post_changed(old, new))
+    matching.queue_update('job_post', instance.pk)
+
+
+@receiver(post_delete, sender=JobPost)
+def job_post_deleted(sender, instance, **kwargs):
+    if archive.is_archiving():
+        return
+    old = indexed_values(instance)
+    facets.count_job_posts(removed=[old])
+    transaction.on_commit(feed.job_posts_changed)
+    transaction.on_commit(matching.job_posts_changed)
+    transaction.on_commit(lambda: autocomplete.job_post_changed(old))
+
+
+@receiver(post_save, sender=WorkExperince)
+@receiver(post_delete, sender=WorkExperince)
+@receiver(post_save, sender=Education)
+@receiver(post_delete, sender=Education)
+def cv_item_changed(sender, instance, **kwargs):
+    if cv_documents.writing_items_of(instance.job_seeker_id):
+        return
+    touch_cvs(instance.job_seeker_id)
+    matching.queue_update('cv', instance.job_seeker_id)
+
+
+@receiver(post_save, sender=JobSeekerCv)
+def cv_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_job_posts(job_applications__job_seeker_cv=instance.pk)
+
+
+@receiver(post_save, sender=Application)
+def application_saved(sender, instance, created, **kwargs):
+    if created:
+        application_counts.application_added(instance)
+    else:
+        touch_job_posts(pk=instance.job_post_id)
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted(sender, instance, **kwargs):
+    if archive.is_archiving():
+        return
+    application_counts.application_removed(instance)
+
+
+# The conditional GET versions (see conditional.py) are taken from the
+# updated_at of the top level rows only, so writes to nested rows move the
+# timestamp of every row that embeds them. update() skips the save
+# signals, so this does not reindex or rescore anything.
+
+def touch_cvs(cv_id):
+    JobSeekerCv.objects.filter(pk=cv_id).update(updated_at=now())
+    touch_job_posts(job_applications__job_seeker_cv=cv_id)
+
+
+def touch_job_posts(**lookups):
+    JobPost.objects.filter(**lookups).update(updated_at=now())
@@ -0,0 +1,127 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.utils.timezone import now
+
+from .choices import EMPLOYMENT_TYPES
+
+TITLES = [
+    'Systemutvecklare', 'Frontendutvecklare', 'Backendutvecklare',
+    'Projektledare', 'Sjuksköterska', 'Undersköterska', 'Lärare',
+    'Förskollärare', 'Elektriker', 'Snickare', 'Lagerarbetare',
+    'Truckförare', 'Kock', 'Servitör', 'Ekonomiassistent',
+    'Redovisningskonsult',
+    'Säljare', 'Kundtjänstmedarbetare', 'Butiksbiträde', 'Data Scientist',
+    'DevOps Engineer', 'UX-designer', 'Testare', 'Supporttekniker',
+]
+
+COMPANIES = [
+    'Nordisk Data AB', 'Göta Bygg AB', 'Älvsjö Vård AB', 'Skärgårdens Kök',
+    'Lindqvist & Söner', 'Öresund Logistik', 'Västra Hamnen IT',
+    'Fjällbacka Konsult', 'Norrlands Energi', 'Malmö Mjukvara AB',
+]
+
+LOCATIONS = [
+    'Stockholm', 'Göteborg', 'Malmö', 'Uppsala', 'Västerås', 'Örebro',
+    'Linköping', 'Helsingborg', 'Jönköping', 'Norrköping', 'Lund', 'Umeå',
+    'Gävle', 'Borås', 'Södertälje', 'Eskilstuna', 'Halmstad', 'Växjö',
+    'Karlstad', 'Sundsvall', 'Östersund', 'Trollhättan', 'Luleå', 'Kalmar',
+]
+
+WORDS = [
+    'erfarenhet', 'python', 'django', 'react', 'typescript', 'java',
+    'kommunikation', 'samarbete', 'ansvar', 'kunder', 'projekt', 'team',
+    'utveckling', 'drift', 'vård', 'omsorg', 'patienter', 'undervisning',
+    'elever', 'bygg', 'installation', 'lager', 'logistik', 'truckkort',
+    'körkort', 'matlagning', 'restaurang', 'ekonomi', 'bokföring',
+    'försäljning',
+    'service', 'support', 'felsökning', 'nätverk', 'moln', 'databaser',
+    'analys', 'statistik', 'design', 'användare', 'testning', 'automatisering',
+    'flexibel', 'noggrann', 'driven', 'självständig', 'heltid', 'skiftarbete',
+    'kollektivavtal', 'friskvård', 'utbildning', 'legitimation', 'svenska',
+    'engelska', 'agil', 'scrum', 'kvalitet', 'säkerhet', 'hållbarhet',
+]
+
+FIRST_NAMES = [
+    'Anna', 'Eva', 'Maria', 'Karin', 'Sara', 'Lena', 'Emma', 'Elin', 'Maja',
+    'Erik', 'Lars', 'Karl', 'Anders', 'Johan', 'Per', 'Nils', 'Oskar',
+    'Ali', 'Mohammed', 'Fatima', 'Noah', 'Liam', 'Alice', 'Olivia',
+]
+
+LAST_NAMES = [
+    'Andersson', 'Johansson', 'Karlsson', 'Nilsson', 'Eriksson', 'Larsson',
+    'Olsson', 'Persson', 'Svensson', 'Gustafsson', 'Pettersson', 'Jonsson',
+    'Jansson', 'Hansson', 'Bengtsson', 'Lindberg', 'Lindström', 'Åberg',
+]
+
+SCHOOLS = [
+    'Chalmers', 'KTH', 'Lunds universitet', 'Uppsala universitet',
+    'Göteborgs universitet', 'Linköpings universitet', 'Umeå universitet',
+    'Yrgo', 'Nackademin', 'Komvux',
+]
+
+EDUCATION_LEVELS = ['Gymnasium', 'Yrkeshögskola', 'Kandidat', 'Master']
+
+SUFFIXES = [
+    'ansvar', 'arbete', 'chef', 'erfarenhet', 'kunskap', 'miljö', 'plan',
+    'system', 'team', 'teknik', 'tjänst', 'utbildning', 'verktyg', 'vana',
+]
+
+# Swedish happily glues words together, so real job ads have a long tail of
+# compound terms. Combining the base words gives a vocabulary of around
+# a thousand terms with a skewed (Zipf-like) frequency.
+VOCABULARY = WORDS + [word + suffix for word in WORDS for suffix in SUFFIXES]
+VOCABULARY_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+# Passed to choices() instead of the weights, which it would sum every call.
+VOCABULARY_CUM_WEIGHTS = list(accumulate(VOCABULARY_WEIGHTS))
+
+
+def words(rng, count):
+    return rng.choices(VOCABULARY, cum_weights=VOCABULARY_CUM_WEIGHTS,
+                       k=count)
+
+
+def job_post_fields(rng=random, description_words=40):
+    """Return the field values for one synthetic job post."""
+    return {
+        'job_post_title': rng.choice(TITLES),
+        'company_name': rng.choice(COMPANIES),
+        'location': rng.choice(LOCATIONS),
+        'employment_type': rng.choice(EMPLOYMENT_TYPES)[0],
+        'job_description': ' '.join(words(rng, description_words)),
+        'phone_number': '07%08d' % rng.randrange(10 ** 8),
+        'expiration_date': (
+            now().date() + timedelta(days=rng.randrange(-30, 120))),
+        'is_published': rng.random() < 0.9,
+    }
+
+
+def user_fields(rng=random):
+    """Return the name and phone number of one synthetic user."""
+    return {
+        'first_name': rng.choice(FIRST_NAMES),
+        'last_name': rng.choice(LAST_NAMES),
+        'mobile_number': '07%08d' % rng.randrange(10 ** 8),
+    }
+
+
+def work_experience_fields(rng=random, description_words=20):
+    """Return the field values for one synthetic work experience."""
+    return {
+        'occupation_title': rng.choice(TITLES),
+        'company_name': rng.choice(COMPANIES),
+        'years': str(rng.randint(1, 10)),
+        'description': ' '.join(words(rng, description_words)),
+    }
+
+
+def education_fields(rng=random, description_words=10):
+    """Return the field values for one synthetic education."""
+    return {
+        'school_name': rng.choice(SCHOOLS),
+        'level': rng.choice(EDUCATION_LEVELS),
+        'orientation': rng.choice(WORDS).capitalize(),
+        'years': str(rng.randint(1, 5)),
+        'description': ' '.join(words(rng, description_words)),
+    }
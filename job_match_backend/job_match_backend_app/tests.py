@@ -1,3 +1,2216 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import runpy
+import tempfile
+import threading
+from base64 import b64encode
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.http import JsonResponse
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Sum
+from django.test import (AsyncRequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from job_match_backend_project import settings as project_settings
+
+from . import (application_counts, applying, archive, async_views,
+               autocomplete, exports, facets, feed, job_import, matching,
+               metrics, outbox, search)
+from .asgi_static import StaticFilesApplication
+from .management.commands import _routes
+from .models import (Application, ArchivedApplication, ArchivedJobPost,
+                     CustomUser, Education, JobPost, JobPostFacet,
+                     JobPostSearchTerm, JobSeekerCv, MatchScore,
+                     MatchScoreUpdate, OutboundEmail, WorkExperince)
+
+
+def create_user(email, is_ag=False):
+    return CustomUser.objects.create(
+        email=email,
+        first_name='Test',
+        last_name='User',
+        mobile_number='0701234567',
+        org_number='5560000000' if is_ag else None,
+        is_ag=is_ag)
+
+
+def create_job_post(employer, **fields):
+    defaults = {
+        'job_post_title': 'Systemutvecklare',
+        'company_name': 'Nordisk Data AB',
+        'location': 'Göteborg',
+        'employment_type': 'Deltid',
+        'job_description': 'Python och Django',
+        'phone_number': '0701234567',
+        'expiration_date': now().date() + timedelta(days=30),
+        'is_published': True,
+    }
+    defaults.update(fields)
+    return JobPost.objects.create(job_post=employer, **defaults)
+
+
+def create_applicant(job_post, email):
+    user = create_user(email)
+    cv = JobSeekerCv.objects.create(
+        profile=user, email=email, mobile_number='0701234567')
+    WorkExperince.objects.create(
+        job_seeker=cv, occupation_title='Utvecklare',
+        company_name='Bolaget AB', years='2', description='Django')
+    Education.objects.create(
+        job_seeker=cv, school_name='Chalmers', level='Master',
+        orientation='Data', description='Datateknik', years='5')
+    return Application.objects.create(
+        profile_id=user, job_post=job_post, job_seeker_cv=cv)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+
+    def terms(self, job_post):
+        return dict(JobPostSearchTerm.objects.filter(
+            job_post=job_post).values_list('term', 'weight'))
+
+    def test_tokenize(self):
+        self.assertEqual(
+            search.tokenize('Lärare i Göteborg och Malmö, Café-ägare!'),
+            ['larare', 'goteborg', 'malmo', 'cafe', 'agare'])
+        self.assertEqual(search.tokenize('x 1 C# IT'), ['it'])
+        self.assertEqual(search.tokenize(None), [])
+        self.assertEqual(search.tokenize('a' * 80),
+                         ['a' * search.TERM_MAX_LENGTH])
+
+    def test_job_post_terms(self):
+        job_post = create_job_post(
+            self.employer, job_post_title='Python-utvecklare',
+            company_name='Python AB', location='Umeå',
+            job_description='Python och SQL')
+        self.assertEqual(search.job_post_terms(job_post), {
+            'python': 3 + 2 + 1, 'utvecklare': 3, 'ab': 2, 'umea': 2,
+            'sql': 1})
+
+    def test_ranking(self):
+        in_title = create_job_post(
+            self.employer, job_post_title='Pythonutvecklare Python',
+            location='Malmö', job_description='Backend')
+        in_description = create_job_post(
+            self.employer, job_post_title='Utvecklare', location='Malmö',
+            job_description='Python')
+        both_terms = create_job_post(
+            self.employer, job_post_title='Utvecklare', location='Malmö',
+            job_description='Python i Göteborg')
+        create_job_post(self.employer, job_post_title='Lagerarbetare',
+                        location='Malmö', job_description='Truckkort')
+
+        ranked = list(search.search_job_posts(
+            JobPost.objects.all(), 'python goteborg'))
+        self.assertEqual(ranked, [in_title, both_terms, in_description])
+        self.assertGreater(ranked[0].search_rank, ranked[1].search_rank)
+        self.assertFalse(search.search_job_posts(
+            JobPost.objects.all(), 'och i').exists())
+        self.assertFalse(search.search_job_posts(
+            JobPost.objects.all(), 'kubernetes').exists())
+
+    def test_index_updates(self):
+        job_post = create_job_post(self.employer, job_post_title='Python')
+        self.assertEqual(self.terms(job_post)['python'], 3 + 1)
+
+        job_post.job_post_title = 'Rust'
+        job_post.save()
+        terms = self.terms(job_post)
+        self.assertEqual(terms['rust'], 3)
+        self.assertEqual(terms['python'], 1)
+
+        job_post.delete()
+        self.assertFalse(JobPostSearchTerm.objects.exists())
+
+    def test_rebuild(self):
+        job_post = create_job_post(self.employer)
+        expected = self.terms(job_post)
+        JobPostSearchTerm.objects.all().delete()
+        search.rebuild_search_index()
+        self.assertEqual(self.terms(job_post), expected)
+
+
+def encode_cursor(values):
+    return b64encode(json.dumps(values).encode('ascii')).decode('ascii')
+
+
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.seeker = create_user('seeker@example.com')
+        self.client = APIClient()
+
+    def pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_pages(self):
+        today = now().date()
+        job_posts = [
+            create_job_post(self.employer,
+                            expiration_date=today + timedelta(days=days))
+            for days in (9, 3, 3, 3, 1)]
+        self.client.force_authenticate(self.employer)
+        pages = self.pages('/employer/jobposts?page_size=2')
+        # Ties on the expiration date are broken by the id.
+        expected = [job_post.id for job_post in sorted(
+            job_posts, key=lambda job_post: (job_post.expiration_date,
+                                             job_post.id))]
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+    def test_search_rank_ties(self):
+        job_posts = [create_job_post(self.employer) for _ in range(3)]
+        create_job_post(self.employer, job_post_title='Python Python',
+                        job_description='Python')
+        self.client.force_authenticate(self.seeker)
+        pages = self.pages('/jobseeker/availableJobPosts?q=python&page_size=2')
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[0][1:] + pages[1],
+                         [job_post.id for job_post in job_posts])
+
+    def test_invalid_cursors(self):
+        create_job_post(self.employer)
+        invalid = [
+            'not base64!',
+            encode_cursor({'id': 1}),
+            encode_cursor(['2030-01-01']),
+            encode_cursor(['notadate', 1]),
+            encode_cursor([None, 1]),
+            encode_cursor([[1], 1]),
+            encode_cursor(['2030-01-01', 'one']),
+            encode_cursor(['2030-01-01', 10 ** 30]),
+        ]
+        self.client.force_authenticate(self.employer)
+        for cursor in invalid:
+            response = self.client.get(
+                '/employer/jobposts', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+        self.client.force_authenticate(self.seeker)
+        response = self.client.get('/jobseeker/availableJobPosts', {
+            'q': 'python', 'cursor': encode_cursor(['high', 1])})
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    The nested employer serializers walk job post -> applications -> CV ->
+    experiences/educations. These tests pin the number of queries per
+    endpoint so that a missing prefetch shows up as a failure instead of
+    as a slow page. The listings spend one extra query on their
+    conditional GET version.
+    """
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def populate(self, posts, applicants):
+        job_posts = [create_job_post(self.employer) for _ in range(posts)]
+        for job_post in job_posts:
+            for index in range(applicants):
+                email = 'seeker-%s-%s@example.com' % (job_post.id, index)
+                create_applicant(job_post, email)
+        return job_posts
+
+    def test_employer_job_posts(self):
+        self.populate(posts=5, applicants=4)
+        for url in ('/employer/jobposts', '/employer/jobposts?paginate=false'):
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_employer_job_posts_does_not_grow_with_applicants(self):
+        self.populate(posts=1, applicants=1)
+        with self.assertNumQueries(5):
+            self.client.get('/employer/jobposts?paginate=false')
+        self.populate(posts=3, applicants=6)
+        with self.assertNumQueries(5):
+            self.client.get('/employer/jobposts?paginate=false')
+
+    def test_job_post_by_id(self):
+        job_post = self.populate(posts=1, applicants=5)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/employer/jobpost/get/%s' % job_post.id)
+        self.assertEqual(len(response.json()['applications']), 5)
+
+    def test_application(self):
+        job_post = self.populate(posts=1, applicants=2)[0]
+        application = job_post.job_applications.first()
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/employer/jobpost/%s/application/%s'
+                % (job_post.id, application.profile_id_id))
+        self.assertEqual(response.status_code, 200)
+
+    def test_job_seeker_applications(self):
+        job_posts = self.populate(posts=4, applicants=1)
+        seeker = job_posts[0].job_applications.first().profile_id
+        for job_post in job_posts[1:]:
+            Application.objects.create(
+                profile_id=seeker, job_post=job_post,
+                job_seeker_cv=seeker.job_seeker_profile.first())
+        self.client.force_authenticate(seeker)
+        with self.assertNumQueries(2):
+            response = self.client.get('/jobseeker/applications')
+        self.assertEqual(len(response.json()['results']), 4)
+
+
+class IndexUsageTests(TestCase):
+    """
+    Run EXPLAIN on the hot query shapes and check that the planner picks
+    the index that was added for them. Postgres prefers a sequential scan
+    on tiny tables, so sequential scans are switched off for the check.
+    SQLite builds unique constraints into the table definition, where they
+    show up as an autoindex.
+    """
+
+    unique_application_indexes = (
+        'unique_application_per_job_post',
+        'sqlite_autoindex_job_match_backend_app_application')
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.seeker = create_user('seeker@example.com')
+        self.job_post = create_applicant(
+            create_job_post(self.employer), 'applicant@example.com').job_post
+
+    def assertUsesIndex(self, queryset, *index_names):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = queryset.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET enable_seqscan')
+        else:
+            plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            'None of %s used in:\n%s' % (index_names, plan))
+
+    def test_available_job_posts(self):
+        self.assertUsesIndex(
+            JobPost.objects.filter(
+                is_published=True, expiration_date__gte=now().date(),
+            ).order_by('expiration_date', 'id'),
+            'jobpost_active_feed_idx')
+
+    def test_employer_job_posts(self):
+        self.assertUsesIndex(
+            JobPost.objects.filter(job_post=self.employer)
+            .order_by('expiration_date', 'id'),
+            'jobpost_employer_idx')
+
+    def test_applied_job_posts(self):
+        self.assertUsesIndex(
+            Application.objects.filter(profile_id=self.seeker)
+            .values_list('job_post_id', flat=True),
+            *self.unique_application_indexes)
+
+    def test_already_applied(self):
+        self.assertUsesIndex(
+            Application.objects.filter(
+                profile_id=self.seeker, job_post=self.job_post),
+            *self.unique_application_indexes)
+
+    def test_job_seeker_applications(self):
+        self.assertUsesIndex(
+            Application.objects.filter(profile_id=self.seeker)
+            .order_by('-application_date', '-id'),
+            'application_profile_date_idx')
+
+
+def forget_job_post_matrix(test):
+    """Start ``test`` without the matrix earlier tests left behind."""
+    patcher = mock.patch.multiple(
+        matching, _matrix=None, _matrix_key=None, _matrix_built_at=0,
+        _rebuild_thread=None)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        forget_job_post_matrix(self)
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.developer = create_job_post(
+            self.employer, job_post_title='Utvecklare',
+            job_description='Django och Python')
+        self.python = create_job_post(self.employer)
+        self.warehouse = create_job_post(
+            self.employer, job_post_title='Lagerarbetare',
+            company_name='Truckcentralen', job_description='Truck och lager')
+        self.applied = create_job_post(
+            self.employer, job_post_title='Django utvecklare')
+        application = create_applicant(self.applied, 'seeker@example.com')
+        self.seeker = application.profile_id
+        self.cv = application.job_seeker_cv
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+
+    def test_term_matrix(self):
+        job_post_matrix = matching.TermMatrix.from_terms([10, 20, 30], [
+            Counter(python=2, django=1),
+            Counter(truck=1, lager=1),
+            Counter(python=1, lager=3),
+        ])
+        norms = np.sqrt(np.asarray(job_post_matrix.matrix.multiply(
+            job_post_matrix.matrix).sum(axis=1)).ravel())
+        np.testing.assert_allclose(norms, 1)
+
+        matches = job_post_matrix.top_k(Counter(python=1, django=1))
+        self.assertEqual([pk for pk, score in matches], [10, 30])
+        self.assertGreater(matches[0][1], matches[1][1])
+        self.assertEqual(
+            [pk for pk, score in job_post_matrix.top_k(
+                Counter(python=1, django=1), exclude_ids={10})], [30])
+        self.assertEqual(
+            len(job_post_matrix.top_k(Counter(python=1), k=1)), 1)
+        # Terms no job post has do not match anything.
+        self.assertEqual(job_post_matrix.top_k(Counter(java=1)), [])
+        self.assertEqual(
+            matching.TermMatrix.from_terms([], []).top_k(Counter(python=1)),
+            [])
+
+    def test_build(self):
+        create_job_post(self.employer, is_published=False)
+        job_post_matrix = matching.TermMatrix.build(JobPost.objects.filter(
+            is_published=True))
+        self.assertEqual(
+            sorted(job_post_matrix.ids),
+            [self.developer.pk, self.python.pk, self.warehouse.pk,
+             self.applied.pk])
+        self.assertEqual(
+            job_post_matrix.top_k(Counter(lagerarbetare=1), k=1)[0][0],
+            self.warehouse.pk)
+
+    def test_recommended_job_posts(self):
+        create_job_post(
+            self.employer, job_post_title='Utvecklare', is_published=False)
+        create_job_post(
+            self.employer, job_post_title='Utvecklare',
+            expiration_date=now().date() - timedelta(days=1))
+        matching.update_cv_match_scores(self.cv.pk)
+
+        response = self.client.get('/jobseeker/recommendedJobPosts')
+        self.assertEqual(response.status_code, 200)
+        # Best first, without the post applied to and the inactive ones.
+        self.assertEqual([post['id'] for post in response.json()],
+                         [self.developer.pk, self.python.pk])
+        scores = [post['score'] for post in response.json()]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        response = self.client.get('/jobseeker/recommendedJobPosts?limit=1')
+        self.assertEqual([post['id'] for post in response.json()],
+                         [self.developer.pk])
+        self.assertEqual(self.client.get(
+            '/jobseeker/recommendedJobPosts?limit=x').status_code, 400)
+        self.client.force_authenticate(self.employer)
+        self.assertEqual(self.client.get(
+            '/jobseeker/recommendedJobPosts').status_code, 401)
+
+    @override_settings(MATCHING_REBUILD_INTERVAL=0)
+    def test_stale_matrix_served_while_rebuilding(self):
+        release = threading.Event()
+
+        def slow_build(job_posts):
+            # Another thread, which does not see the test's transaction.
+            release.wait(5)
+            return matching.TermMatrix.from_terms([], [])
+
+        old = matching.active_job_post_matrix()
+        self.assertIs(matching.active_job_post_matrix(), old)
+        matching.job_posts_changed()
+        with mock.patch.object(matching.TermMatrix, 'build',
+                               side_effect=slow_build):
+            # The old matrix is returned at once during the rebuild.
+            self.assertIs(matching.active_job_post_matrix(), old)
+            rebuild = matching._rebuild_thread
+            self.assertIs(matching.active_job_post_matrix(), old)
+            release.set()
+            rebuild.join(5)
+        new = matching.active_job_post_matrix()
+        self.assertIsNot(new, old)
+        self.assertIsNone(matching._rebuild_thread)
+
+        matching.job_posts_changed()
+        with override_settings(MATCHING_REBUILD_INTERVAL=3600):
+            # Rebuilds are throttled, unless the caller asks for it.
+            self.assertIs(matching.active_job_post_matrix(), new)
+            self.assertIsNone(matching._rebuild_thread)
+            self.assertIsNot(
+                matching.active_job_post_matrix(current=True), new)
+
+
+class RankApplicantsTests(TestCase):
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(
+            self.employer, job_post_title='Pythonutvecklare',
+            job_description='Python och Django')
+        self.url = '/employer/jobpost/%s/applicants/ranked' % (
+            self.job_post.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def add_applicant(self, email, occupation_title, description):
+        application = create_applicant(self.job_post, email)
+        WorkExperince.objects.filter(
+            job_seeker=application.job_seeker_cv).update(
+            occupation_title=occupation_title, description=description)
+        return application.profile_id_id
+
+    def test_ranking_order(self):
+        partial = self.add_applicant(
+            'partial@example.com', 'Utvecklare', 'Django')
+        none = self.add_applicant(
+            'none@example.com', 'Lagerarbetare', 'Truckkort')
+        best = self.add_applicant(
+            'best@example.com', 'Pythonutvecklare', 'Python och Django')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([row['profile_id'] for row in results],
+                         [best, partial, none])
+        scores = [row['score'] for row in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_pagination(self):
+        for index in range(3):
+            self.add_applicant('seeker%s@example.com' % index,
+                               'Utvecklare', 'Python')
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_scores_every_applicant_loads_one_page(self):
+        for index in range(5):
+            self.add_applicant('seeker%s@example.com' % index,
+                               'Utvecklare', 'Python')
+        # The post, the applications, the CV items by type, then the
+        # page's applications with their CVs and items.
+        with self.assertNumQueries(1 + 1 + 2 + 3):
+            response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_applicant_cv_terms(self):
+        self.add_applicant('seeker@example.com', 'Utvecklare', 'Python')
+        cv = JobSeekerCv.objects.get()
+        self.assertEqual(matching.applicant_cv_terms(self.job_post),
+                         {cv.pk: matching.cv_terms(cv)})
+
+    def test_permissions(self):
+        self.add_applicant('seeker@example.com', 'Utvecklare', 'Python')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_authenticate(create_user('other@example.com'))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_authenticate(
+            create_user('other-employer@example.com', is_ag=True))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class MatchScoreTests(TestCase):
+    """
+    Writes only queue the CVs and job posts whose scores are out of date;
+    update_match_scores computes them.
+    """
+
+    def setUp(self):
+        forget_job_post_matrix(self)
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.developer = create_job_post(
+            self.employer, job_post_title='Utvecklare',
+            company_name='Kodbolaget', job_description='Django och Python')
+        self.warehouse = create_job_post(
+            self.employer, job_post_title='Lagerarbetare',
+            company_name='Truckcentralen', job_description='Truck och lager')
+        self.seeker = create_user('seeker@example.com')
+        self.cv = JobSeekerCv.objects.create(
+            profile=self.seeker, email=self.seeker.email,
+            mobile_number=self.seeker.mobile_number)
+        self.experience = WorkExperince.objects.create(
+            job_seeker=self.cv, occupation_title='Utvecklare',
+            company_name='Webbyrån', years='2', description='Django')
+        self.update()
+
+    def update(self):
+        call_command('update_match_scores', stdout=io.StringIO())
+        self.assertFalse(MatchScoreUpdate.objects.exists())
+
+    def matches(self, cv=None):
+        return set(MatchScore.objects.filter(
+            job_seeker_cv=cv or self.cv).values_list('job_post', flat=True))
+
+    def test_cv(self):
+        self.assertEqual(self.matches(), {self.developer.pk})
+        self.experience.occupation_title = 'Lagerarbetare'
+        self.experience.description = 'Truck'
+        self.experience.save()
+        # Queued, not scored, by the write.
+        self.assertEqual(self.matches(), {self.developer.pk})
+        self.assertTrue(MatchScoreUpdate.objects.filter(
+            kind='cv', object_id=self.cv.pk).exists())
+        self.update()
+        self.assertEqual(self.matches(), {self.warehouse.pk})
+
+        self.experience.delete()
+        self.update()
+        self.assertEqual(self.matches(), set())
+
+        cv = JobSeekerCv.objects.create(
+            profile=self.seeker, email='second-cv@example.com',
+            mobile_number=self.seeker.mobile_number)
+        Education.objects.create(
+            job_seeker=cv, school_name='Yrkeshögskolan', level='YH',
+            orientation='Python', description='Django', years='2')
+        self.update()
+        self.assertEqual(self.matches(cv), {self.developer.pk})
+        cv.delete()
+        self.update()
+        self.assertFalse(MatchScore.objects.exists())
+
+    def test_job_post(self):
+        # A term no job post had when the matrix was built.
+        self.experience.description = 'Django och Kubernetes'
+        self.experience.save()
+        self.update()
+        job_post = create_job_post(
+            self.employer, job_post_title='Kubernetes',
+            company_name='Molnet', job_description='Drift')
+        self.assertNotIn(job_post.pk, self.matches())
+        self.update()
+        self.assertIn(job_post.pk, self.matches())
+
+        job_post.is_published = False
+        job_post.save()
+        self.update()
+        self.assertNotIn(job_post.pk, self.matches())
+        job_post.is_published = True
+        job_post.save()
+        self.update()
+        self.assertIn(job_post.pk, self.matches())
+
+        self.developer.job_post_title = 'Lagerarbetare'
+        self.developer.company_name = 'Truckcentralen'
+        self.developer.job_description = 'Truck'
+        self.developer.save()
+        self.update()
+        self.assertEqual(self.matches(), {job_post.pk})
+
+        job_post.delete()
+        self.update()
+        self.assertEqual(self.matches(), set())
+
+    def test_job_posts_capped_per_cv(self):
+        with mock.patch.object(matching, 'MATCH_SCORES_PER_CV', 3):
+            for index in range(5):
+                create_job_post(
+                    self.employer, job_post_title='Utvecklare',
+                    company_name='Bolag %s' % index,
+                    job_description='Django' + ' Python' * index)
+                self.update()
+                self.assertLessEqual(len(self.matches()), 3)
+            self.assertEqual(len(self.matches()), 3)
+
+            # The lowest scores are the ones dropped.
+            MatchScore.objects.all().delete()
+            job_posts = JobPost.objects.order_by('id')[:4]
+            MatchScore.objects.bulk_create([
+                MatchScore(job_seeker_cv=self.cv, job_post=job_post,
+                           score=score)
+                for job_post, score in zip(job_posts, (0.5, 0.2, 0.9, 0.4))])
+            matching._trim_match_scores({self.cv.pk})
+        self.assertEqual(self.matches(), {
+            job_posts[0].pk, job_posts[2].pk, job_posts[3].pk})
+
+    def test_requests_only_queue(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/employer/jobpost/create', {
+                'job_post_title': 'Django utvecklare',
+                'company_name': 'Kodbolaget', 'location': 'Malmö',
+                'employment_type': 'Deltid',
+                'job_description': 'Python', 'phone_number': '0701234567',
+                'expiration_date': now().date() + timedelta(days=30),
+                'is_published': True}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.matches(), {self.developer.pk})
+        self.update()
+        self.assertEqual(self.matches(),
+                         {self.developer.pk, response.json()['id']})
+
+    def test_rebuild(self):
+        MatchScore.objects.all().delete()
+        matching.queue_update('all')
+        self.update()
+        self.assertEqual(self.matches(), {self.developer.pk})
+
+    def test_best_cv_recommended_once(self):
+        cv = JobSeekerCv.objects.create(
+            profile=self.seeker, email='second-cv@example.com',
+            mobile_number=self.seeker.mobile_number)
+        WorkExperince.objects.create(
+            job_seeker=cv, occupation_title='Utvecklare',
+            company_name='Kodbolaget', years='2', description='Python')
+        self.update()
+        best = MatchScore.objects.filter(
+            job_post=self.developer).order_by('-score').first()
+        self.assertEqual(best.job_seeker_cv_id, cv.pk)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+        response = self.client.get('/jobseeker/recommendedJobPosts')
+        self.assertEqual(response.json(), [
+            {**response.json()[0], 'id': self.developer.pk,
+             'score': round(best.score, 4)}])
+
+
+class FeedCacheTests(TestCase):
+    def setUp(self):
+        feed._entries.clear()
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(self.employer)
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('seeker@example.com'))
+
+    def feed(self):
+        response = self.client.get(
+            '/jobseeker/availableJobPosts?paginate=false')
+        self.assertEqual(response.status_code, 200)
+        return {job_post['id']: job_post['job_post_title']
+                for job_post in response.json()}
+
+    def test_hit(self):
+        self.assertEqual(self.feed(), {self.job_post.pk: 'Systemutvecklare'})
+        hits = feed.stats['hits']
+        with mock.patch.object(feed, '_serialize') as serialize:
+            self.assertEqual(self.feed(),
+                             {self.job_post.pk: 'Systemutvecklare'})
+        serialize.assert_not_called()
+        self.assertEqual(feed.stats['hits'], hits + 1)
+
+    def pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_paginated_hit(self):
+        today = now().date()
+        job_posts = [self.job_post] + [
+            create_job_post(self.employer,
+                            expiration_date=today + timedelta(days=days))
+            for days in (2, 2, 2, 40)]
+        seeker = CustomUser.objects.get(email='seeker@example.com')
+        Application.objects.create(
+            profile_id=seeker, job_post=job_posts[1],
+            job_seeker_cv=JobSeekerCv.objects.create(
+                profile=seeker, email=seeker.email,
+                mobile_number='0701234567'))
+        url = '/jobseeker/availableJobPosts?page_size=2'
+        # Applied to posts are left out, ties are broken by the id.
+        expected = [[job_posts[2].pk, job_posts[3].pk],
+                    [job_posts[0].pk, job_posts[4].pk]]
+        self.assertEqual(self.pages(url), expected)
+        with mock.patch.object(feed, '_serialize') as serialize:
+            self.assertEqual(self.pages(url), expected)
+        serialize.assert_not_called()
+        # Without the cache the pages, and cursors, are the same.
+        with override_settings(FEED_CACHE_TIMEOUT=0):
+            self.assertEqual(self.pages(url), expected)
+
+    def test_paginated_invalid_cursor(self):
+        for cursor in ('not base64!', encode_cursor(['notadate', 1])):
+            response = self.client.get(
+                '/jobseeker/availableJobPosts', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_invalidated_by_writes(self):
+        self.feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            job_post = create_job_post(self.employer, job_post_title='Kock')
+        self.assertEqual(self.feed(), {
+            self.job_post.pk: 'Systemutvecklare', job_post.pk: 'Kock'})
+        with self.captureOnCommitCallbacks(execute=True):
+            job_post.job_post_title = 'Bagare'
+            job_post.save()
+        self.assertEqual(self.feed(), {
+            self.job_post.pk: 'Systemutvecklare', job_post.pk: 'Bagare'})
+        with self.captureOnCommitCallbacks(execute=True):
+            job_post.delete()
+        self.assertEqual(self.feed(), {self.job_post.pk: 'Systemutvecklare'})
+
+    def test_rollback(self):
+        self.feed()
+        version = cache.get(feed.VERSION_CACHE_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    create_job_post(self.employer, job_post_title='Kock')
+                    # Other workers still cache the committed feed under
+                    # the old version.
+                    self.assertEqual(
+                        cache.get(feed.VERSION_CACHE_KEY), version)
+                    raise ValueError
+        self.assertEqual(cache.get(feed.VERSION_CACHE_KEY), version)
+        self.assertEqual(self.feed(), {self.job_post.pk: 'Systemutvecklare'})
+
+
+class ConditionalGetTests(TestCase):
+    """
+    A client that sends back the ETag it got gets 304 Not Modified until
+    something it would see in the body has changed, including rows nested
+    inside it.
+    """
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(self.employer)
+        self.application = create_applicant(
+            self.job_post, 'seeker@example.com')
+        self.seeker = self.application.profile_id
+        self.cv = self.application.job_seeker_cv
+        self.client = APIClient()
+
+    def revalidate(self, user, url, change=None):
+        """Return the status of a revalidation after ``change`` ran."""
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if change:
+            change()
+        return self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']).status_code
+
+    def test_not_modified(self):
+        for user, url in ((self.seeker, '/jobseeker/retrive/profile'),
+                          (self.seeker, '/jobseeker/applications'),
+                          (self.employer, '/employer/jobposts')):
+            self.assertEqual(self.revalidate(user, url), 304, url)
+
+    def test_not_modified_skips_the_view(self):
+        self.client.force_authenticate(self.employer)
+        etag = self.client.get('/employer/jobposts')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/employer/jobposts', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query_string(self):
+        self.client.force_authenticate(self.employer)
+        etag = self.client.get('/employer/jobposts')['ETag']
+        response = self.client.get(
+            '/employer/jobposts?paginate=false', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cv_changes(self):
+        def add_education():
+            Education.objects.create(
+                job_seeker=self.cv, school_name='KTH', level='Master',
+                orientation='Data', description='', years='2')
+
+        def delete_education():
+            self.cv.educations.first().delete()
+
+        def change_cv():
+            self.cv.mobile_number = '0707654321'
+            self.cv.save()
+
+        for change in (add_education, delete_education, change_cv):
+            for user, url in ((self.seeker, '/jobseeker/retrive/profile'),
+                              (self.employer, '/employer/jobposts')):
+                self.assertEqual(
+                    self.revalidate(user, url, change), 200, url)
+
+    def test_job_post_changes(self):
+        def edit():
+            self.job_post.job_post_title = 'Backendutvecklare'
+            self.job_post.save()
+
+        def add():
+            create_job_post(self.employer)
+
+        def delete():
+            JobPost.objects.exclude(pk=self.job_post.pk).delete()
+
+        for change in (edit, add, delete):
+            self.assertEqual(self.revalidate(
+                self.employer, '/employer/jobposts', change), 200)
+        self.assertEqual(self.revalidate(
+            self.seeker, '/jobseeker/applications', edit), 200)
+
+    def test_application_changes(self):
+        def apply():
+            create_applicant(self.job_post, 'another@example.com')
+
+        def withdraw():
+            Application.objects.filter(profile_id=self.seeker).delete()
+
+        self.assertEqual(self.revalidate(
+            self.employer, '/employer/jobposts', apply), 200)
+        self.assertEqual(self.revalidate(
+            self.employer, '/employer/jobposts', withdraw), 200)
+
+        self.application = create_applicant(
+            create_job_post(self.employer), 'seeker-2@example.com')
+        self.seeker = self.application.profile_id
+        self.assertEqual(self.revalidate(
+            self.seeker, '/jobseeker/applications', withdraw), 200)
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class FastSerializerTests(TestCase):
+    """
+    The values() based serializers must produce exactly the JSON of the DRF
+    serializers they replace, on every path of the endpoints using them.
+    """
+
+    def setUp(self):
+        employer = create_user('employer@example.com', is_ag=True)
+        job_posts = [
+            create_job_post(employer, job_post_title='Kock %s' % index,
+                            location='Malmö' if index % 2 else 'Umeå',
+                            employment_type='Heltid')
+            for index in range(5)]
+        seeker = create_applicant(
+            job_posts[0], 'seeker@example.com').profile_id
+        Application.objects.create(
+            profile_id=seeker, job_post=job_posts[1],
+            job_seeker_cv=seeker.job_seeker_profile.first())
+        self.client = APIClient()
+        self.client.force_authenticate(seeker)
+
+    def assertSameJson(self, url):
+        fast = self.client.get(url)
+        with override_settings(FAST_SERIALIZERS=[]):
+            drf = self.client.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, drf.content, url)
+
+    def test_available_job_posts(self):
+        for url in ('/jobseeker/availableJobPosts?page_size=2',
+                    '/jobseeker/availableJobPosts?paginate=false',
+                    '/jobseeker/availableJobPosts?q=kock&page_size=2',
+                    '/jobseeker/availableJobPosts?q=kock&paginate=false'
+                    '&location=Malmö'):
+            self.assertSameJson(url)
+
+    def test_next_page(self):
+        url = '/jobseeker/availableJobPosts?page_size=2'
+        while url:
+            self.assertSameJson(url)
+            url = self.client.get(url).json()['next']
+
+    def test_applications(self):
+        for url in ('/jobseeker/applications?page_size=1',
+                    '/jobseeker/applications?paginate=false'):
+            self.assertSameJson(url)
+
+
+class CountingEmailBackend(EmailBackend):
+    """locmem backend that counts connections opened the way SMTP does."""
+    opened = 0
+    is_open = False
+
+    def open(self):
+        if self.is_open:
+            return False
+        self.is_open = True
+        CountingEmailBackend.opened += 1
+        return True
+
+    def close(self):
+        self.is_open = False
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+@mock.patch.dict(os.environ, {'FRONTEND_BASE_URL': 'https://example.com'})
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user('seeker@example.com')
+
+    def request_reset(self):
+        return APIClient().post(
+            '/password-reset', {'email': self.user.email}, format='json')
+
+    def test_reset_is_queued_not_sent(self):
+        self.assertEqual(self.request_reset().status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.to, self.user.email)
+        self.assertIn('https://example.com/reset/confirm/', email.body)
+
+    @override_settings(
+        EMAIL_BACKEND='job_match_backend_app.tests.CountingEmailBackend')
+    def test_batch_uses_one_connection(self):
+        for _ in range(3):
+            self.request_reset()
+        CountingEmailBackend.opened = 0
+        stdout = io.StringIO()
+        call_command('send_outbox', stdout=stdout)
+
+        self.assertEqual(stdout.getvalue(), 'Sent 3, failed 0\n')
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('https://example.com/reset/confirm/',
+                      mail.outbox[0].body)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertFalse(
+            OutboundEmail.objects.exclude(status='sent').exists())
+        # The reset links are not kept once sent.
+        self.assertFalse(OutboundEmail.objects.exclude(body='').exists())
+        self.assertEqual(outbox.send_pending(), (0, 0))
+
+    @override_settings(
+        EMAIL_BACKEND='job_match_backend_app.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        email = outbox.queue_email('Subject', 'Body', self.user.email)
+        for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+            self.assertEqual(outbox.send_pending(), (0, 1))
+            # Not due again until the backoff has passed.
+            self.assertEqual(outbox.send_pending(), (0, 0))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, attempt)
+            self.assertIn('ConnectionRefusedError', email.last_error)
+            OutboundEmail.objects.update(next_attempt_at=now())
+            if attempt < outbox.MAX_ATTEMPTS:
+                self.assertEqual(email.body, 'Body')
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.body, '')
+        self.assertEqual(outbox.send_pending(), (0, 0))
+
+
+class CachedAuthenticationTests(TestCase):
+    """
+    Requests with a JWT reuse the user loaded by an earlier request in the
+    same process, until the user is saved or deleted.
+    """
+
+    def setUp(self):
+        self.user = create_user('seeker@example.com')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer %s' % AccessToken.for_user(self.user))
+
+    def test_second_request_needs_no_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/user/info').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/user/info')
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_user_changes_are_seen(self):
+        self.client.get('/user/info')
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertEqual(
+            self.client.get('/user/info').json()['first_name'], 'Changed')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/user/info').status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get('/user/info')
+        self.user.delete()
+        self.assertEqual(self.client.get('/user/info').status_code, 401)
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.client.get('/user/info')
+        with self.assertNumQueries(1):
+            self.client.get('/user/info')
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class AsyncReadViewTests(TestCase):
+    """The async read views answer exactly like the sync ones."""
+
+    views = {
+        '/employer/jobposts': async_views.retrieveEmployerJobPosts,
+        '/jobseeker/availableJobPosts':
+            async_views.retrieveAvailableJobPosts,
+        '/jobseeker/applications': async_views.retrieveApplications,
+        '/jobseeker/retrive/profile': async_views.getJobSeekerCv,
+    }
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        job_posts = [create_job_post(self.employer, job_post_title='Kock')
+                     for _ in range(4)]
+        for index, job_post in enumerate(job_posts[:2]):
+            create_applicant(job_post, 'seeker-%s@example.com' % index)
+        self.seeker = job_posts[0].job_applications.first().profile_id
+
+    async def assertSameResponse(self, user, url, **headers):
+        path = url.split('?')[0]
+        headers['Authorization'] = 'Bearer %s' % AccessToken.for_user(user)
+        expected = await sync_to_async(APIClient().get)(url, headers=headers)
+        response = await self.views[path](
+            AsyncRequestFactory().get(url, headers=headers))
+        self.assertEqual(response.status_code, expected.status_code, url)
+        self.assertEqual(response.content, expected.content, url)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+        return response
+
+    async def test_job_seeker_views(self):
+        for url in ('/jobseeker/availableJobPosts?page_size=1',
+                    '/jobseeker/availableJobPosts?paginate=false',
+                    '/jobseeker/availableJobPosts?q=kock&page_size=1',
+                    '/jobseeker/availableJobPosts?q=kock&paginate=false',
+                    '/jobseeker/applications',
+                    '/jobseeker/applications?paginate=false',
+                    '/jobseeker/retrive/profile',
+                    '/employer/jobposts'):
+            await self.assertSameResponse(self.seeker, url)
+
+    async def test_employer_views(self):
+        for url in ('/employer/jobposts?page_size=1',
+                    '/employer/jobposts?paginate=false',
+                    '/employer/jobposts?applicants=count&page_size=1',
+                    '/employer/jobposts?applicants=count&paginate=false',
+                    '/jobseeker/applications'):
+            await self.assertSameResponse(self.employer, url)
+
+    async def test_new_job_seeker_gets_a_cv(self):
+        user = await sync_to_async(create_user)('new@example.com')
+        response = await async_views.getJobSeekerCv(AsyncRequestFactory().get(
+            '/jobseeker/retrive/profile', headers={
+                'Authorization': 'Bearer %s' % AccessToken.for_user(user)}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await JobSeekerCv.objects.filter(
+            profile=user).acount(), 1)
+        expected = await self.assertSameResponse(
+            user, '/jobseeker/retrive/profile')
+        self.assertEqual(response.content, expected.content)
+
+    async def test_not_modified(self):
+        url = '/employer/jobposts'
+        etag = (await self.assertSameResponse(self.employer, url))['ETag']
+        response = await self.assertSameResponse(
+            self.employer, url, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_errors(self):
+        response = await async_views.retrieveApplications(
+            AsyncRequestFactory().get(
+                '/jobseeker/applications',
+                headers={'Authorization': 'Bearer invalid'}))
+        self.assertEqual(response.status_code, 401)
+        await self.assertSameResponse(
+            self.seeker, '/jobseeker/applications?cursor=invalid')
+
+    def test_middleware_is_async(self):
+        # Settings are read once; load them again as a worker with
+        # ASYNC_READ_VIEWS would.
+        with mock.patch.dict(os.environ, {'ASYNC_READ_VIEWS': 'True'}):
+            middleware = runpy.run_path(
+                project_settings.__file__)['MIDDLEWARE']
+        for path in middleware:
+            self.assertTrue(import_string(path).async_capable, path)
+
+    async def test_static_files(self):
+        async def django(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b'django'})
+
+        async def get(application, path):
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET', 'path': path,
+                'headers': [(b'accept-encoding', b'identity')]})
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output()
+            body = b''
+            while True:
+                message = await communicator.receive_output()
+                body += message['body']
+                if not message.get('more_body'):
+                    return start, body
+
+        with tempfile.TemporaryDirectory() as static_root:
+            with open(os.path.join(static_root, 'site.css'), 'wb') as file:
+                file.write(b'body {}' * 20000)
+            with override_settings(STATIC_ROOT=static_root,
+                                   STATIC_URL='/static/', DEBUG=False):
+                application = StaticFilesApplication(django)
+            start, body = await get(application, '/static/site.css')
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'text/css; charset="utf-8"'),
+                          start['headers'])
+            self.assertEqual(body, b'body {}' * 20000)
+
+            start, body = await get(application, '/jobseeker/applications')
+            self.assertEqual((start['status'], body), (404, b'django'))
+
+
+class ImportJobPostsTests(TestCase):
+    """
+    Employers upload many job posts at once; valid rows are created and
+    invalid ones reported by row number.
+    """
+
+    header = ('job_post_title,company_name,location,employment_type,'
+              'job_description,phone_number,expiration_date,is_published\n')
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def upload(self, body, content_type):
+        return self.client.generic(
+            'POST', '/employer/jobpost/import', body.encode(),
+            content_type=content_type)
+
+    def test_csv(self):
+        response = self.upload(
+            self.header
+            + 'Kock,Skärgårdens Kök,Lund,Deltid,Matlagning,0701234567,'
+            '2099-01-01,true\n'
+            + 'Kock,Skärgårdens Kök,Lund,Sometimes,Matlagning,0701234567,'
+            '2099-01-01,true\n'
+            + ',Skärgårdens Kök,Lund,Deltid,Matlagning,0701234567,'
+            '2099-01-01,\n', 'text/csv; charset=utf-8')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(
+            [(error['row'], list(error['errors']))
+             for error in response.json()['errors']],
+            [(2, ['employment_type']), (3, ['job_post_title'])])
+
+        job_post = JobPost.objects.get(job_post=self.employer)
+        self.assertEqual(job_post.company_name, 'Skärgårdens Kök')
+        self.assertTrue(job_post.is_published)
+        self.assertTrue(JobPostSearchTerm.objects.filter(
+            job_post=job_post, term='kock').exists())
+
+    def test_ndjson(self):
+        row = {'job_post_title': 'Kock', 'company_name': 'Skärgårdens Kök',
+               'location': 'Lund', 'employment_type': 'Provanställning',
+               'job_description': 'Matlagning', 'phone_number': '0701234567',
+               'expiration_date': '2099-01-01'}
+        body = '\n'.join([json.dumps(row)] * 5 + ['{"broken', '[]', ''])
+        response = self.upload(body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 5)
+        self.assertEqual([error['row'] for error in response.json()['errors']],
+                         [6, 7])
+        self.assertFalse(JobPost.objects.filter(is_published=True).exists())
+
+    def test_chunks(self):
+        rows = [{'job_post_title': 'Kock'}] + [
+            {'job_post_title': 'Kock', 'company_name': 'Skärgårdens Kök',
+             'location': 'Lund', 'employment_type': 'Deltid',
+             'job_description': 'Matlagning', 'phone_number': '0701234567',
+             'expiration_date': '2099-01-01', 'is_published': True}] * 4
+        with CaptureQueriesContext(connection) as queries:
+            created, errors = job_import.import_job_posts(
+                self.employer, iter(rows), chunk_size=2)
+        self.assertEqual((created, [error['row'] for error in errors]),
+                         (4, [1]))
+        self.assertEqual(JobPost.objects.count(), 4)
+        # Chunks of 1, 2 and 1 valid rows.
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "%s"'
+                                              % JobPost._meta.db_table)]
+        self.assertEqual(len(inserts), 3)
+
+    def test_scores_deferred(self):
+        create_applicant(create_job_post(self.employer), 'seeker@example.com')
+        MatchScoreUpdate.objects.all().delete()
+        with mock.patch.object(matching, 'rebuild_match_scores') as rebuild:
+            response = self.upload(
+                self.header + 'Kock,Skärgårdens Kök,Lund,Deltid,Matlagning,'
+                '0701234567,2099-01-01,true\n', 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        rebuild.assert_not_called()
+        self.assertEqual(
+            list(MatchScoreUpdate.objects.values_list('kind', flat=True)),
+            ['all'])
+
+    def test_unreadable_upload(self):
+        row = ('Kock,Skärgårdens Kök,Lund,Deltid,Matlagning,0701234567,'
+               '2099-01-01,true\n')
+        body = (self.header + row * 2).encode() + b'Kock,\xff\n' + row.encode()
+        response = self.client.generic(
+            'POST', '/employer/jobpost/import', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        # The rows before the unreadable one are imported and reported.
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(response.json()['errors'], [])
+        self.assertIn('row 3', response.json()['Error'])
+        self.assertEqual(JobPost.objects.count(), 2)
+        self.assertTrue(MatchScoreUpdate.objects.filter(kind='all').exists())
+
+    def test_nothing_valid(self):
+        response = self.upload(self.header + 'Kock\n', 'text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+
+    def test_rejected(self):
+        self.assertEqual(self.upload('{}', 'application/json').status_code,
+                         415)
+        self.client.force_authenticate(create_user('seeker@example.com'))
+        self.assertEqual(self.upload(self.header, 'text/csv').status_code,
+                         401)
+        self.assertFalse(JobPost.objects.exists())
+
+
+class CvDocumentTests(TestCase):
+    """
+    The whole CV is saved in one request, with a number of queries that
+    does not grow with the number of items.
+    """
+
+    def setUp(self):
+        employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(employer)
+        application = create_applicant(self.job_post, 'seeker@example.com')
+        self.cv = application.job_seeker_cv
+        self.experience = self.cv.work_experiences.get()
+        self.education = self.cv.educations.get()
+        self.client = APIClient()
+        self.client.force_authenticate(application.profile_id)
+
+    def experience_rows(self, count):
+        return [{'occupation_title': 'Kock %s' % index,
+                 'company_name': 'Skärgårdens Kök', 'years': '1',
+                 'description': 'Matlagning'} for index in range(count)]
+
+    def put(self, work_experiences, educations=()):
+        return self.client.put('/jobseeker/cv', {
+            'email': 'seeker@example.com', 'mobile_number': '0707654321',
+            'work_experiences': work_experiences,
+            'educations': list(educations)}, format='json')
+
+    def test_put_applies_the_diff(self):
+        kept = {'id': self.experience.pk, 'occupation_title': 'Kock',
+                'company_name': 'Bolaget AB', 'years': '3',
+                'description': 'Django'}
+        MatchScoreUpdate.objects.all().delete()
+        response = self.put([kept] + self.experience_rows(2))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(MatchScoreUpdate.objects.values_list('kind', 'object_id')),
+            [('cv', self.cv.pk)])
+
+        self.assertEqual(response.json()['mobile_number'], '0707654321')
+        self.assertEqual(
+            sorted(item['occupation_title']
+                   for item in response.json()['work_experiences']),
+            ['Kock', 'Kock 0', 'Kock 1'])
+        self.assertEqual(response.json()['educations'], [])
+        self.experience.refresh_from_db()
+        self.assertEqual((self.experience.occupation_title,
+                          self.experience.years), ('Kock', '3'))
+        self.assertFalse(Education.objects.exists())
+
+    def test_queries_do_not_grow_with_items(self):
+        self.education.delete()
+        counts = []
+        for size in (1, 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.put(
+                    [{'id': self.experience.pk, **self.experience_rows(1)[0],
+                      'years': str(size)}] + self.experience_rows(size))
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+            # Start the next round from one item again.
+            WorkExperince.objects.exclude(pk=self.experience.pk).delete()
+        self.assertEqual(counts[0], counts[1])
+
+    def test_patch(self):
+        response = self.client.patch(
+            '/jobseeker/cv', {'mobile_number': '0707654321'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['work_experiences']), 1)
+        self.assertEqual(len(response.json()['educations']), 1)
+
+        response = self.client.patch('/jobseeker/cv', {'educations': [
+            {'id': self.education.pk, 'level': 'Doktor'},
+            {'school_name': 'KTH'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['educations'][0], {})
+        self.assertEqual(sorted(response.json()['educations'][1]),
+                         ['description', 'level', 'orientation'])
+        self.education.refresh_from_db()
+        self.assertEqual(self.education.level, 'Master')
+
+    def test_items_of_other_cvs_are_rejected(self):
+        other = create_applicant(self.job_post, 'other@example.com')
+        other_experience = other.job_seeker_cv.work_experiences.get()
+        response = self.put([{'id': other_experience.pk,
+                              **self.experience_rows(1)[0]}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['work_experiences'][0],
+                         {'id': ['Not an item of this CV.']})
+        self.assertTrue(
+            WorkExperince.objects.filter(pk=self.experience.pk).exists())
+
+
+class ExportApplicantsTests(TestCase):
+    """Employers download their applicants, CV included, as a stream."""
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_posts = [create_job_post(self.employer) for _ in range(2)]
+        for index in range(3):
+            create_applicant(self.job_posts[index % 2],
+                             'seeker-%s@example.com' % index)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def export(self, query):
+        response = self.client.get('/employer/applicants/export' + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        applicants = [json.loads(line) for line in self.export(
+            '?type=ndjson').splitlines()]
+        self.assertEqual([applicant['email'] for applicant in applicants],
+                         ['seeker-0@example.com', 'seeker-2@example.com',
+                          'seeker-1@example.com'])
+        self.assertEqual(applicants[0]['work_experiences'], [{
+            'occupation_title': 'Utvecklare', 'company_name': 'Bolaget AB',
+            'years': '2', 'description': 'Django'}])
+        self.assertEqual(applicants[0]['educations'][0]['school_name'],
+                         'Chalmers')
+
+    def test_csv_for_one_job_post(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(
+            '?job_post=%s' % self.job_posts[1].pk))))
+        self.assertEqual([row['email'] for row in rows],
+                         ['seeker-1@example.com'])
+        self.assertEqual(json.loads(rows[0]['educations'])[0]['level'],
+                         'Master')
+
+    def test_chunks(self):
+        job_posts = JobPost.objects.filter(job_post=self.employer)
+        # Job posts, then two pages of applications per post, and the CV
+        # items of each chunk.
+        with self.assertNumQueries(1 + 2 * 2 + 2 * 2):
+            chunks = list(exports.applicant_chunks(job_posts, 2))
+        self.assertEqual([[applicant['email'] for applicant in chunk]
+                          for chunk in chunks],
+                         [['seeker-0@example.com', 'seeker-2@example.com'],
+                          ['seeker-1@example.com']])
+
+    def test_streamed_chunk_by_chunk(self):
+        with mock.patch.object(exports, 'CHUNK_SIZE', 2):
+            response = self.client.get(
+                '/employer/applicants/export?type=ndjson')
+            self.assertTrue(response.streaming)
+            content = iter(response.streaming_content)
+            # The first chunk is sent after reading the job posts, one
+            # page of applications and its CV items, not all of them.
+            with self.assertNumQueries(1 + 1 + 2):
+                first = next(content)
+            self.assertEqual(len(first.splitlines()), 2)
+            with CaptureQueriesContext(connection) as queries:
+                rest = b''.join(content)
+        self.assertEqual(len(rest.splitlines()), 1)
+        self.assertEqual(len(queries), 3 + 2)
+
+    def test_csv_formulas(self):
+        CustomUser.objects.filter(email='seeker-1@example.com').update(
+            first_name='=HYPERLINK("http://example.com")',
+            last_name='-1+1')
+        JobSeekerCv.objects.filter(email='seeker-1@example.com').update(
+            mobile_number='+46701234567')
+        rows = list(csv.DictReader(io.StringIO(self.export(
+            '?job_post=%s' % self.job_posts[1].pk))))
+        self.assertEqual(rows[0]['first_name'],
+                         '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[0]['last_name'], "'-1+1")
+        self.assertEqual(rows[0]['mobile_number'], "'+46701234567")
+        self.assertEqual(rows[0]['email'], 'seeker-1@example.com')
+        self.assertEqual(exports.csv_cell('@SUM(A1)'), "'@SUM(A1)")
+        self.assertEqual(exports.csv_cell(12), 12)
+
+    def test_chunks_ordered(self):
+        job_posts = JobPost.objects.filter(
+            job_post=self.employer).order_by('-pk')
+        self.assertEqual(
+            [applicant['email']
+             for chunk in exports.applicant_chunks(job_posts, 2)
+             for applicant in chunk],
+            ['seeker-0@example.com', 'seeker-2@example.com',
+             'seeker-1@example.com'])
+
+    def test_rejected(self):
+        other = create_user('other@example.com', is_ag=True)
+        response = self.client.get('/employer/applicants/export?job_post=%s'
+                                   % create_job_post(other).pk)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/employer/applicants/export?type=xml')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(create_user('seeker@example.com'))
+        response = self.client.get('/employer/applicants/export')
+        self.assertEqual(response.status_code, 401)
+
+
+class ArchiveTests(TestCase):
+    """
+    Job posts that expired long ago leave the hot tables for the archive,
+    together with their applications, and employers can still read them.
+    """
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        today = now().date()
+        self.old = create_job_post(
+            self.employer, expiration_date=today - timedelta(days=60))
+        self.recent = create_job_post(
+            self.employer, expiration_date=today - timedelta(days=5))
+        self.active = create_job_post(self.employer)
+        for index in range(2):
+            create_applicant(self.old, 'old-%s@example.com' % index)
+        create_applicant(self.active, 'active@example.com')
+
+    def test_sweep(self):
+        with mock.patch('time.sleep') as sleep:
+            call_command('archive_job_posts', batch_size=1,
+                         stdout=io.StringIO())
+        sleep.assert_called_once()
+
+        self.assertEqual(set(JobPost.objects.values_list('id', flat=True)),
+                         {self.recent.pk, self.active.pk})
+        self.assertEqual(Application.objects.count(), 1)
+        self.assertFalse(JobPostSearchTerm.objects.filter(
+            job_post=self.old.pk).exists())
+        archived = ArchivedJobPost.objects.get()
+        self.assertEqual((archived.pk, archived.job_post_title),
+                         (self.old.pk, self.old.job_post_title))
+        self.assertEqual(
+            sorted(archived.applications.values_list(
+                'job_seeker_cv__email', flat=True)),
+            ['old-0@example.com', 'old-1@example.com'])
+        # The CVs stay with their owners.
+        self.assertEqual(JobSeekerCv.objects.count(), 3)
+
+    def test_employer_reads_the_archive(self):
+        archive.sweep()
+        client = APIClient()
+        client.force_authenticate(self.employer)
+        response = client.get('/employer/jobposts/archived')
+        self.assertEqual(response.status_code, 200)
+        [job_post] = response.json()['results']
+        self.assertEqual(job_post['id'], self.old.pk)
+        self.assertEqual(
+            sorted(application['job_seeker_cv']['email']
+                   for application in job_post['applications']),
+            ['old-0@example.com', 'old-1@example.com'])
+
+        client.force_authenticate(create_user('seeker@example.com'))
+        response = client.get('/employer/jobposts/archived')
+        self.assertEqual(response.status_code, 401)
+
+    def test_retention(self):
+        archive.sweep()
+        ArchivedJobPost.objects.update(
+            archived_at=now() - timedelta(days=800))
+        with override_settings(ARCHIVE_RETENTION_DAYS=0):
+            self.assertEqual(archive.sweep(), (0, 0))
+        self.assertEqual(archive.sweep(), (0, 1))
+        self.assertFalse(ArchivedApplication.objects.exists())
+
+
+class ApplicationCountTests(TestCase):
+    """
+    Job posts carry their number of applications and the time of the
+    latest one, so the employer dashboard does not need the applicants.
+    """
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(self.employer)
+        self.seeker = create_user('seeker@example.com')
+        self.client = APIClient()
+
+    def assertCounts(self, count, last_application_at):
+        self.job_post.refresh_from_db()
+        self.assertEqual(
+            (self.job_post.application_count,
+             self.job_post.last_application_at),
+            (count, last_application_at))
+
+    def test_apply_and_withdraw(self):
+        first = create_applicant(self.job_post, 'first@example.com')
+        self.assertCounts(1, first.application_date)
+
+        self.client.force_authenticate(self.seeker)
+        response = self.client.post('/jobseeker/apply/%s' % self.job_post.pk)
+        self.assertEqual(response.status_code, 200)
+        second = Application.objects.get(profile_id=self.seeker)
+        self.assertCounts(2, second.application_date)
+
+        response = self.client.delete(
+            '/jobseeker/delete/application/%s' % self.job_post.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertCounts(1, first.application_date)
+
+        first.profile_id.delete()
+        self.assertCounts(0, None)
+
+    def test_repair(self):
+        application = create_applicant(self.job_post, 'first@example.com')
+        other = create_job_post(self.employer)
+        JobPost.objects.update(application_count=5, last_application_at=None)
+
+        out = io.StringIO()
+        call_command('repair_application_counts', batch_size=1, stdout=out)
+        self.assertIn('Fixed 2 job posts', out.getvalue())
+        self.assertCounts(1, application.application_date)
+        other.refresh_from_db()
+        self.assertEqual(other.application_count, 0)
+
+        call_command('repair_application_counts', stdout=out)
+        self.assertIn('Fixed 0 job posts', out.getvalue())
+
+    def test_listing_with_counts(self):
+        application = create_applicant(self.job_post, 'first@example.com')
+        self.client.force_authenticate(self.employer)
+        # The version check and the job posts, no applicants.
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                '/employer/jobposts?paginate=false&applicants=count')
+        [job_post] = response.json()
+        self.assertNotIn('applications', job_post)
+        self.assertEqual(job_post['application_count'], 1)
+        self.assertEqual(
+            job_post['last_application_at'],
+            application.application_date.isoformat().replace('+00:00', 'Z'))
+
+
+class FacetTests(TestCase):
+    """
+    The feed facets are read from counts kept per location, employment
+    type and expiration date, which every write path keeps in step with
+    the job posts.
+    """
+
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.seeker = create_user('seeker@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+        self.job_posts = [
+            create_job_post(self.employer),
+            create_job_post(self.employer),
+            create_job_post(self.employer, location='Stockholm',
+                            employment_type='Provanställning'),
+            create_job_post(self.employer, is_published=False),
+            create_job_post(self.employer, location='Malmö',
+                            expiration_date=now().date() - timedelta(days=1)),
+        ]
+
+    def facets(self, query=''):
+        response = self.client.get('/jobseeker/availableJobPosts/facets'
+                                   + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertConsistent(self):
+        def rows():
+            return set(JobPostFacet.objects.filter(count__gt=0).values_list(
+                'location', 'employment_type', 'expiration_date', 'count'))
+        maintained = rows()
+        facets.rebuild_facets()
+        self.assertEqual(maintained, rows())
+
+    def test_counts(self):
+        self.assertEqual(self.facets(), {
+            'location': [{'value': 'Göteborg', 'count': 2},
+                         {'value': 'Stockholm', 'count': 1}],
+            'employment_type': [
+                {'value': 'Tillsvidareanställning', 'count': 0},
+                {'value': 'Provanställning', 'count': 1},
+                {'value': 'Deltid', 'count': 2}],
+        })
+        self.assertEqual(self.facets('?location=holm')['employment_type'], [
+            {'value': 'Tillsvidareanställning', 'count': 0},
+            {'value': 'Provanställning', 'count': 1},
+            {'value': 'Deltid', 'count': 0}])
+        self.assertConsistent()
+
+        self.client.force_authenticate(self.employer)
+        response = self.client.get('/jobseeker/availableJobPosts/facets')
+        self.assertEqual(response.status_code, 401)
+
+    def test_applied_posts_are_left_out(self):
+        Application.objects.create(
+            profile_id=self.seeker, job_post=self.job_posts[0],
+            job_seeker_cv=JobSeekerCv.objects.create(
+                profile=self.seeker, email=self.seeker.email,
+                mobile_number='0701234567'))
+        self.assertEqual(self.facets()['location'], [
+            {'value': 'Göteborg', 'count': 1},
+            {'value': 'Stockholm', 'count': 1}])
+
+    def test_writes(self):
+        self.client.force_authenticate(self.employer)
+        self.client.patch(
+            '/employer/jobpost/update/%s' % self.job_posts[0].pk,
+            {'location': 'Lund'}, format='json')
+        self.client.patch(
+            '/employer/jobpost/update/%s' % self.job_posts[3].pk,
+            {'is_published': True}, format='json')
+        self.client.delete(
+            '/employer/jobpost/delete/%s' % self.job_posts[2].pk)
+        job_import.import_job_posts(self.employer, [{
+            'job_post_title': 'Kock', 'company_name': 'Skärgårdens Kök',
+            'location': 'Lund', 'employment_type': 'Tillsvidareanställning',
+            'job_description': 'Matlagning', 'phone_number': '0701234567',
+            'expiration_date': '2099-01-01', 'is_published': True}])
+        self.assertConsistent()
+
+        self.client.force_authenticate(self.seeker)
+        self.assertEqual(self.facets()['location'], [
+            {'value': 'Göteborg', 'count': 2},
+            {'value': 'Lund', 'count': 2}])
+
+        JobPost.objects.update(
+            expiration_date=now().date() - timedelta(days=60))
+        facets.rebuild_facets()
+        archive.sweep()
+        self.assertFalse(JobPostFacet.objects.exists())
+
+
+class AutocompleteTests(TestCase):
+    """
+    Typeahead suggestions come from an in-process prefix index of the
+    active job posts that writes update in place.
+    """
+
+    def setUp(self):
+        autocomplete._state.clear()
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_posts = [
+            create_job_post(self.employer),
+            create_job_post(self.employer, location=' göteborg'),
+            create_job_post(self.employer, location='Gävle',
+                            job_post_title='Kock'),
+            create_job_post(self.employer, location='Gällivare',
+                            is_published=False),
+            create_job_post(self.employer, location='Göta',
+                            expiration_date=now().date() - timedelta(days=1)),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('seeker@example.com'))
+
+    def suggest(self, query):
+        response = self.client.get('/jobseeker/autocomplete' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_suggestions(self):
+        self.assertEqual(self.suggest('?field=location&prefix=G'), [
+            {'value': 'Gävle', 'count': 1},
+            {'value': 'Göteborg', 'count': 2}])
+        self.assertEqual(self.suggest('?field=location&prefix=gote'), [
+            {'value': 'Göteborg', 'count': 2}])
+        self.assertEqual(self.suggest('?field=title&prefix=sys&limit=1'), [
+            {'value': 'Systemutvecklare', 'count': 2}])
+        self.assertEqual(self.suggest('?field=title&prefix=x'), [])
+
+        response = self.client.get('/jobseeker/autocomplete?field=company')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.employer)
+        response = self.client.get('/jobseeker/autocomplete?field=title')
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_update_the_index_in_place(self):
+        index = autocomplete.indexes()['location']
+        with self.captureOnCommitCallbacks(execute=True):
+            create_job_post(self.employer, location='Lund')
+            self.job_posts[0].location = 'Lund'
+            self.job_posts[0].save()
+            self.job_posts[2].delete()
+            self.job_posts[3].is_published = True
+            self.job_posts[3].save()
+        self.assertIs(autocomplete.indexes()['location'], index)
+        self.assertEqual(index.lookup(''), [
+            {'value': 'Gällivare', 'count': 1},
+            {'value': 'göteborg', 'count': 1},
+            {'value': 'Lund', 'count': 2}])
+
+        autocomplete._state.clear()
+        self.assertEqual(autocomplete.indexes()['location'].lookup(''),
+                         index.lookup(''))
+
+    def test_version_checked_at_intervals(self):
+        autocomplete.indexes()
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                autocomplete.suggest('location', 'g')
+
+        # Another worker moves a post and announces the change.
+        JobPost.objects.filter(pk=self.job_posts[2].pk).update(
+            location='Lund')
+        autocomplete.job_posts_changed()
+        self.assertEqual(autocomplete.suggest('location', 'lund'), [])
+        with override_settings(AUTOCOMPLETE_CHECK_INTERVAL=0):
+            self.assertEqual(autocomplete.suggest('location', 'lund'), [
+                {'value': 'Lund', 'count': 1}])
+
+
+class MetricsTests(TestCase):
+    """
+    Every request is timed per route, and /metrics adds up what all the
+    workers wrote for Prometheus.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            METRICS_DIR=directory.name, METRICS_TOKEN='secret')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics._stats.clear()
+        self.directory = directory.name
+        self.client = APIClient()
+
+    def scrape(self):
+        response = self.client.get(
+            '/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_requests_are_recorded(self):
+        create_job_post(create_user('employer@example.com', is_ag=True))
+        self.client.force_authenticate(create_user('seeker@example.com'))
+        for _ in range(2):
+            self.client.get('/jobseeker/availableJobPosts')
+        self.client.get('/no/such/page')
+        self.client.force_authenticate(None)
+
+        samples = self.scrape()
+        labels = '{method="GET",route="jobseeker/availableJobPosts"%s}'
+        self.assertEqual(samples['job_match_requests_total'
+                                 + labels % ',status="200"'], 2)
+        self.assertEqual(samples['job_match_request_duration_seconds_count'
+                                 + labels % ''], 2)
+        self.assertEqual(samples['job_match_request_duration_seconds_bucket'
+                                 + labels % ',le="+Inf"'], 2)
+        self.assertGreater(
+            samples['job_match_db_queries_total' + labels % ''], 0)
+        self.assertGreater(
+            samples['job_match_response_bytes_total' + labels % ''], 0)
+        self.assertEqual(samples[
+            'job_match_requests_total'
+            '{method="GET",route="<unmatched>",status="404"}'], 1)
+
+    def test_workers_are_added_up(self):
+        self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        with open(os.path.join(self.directory, 'other.json'), 'w') as file:
+            json.dump({'GET metrics': {
+                **metrics._empty(), 'count': 5, 'statuses': {'200': 5}}},
+                file)
+        samples = self.scrape()
+        self.assertEqual(samples[
+            'job_match_requests_total'
+            '{method="GET",route="metrics",status="200"}'], 6)
+
+    def test_protected(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(
+            '/metrics', headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get(
+                '/metrics', headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 404)
+
+    def test_concurrent_flushes(self):
+        metrics.record('metrics', 'GET', 200, 0.01, 1, 0.001, 10)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: metrics.flush(), range(32)))
+        self.assertEqual(os.listdir(self.directory),
+                         ['%s.json' % metrics.worker_id()])
+
+    async def test_async_requests(self):
+        async def view(request):
+            await JobPost.objects.acount()
+            return JsonResponse({})
+
+        middleware = metrics.MetricsMiddleware(view)
+        request = AsyncRequestFactory().get('/')
+        request.resolver_match = None
+        await middleware(request)
+        self.assertEqual(metrics._stats['GET <unmatched>']['queries'], 1)
+
+
+class BenchmarkRoutesTests(TestCase):
+    def test_every_route_benchmarked(self):
+        self.assertIn('login', _routes.url_routes())
+        self.assertEqual(_routes.uncovered_routes(), set())
+
+    def test_route_stats(self):
+        route = 'jobseeker/autocomplete'
+        client = APIClient()
+        client.force_authenticate(create_user('seeker@example.com'))
+        before = metrics.route_stats('GET', route)
+        client.get('/jobseeker/autocomplete?field=title&prefix=s')
+        after = metrics.route_stats('GET', route)
+        self.assertEqual(after['count'], before['count'] + 1)
+        self.assertEqual(after['statuses']['200'],
+                         before['statuses'].get('200', 0) + 1)
+        self.assertEqual(metrics.route_stats('GET', 'nowhere')['count'], 0)
+
+
+class SeedTests(TestCase):
+    def seed(self, **options):
+        options = {'employers': 2, 'job_seekers': 5, 'job_posts': 12,
+                   'applications': 13, 'batch_size': 4, **options}
+        call_command('seed', stdout=io.StringIO(), **options)
+
+    def test_seed(self):
+        self.seed()
+        self.assertEqual(CustomUser.objects.filter(is_ag=True).count(), 2)
+        self.assertEqual(JobSeekerCv.objects.count(), 5)
+        self.assertEqual(JobPost.objects.count(), 12)
+        self.assertEqual(Application.objects.count(), 13)
+        self.assertEqual(
+            JobPost.objects.aggregate(total=Sum('application_count')),
+            {'total': 13})
+        self.assertTrue(WorkExperince.objects.exists())
+        self.assertTrue(JobPostSearchTerm.objects.exists())
+        self.assertEqual(
+            JobPostFacet.objects.aggregate(total=Sum('count'))['total'],
+            JobPost.objects.filter(is_published=True).count())
+        user = CustomUser.objects.get(email='seed-seeker-4@example.com')
+        self.assertTrue(user.check_password('seed-password'))
+        # The sequences moved past the explicit keys.
+        create_user('new@example.com')
+
+    def test_deterministic(self):
+        self.seed()
+        self.seed(prefix='again')
+        titles = list(JobPost.objects.order_by('id').values_list(
+            'job_post_title', 'job_description'))
+        self.assertEqual(titles[:12], titles[12:])
+
+    def test_prefix_taken(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class ApplyTests(TestCase):
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.job_post = create_job_post(self.employer)
+        self.seeker = create_applicant(
+            create_job_post(self.employer), 'seeker@example.com').profile_id
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+
+    def apply(self, job_post_id=None, **headers):
+        if job_post_id is None:
+            job_post_id = self.job_post.pk
+        return self.client.post(
+            '/jobseeker/apply/%s' % job_post_id, headers=headers)
+
+    def test_apply(self):
+        # The insert and the job post counters, in a savepoint here.
+        with self.assertNumQueries(4):
+            response = self.apply()
+        self.assertEqual(response.status_code, 200)
+        application = Application.objects.get(job_post=self.job_post)
+        self.assertEqual(application.job_seeker_cv.profile, self.seeker)
+        self.job_post.refresh_from_db()
+        self.assertEqual(self.job_post.application_count, 1)
+        self.assertEqual(self.job_post.last_application_at,
+                         application.application_date)
+
+        response = self.apply()
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            Application.objects.filter(job_post=self.job_post).count(), 1)
+        self.job_post.refresh_from_db()
+        self.assertEqual(self.job_post.application_count, 1)
+
+    def test_missing_job_post(self):
+        self.assertEqual(self.apply(job_post_id=0).status_code, 404)
+        self.assertEqual(self.apply(job_post_id='abc').status_code, 404)
+
+    def test_without_cv(self):
+        user = create_user('new@example.com')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.apply().status_code, 200)
+        self.assertEqual(
+            Application.objects.get(profile_id=user).job_seeker_cv.email,
+            'new@example.com')
+
+    def test_idempotency_key(self):
+        response = self.apply(idempotency_key='click-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+        # A retry gets the first response again, not "already applied".
+        with self.assertNumQueries(1):
+            response = self.apply(idempotency_key='click-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(),
+                         {"Message": "Application successful"})
+        self.assertEqual(response.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.apply().status_code, 204)
+
+        other = create_job_post(self.employer)
+        response = self.apply(job_post_id=other.pk, idempotency_key='click-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Application.objects.filter(job_post=other).exists())
+        # Keys are per user.
+        self.client.force_authenticate(create_user('other@example.com'))
+        self.assertEqual(
+            self.apply(idempotency_key='click-1').status_code, 200)
+
+    def test_idempotency_key_in_progress(self):
+        def retry(user, job_post_id):
+            # A retry arriving while the first request is still running.
+            self.assertEqual(
+                self.apply(idempotency_key='click-1').status_code, 409)
+            return True
+
+        with mock.patch.object(applying, 'apply', side_effect=retry):
+            response = self.apply(idempotency_key='click-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.apply(idempotency_key='click-1').status_code,
+                         200)
+
+
+class BatchApplyTests(TestCase):
+    def setUp(self):
+        self.employer = create_user('employer@example.com', is_ag=True)
+        self.applied = create_job_post(self.employer)
+        self.seeker = create_applicant(
+            self.applied, 'seeker@example.com').profile_id
+        self.client = APIClient()
+        self.client.force_authenticate(self.seeker)
+
+    def apply(self, job_post_ids):
+        return self.client.post('/jobseeker/apply', {
+            'job_post_ids': job_post_ids}, format='json')
+
+    def test_apply(self):
+        new = [create_job_post(self.employer) for _ in range(3)]
+        unpublished = create_job_post(self.employer, is_published=False)
+        expired = create_job_post(
+            self.employer, expiration_date=now().date() - timedelta(days=1))
+        # The same queries for one job post as for many: the job posts, the
+        # applications, the CV, the insert and the counters, in a savepoint.
+        with self.assertNumQueries(7):
+            response = self.apply([new[0].pk])
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(7):
+            response = self.apply([
+                new[1].pk, self.applied.pk, unpublished.pk, 0, expired.pk,
+                new[2].pk, new[1].pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [
+            {'job_post': new[1].pk, 'status': 'applied'},
+            {'job_post': self.applied.pk, 'status': 'already_applied'},
+            {'job_post': unpublished.pk, 'status': 'closed'},
+            {'job_post': 0, 'status': 'not_found'},
+            {'job_post': expired.pk, 'status': 'closed'},
+            {'job_post': new[2].pk, 'status': 'applied'},
+        ]})
+
+        for job_post in new:
+            application = Application.objects.get(job_post=job_post)
+            self.assertEqual(application.profile_id, self.seeker)
+            self.assertEqual(application.job_seeker_cv.profile, self.seeker)
+            job_post.refresh_from_db()
+            self.assertEqual(job_post.application_count, 1)
+            self.assertEqual(job_post.last_application_at,
+                             application.application_date)
+        self.assertFalse(Application.objects.filter(
+            job_post__in=[unpublished, expired]).exists())
+        self.assertEqual(
+            application_counts.repair_application_counts(), 0)
+
+    def test_without_cv(self):
+        user = create_user('new@example.com')
+        self.client.force_authenticate(user)
+        job_post = create_job_post(self.employer)
+        self.assertEqual(self.apply([job_post.pk]).status_code, 200)
+        self.assertEqual(
+            Application.objects.get(profile_id=user).job_seeker_cv.email,
+            'new@example.com')
+
+    def test_retry_after_conflict(self):
+        job_post = create_job_post(self.employer)
+        bulk_create = Application.objects.bulk_create
+
+        def conflict(applications):
+            # The unique constraint, violated by a concurrent apply.
+            patched.side_effect = bulk_create
+            raise IntegrityError
+
+        with mock.patch.object(Application.objects, 'bulk_create',
+                               side_effect=conflict) as patched:
+            response = self.apply([job_post.pk])
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(response.json(), {'results': [
+            {'job_post': job_post.pk, 'status': 'applied'}]})
+        job_post.refresh_from_db()
+        self.assertEqual(job_post.application_count, 1)
+
+    def test_invalid(self):
+        for job_post_ids in [[], 'abc', ['abc'], None,
+                             list(range(1, applying.MAX_BATCH_SIZE + 2))]:
+            self.assertEqual(self.apply(job_post_ids).status_code, 400)
+        self.assertEqual(
+            self.client.post('/jobseeker/apply', {}, format='json')
+            .status_code, 400)
+        self.client.force_authenticate(self.employer)
+        self.assertEqual(self.apply([self.applied.pk]).status_code, 401)
+
+
+class ConcurrentApplyTests(TransactionTestCase):
+    """
+    Requests from many threads at once. An in-memory SQLite database makes
+    concurrent writers fail with "table is locked" instead of waiting for
+    each other, so with SQLite these run on a database file.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            self.use_database(os.path.join(directory.name, 'test.sqlite3'))
+            call_command('migrate', verbosity=0)
+            call_command('createcachetable', verbosity=0)
+
+    def use_database(self, name):
+        # An in-memory database is gone once its connection closes, so the
+        # test database connection is put aside until the test is done.
+        settings_dict = connections.settings['default']
+        memory_connection = connections['default']
+        memory_name = settings_dict['NAME']
+        settings_dict['NAME'] = name
+        connections['default'] = connections.create_connection('default')
+
+        def restore():
+            connections['default'].close()
+            settings_dict['NAME'] = memory_name
+            connections['default'] = memory_connection
+        self.addCleanup(restore)
+
+    def test_parallel_applies(self):
+        employer = create_user('employer@example.com', is_ag=True)
+        job_post = create_job_post(employer)
+        seeker = create_applicant(
+            create_job_post(employer), 'seeker@example.com').profile_id
+
+        def apply(_):
+            client = APIClient()
+            client.force_authenticate(seeker)
+            try:
+                return client.post(
+                    '/jobseeker/apply/%s' % job_post.pk).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            statuses = list(executor.map(apply, range(200)))
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(statuses.count(204), 199)
+        self.assertEqual(
+            Application.objects.filter(job_post=job_post).count(), 1)
+        job_post.refresh_from_db()
+        self.assertEqual(job_post.application_count, 1)
+
+    def test_parallel_batch_applies(self):
+        employer = create_user('employer@example.com', is_ag=True)
+        job_posts = [create_job_post(employer) for _ in range(5)]
+        seeker = create_applicant(
+            create_job_post(employer), 'seeker@example.com').profile_id
+        job_post_ids = [job_post.pk for job_post in job_posts]
+
+        def apply(index):
+            client = APIClient()
+            client.force_authenticate(seeker)
+            try:
+                # Alternately the single and the batch apply.
+                if index % 2:
+                    client.post(
+                        '/jobseeker/apply/%s' % job_post_ids[index % 5])
+                    return []
+                response = client.post('/jobseeker/apply', {
+                    'job_post_ids': job_post_ids}, format='json')
+                self.assertEqual(response.status_code, 200)
+                return response.json()['results']
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = sum(executor.map(apply, range(100)), [])
+        self.assertEqual(len(results), 250)
+        self.assertEqual(
+            {result['status'] for result in results},
+            {'applied', 'already_applied'})
+        for job_post in job_posts:
+            self.assertEqual(
+                Application.objects.filter(job_post=job_post).count(), 1)
+            job_post.refresh_from_db()
+            self.assertEqual(job_post.application_count, 1)
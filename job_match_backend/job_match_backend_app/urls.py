@@ -1,13 +1,28 @@
+from django.conf import settings
 from django.urls import path, include
 from . import views
 
+# The read endpoints polled by the frontend have async versions for ASGI.
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
     path('', views.index),
     path("delete/user", views.deleteUser, name="DeleteUser"),
     path("create/user", views.createUser, name="createUser"),
     path('user/info', views.getUser, name="getUser"),
-    path('employer/jobposts', views.retrieveEmployerJobPosts, name="jobposts"),
+    path('metrics', views.getMetrics, name="metrics"),
+    path('employer/jobposts', read_views.retrieveEmployerJobPosts,
+         name="jobposts"),
+    path('employer/jobposts/archived', views.retrieveArchivedJobPosts,
+         name="archivedJobPosts"),
     path('employer/jobpost/create', views.createJobPost),
+    path('employer/jobpost/import', views.importJobPosts,
+         name="importJobPosts"),
+    path('employer/applicants/export', views.exportApplicants,
+         name="exportApplicants"),
     path('employer/jobpost/update/<str:id>',
          views.updateJobPost, name="updateJobPost"),
     path('employer/jobpost/delete/<str:id>',
@@ -16,14 +31,23 @@ urlpatterns = [
          views.getJobPostById, name="getJobPostById"),
     path('employer/jobpost/<str:job_id>/application/<str:application_id>',
          views.getApplication, name="getApplication"),
+    path('employer/jobpost/<str:id>/applicants/ranked',
+         views.rankApplicants, name="rankApplicants"),
     path('jobseeker/availableJobPosts',
-         views.retrieveAvailableJobPosts, name="availableJobPosts"),
-    path('jobseeker/applications', views.retrieveApplications,
+         read_views.retrieveAvailableJobPosts, name="availableJobPosts"),
+    path('jobseeker/availableJobPosts/facets',
+         views.retrieveJobPostFacets, name="jobPostFacets"),
+    path('jobseeker/autocomplete', views.autocompleteJobPosts,
+         name="autocomplete"),
+    path('jobseeker/recommendedJobPosts',
+         views.retrieveRecommendedJobPosts, name="recommendedJobPosts"),
+    path('jobseeker/applications', read_views.retrieveApplications,
          name="applications"),
     path('jobseeker/info/update', views.updateJobSeekerInfo,
          name="updateJobSeekerInfo"),
-    path('jobseeker/retrive/profile', views.getJobSeekerCv,
+    path('jobseeker/retrive/profile', read_views.getJobSeekerCv,
          name="getJobSeekerCv"),
+    path('jobseeker/cv', views.saveJobSeekerCv, name="saveJobSeekerCv"),
     path('jobseeker/workexperince/create',
          views.createWorkExperince, name="createWorkexperince"),
     path('jobseeker/workexperince/delete/<str:id>',
@@ -36,6 +60,7 @@ urlpatterns = [
          views.deleteEducation, name='deleteEducation'),
     path('jobseeker/education/update/<str:id>',
          views.updateEducation, name='updateEducation'),
+    path('jobseeker/apply', views.applyToJobs, name="applyToJobs"),
     path('jobseeker/apply/<str:id>', views.applyToJob, name="applyToJob"),
     path('jobseeker/delete/application/<int:id>',
          views.deleteApplicationEmployee, name='deleteApplicationEmployee'),
@@ -1,11 +1,15 @@
+import hmac
 import json
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from rest_framework.response import Response
 from .serializers import *
 from .models import Application, Education, JobPost, JobSeekerCv, WorkExperince
+from .models import ArchivedJobPost, MatchScore
 from rest_framework.decorators import api_view
 from rest_framework import status
+from django.db.models import Max
 from django.utils.timezone import now
 from rest_framework.views import APIView
 from django.utils.decorators import method_decorator
@@ -14,7 +18,16 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+# After the star import, which brings in the project settings module.
+from django.conf import settings
+from . import (applying, autocomplete, exports, facets, fast_serializers,
+               feed, job_import, matching, metrics, outbox)
+from .conditional import (conditional_get, employer_job_posts_version,
+                          job_seeker_applications_version,
+                          job_seeker_cv_version)
+from .idempotency import idempotent
+from .pagination import KeysetPagination, RankedPagination
+from .search import search_job_posts
 import os
 
 # Create your views here.
@@ -25,6 +38,22 @@ def index(request):
     return HttpResponse("Använd rätt route för att hitta saker")
 
 
+def getMetrics(request):
+    # A plain view: Prometheus sends a static token, not a JWT.
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=404)
+    expected = 'Bearer %s' % settings.METRICS_TOKEN
+    if not hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(),
+            expected.encode()):
+        return HttpResponse(status=401, headers={
+            'WWW-Authenticate': 'Bearer'})
+
+    metrics.flush()
+    return HttpResponse(metrics.render(metrics.collect()),
+                        content_type='text/plain; version=0.0.4')
+
+
 @api_view(['GET'])
 def getUser(request):
     user = request.user
@@ -37,10 +66,48 @@ def getUser(request):
 
 
 @api_view(['GET'])
+@conditional_get(employer_job_posts_version)
 def retrieveEmployerJobPosts(request):
     if request.user.is_authenticated and request.user.is_ag:
         job_posts = JobPost.objects.filter(job_post=request.user)
-        serializer = JobPostSerializer(job_posts, many=True)
+        # ?applicants=count lists the counts instead of the applicants.
+        if request.query_params.get('applicants') == 'count':
+            serializer_class = JobPostSummarySerializer
+        else:
+            job_posts = job_posts.with_applicants()
+            serializer_class = JobPostSerializer
+
+        paginator = KeysetPagination(ordering=('expiration_date', 'id'))
+        if not paginator.is_disabled(request):
+            page = paginator.paginate_queryset(job_posts, request)
+            serializer = serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = serializer_class(job_posts, many=True)
+        return JsonResponse(
+            serializer.data,
+            safe=False,
+            json_dumps_params={
+                'ensure_ascii': False})
+    else:
+        return JsonResponse(
+            {"Error": "You are not logged in or not authorized"}, status=401)
+
+
+@api_view(['GET'])
+def retrieveArchivedJobPosts(request):
+    if request.user.is_authenticated and request.user.is_ag:
+        job_posts = ArchivedJobPost.objects.with_applicants().filter(
+            job_post=request.user)
+
+        paginator = KeysetPagination(ordering=('-expiration_date', '-id'))
+        if not paginator.is_disabled(request):
+            page = paginator.paginate_queryset(job_posts, request)
+            serializer = ArchivedJobPostSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = ArchivedJobPostSerializer(
+            job_posts.order_by('-expiration_date', '-id'), many=True)
         return JsonResponse(
             serializer.data,
             safe=False,
@@ -72,10 +139,66 @@ def createJobPost(request):
                             status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(['POST'])
+def importJobPosts(request):
+    # The body is read as a stream of CSV or NDJSON rows, not parsed by DRF.
+    if not (request.user.is_authenticated and request.user.is_ag):
+        return JsonResponse(
+            {"Error": "You are not logged in or not authorized"},
+            status=status.HTTP_401_UNAUTHORIZED)
+
+    if job_import.reader_for(request.content_type) is None:
+        return Response(
+            {"Error": "Send text/csv or application/x-ndjson"},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    rows = job_import.read_rows(request.content_type, request.stream or [])
+    try:
+        created, errors = job_import.import_job_posts(request.user, rows)
+    except job_import.UnreadableUpload as e:
+        # The rows before the unreadable one are imported all the same.
+        return Response(
+            {"Error": str(e), "created": e.created, "errors": e.errors},
+            status=status.HTTP_400_BAD_REQUEST)
+    return Response(
+        {"created": created, "errors": errors},
+        status=status.HTTP_201_CREATED if created or not errors
+        else status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def exportApplicants(request):
+    if not (request.user.is_authenticated and request.user.is_ag):
+        return JsonResponse(
+            {"Error": "You are not logged in or not authorized"},
+            status=status.HTTP_401_UNAUTHORIZED)
+
+    # Not ?format=, which DRF reserves for picking a renderer.
+    export_type = request.GET.get('type', 'csv')
+    if export_type not in exports.FORMATS:
+        return Response({"Error": "type must be csv or ndjson"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    job_posts = JobPost.objects.filter(job_post=request.user)
+    job_post_id = request.GET.get('job_post', None)
+    if job_post_id:
+        job_post = get_object_or_404(job_posts, id=job_post_id)
+        job_posts = job_posts.filter(id=job_post.id)
+
+    lines, content_type = exports.FORMATS[export_type]
+    response = StreamingHttpResponse(
+        lines(exports.applicant_chunks(job_posts)),
+        content_type=content_type)
+    response['Content-Disposition'] = (
+        'attachment; filename="applicants.%s"' % export_type)
+    return response
+
+
 @api_view(['GET'])
 def retrieveAvailableJobPosts(request):
     if request.user.is_authenticated and not request.user.is_ag:
         location = request.GET.get('location', None)
+        query = request.GET.get('q', None)
 
         applied_job_posts = Application.objects.filter(
             profile_id=request.user).values_list(
@@ -88,9 +211,31 @@ def retrieveAvailableJobPosts(request):
         if location:
             job_posts = job_posts.filter(location__icontains=location)
 
-        serializer = AvailableJobPostsSerializer(job_posts, many=True)
+        if query:
+            job_posts = search_job_posts(job_posts, query)
+            paginator = KeysetPagination(ordering=('-search_rank', 'id'))
+        else:
+            paginator = KeysetPagination(ordering=('expiration_date', 'id'))
+
+        if not paginator.is_disabled(request):
+            if not query and feed.enabled():
+                # Pages of the feed are cut from the cached list.
+                paginator.paginate_rows(
+                    feed.active_job_posts(location), job_posts, request,
+                    exclude_ids=set(applied_job_posts))
+                return paginator.get_paginated_response(paginator.page)
+            return paginator.get_paginated_response(fast_serializers.serialize(
+                request, AvailableJobPostsSerializer, job_posts, paginator))
+
+        if query:
+            data = fast_serializers.serialize(
+                request, AvailableJobPostsSerializer, job_posts)
+        else:
+            applied = set(applied_job_posts)
+            data = [job_post for job_post in feed.active_job_posts(location)
+                    if job_post['id'] not in applied]
         return JsonResponse(
-            serializer.data,
+            data,
             safe=False,
             json_dumps_params={
                 'ensure_ascii': False})
@@ -100,13 +245,97 @@ def retrieveAvailableJobPosts(request):
 
 
 @api_view(['GET'])
+def retrieveJobPostFacets(request):
+    if request.user.is_authenticated and not request.user.is_ag:
+        return Response(facets.feed_facets(
+            request.GET.get('location', None), request.user),
+            status=status.HTTP_200_OK)
+    else:
+        return Response(
+            {"Error": "You are not logged in or not authorized"},
+            status=status.HTTP_401_UNAUTHORIZED)
+
+
+@api_view(['GET'])
+def autocompleteJobPosts(request):
+    if request.user.is_authenticated and not request.user.is_ag:
+        field = request.GET.get('field', None)
+        if field not in autocomplete.FIELDS:
+            return Response(
+                {"Error": "field must be one of %s"
+                 % ', '.join(autocomplete.FIELDS)},
+                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            return Response({"Error": "limit must be a number"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(autocomplete.suggest(
+            field, request.GET.get('prefix', ''), limit),
+            status=status.HTTP_200_OK)
+    else:
+        return Response(
+            {"Error": "You are not logged in or not authorized"},
+            status=status.HTTP_401_UNAUTHORIZED)
+
+
+@api_view(['GET'])
+def retrieveRecommendedJobPosts(request):
+    if request.user.is_authenticated and not request.user.is_ag:
+        try:
+            limit = min(int(request.GET.get('limit', 20)), 100)
+        except ValueError:
+            return Response({"Error": "limit must be a number"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        applied_job_posts = Application.objects.filter(
+            profile_id=request.user).values('job_post_id')
+        # A user with several CVs gets each job post once, with the score
+        # of the CV that matches it best.
+        matches = MatchScore.objects.filter(
+            job_seeker_cv__profile=request.user,
+            job_post__is_published=True,
+            job_post__expiration_date__gte=now(),
+        ).exclude(
+            job_post__in=applied_job_posts,
+        ).values('job_post').annotate(best_score=Max('score')).order_by(
+            '-best_score', 'job_post')[:max(limit, 1)]
+
+        job_posts = JobPost.objects.in_bulk(
+            [match['job_post'] for match in matches])
+        recommended = []
+        for match in matches:
+            job_post = job_posts[match['job_post']]
+            job_post.score = round(match['best_score'], 4)
+            recommended.append(job_post)
+
+        serializer = RecommendedJobPostSerializer(recommended, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    else:
+        return Response(
+            {"Error": "You are not logged in or not authorized"},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+
+@api_view(['GET'])
+@conditional_get(job_seeker_applications_version)
 def retrieveApplications(request):
     if request.user.is_authenticated and not request.user.is_ag:
         # Fetch the applications related to the authenticated user
-        applications = Application.objects.filter(profile_id=request.user)
+        applications = Application.objects.select_related(
+            'job_post').filter(profile_id=request.user)
+
+        paginator = KeysetPagination(ordering=('-application_date', '-id'))
+        if not paginator.is_disabled(request):
+            return paginator.get_paginated_response(fast_serializers.serialize(
+                request, ApplicationsSerializer, applications, paginator))
+
         # Serialize the application data to include job post details only
-        serializer = ApplicationsSerializer(applications, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = fast_serializers.serialize(
+            request, ApplicationsSerializer, applications)
+        return Response(data, status=status.HTTP_200_OK)
     else:
         return Response(
             {"Error": "You are not logged in or not authorized"},
@@ -144,7 +373,8 @@ def deleteJobPost(request, id):
 @api_view(["GET"])
 def getJobPostById(request, id):
     if request.user.is_authenticated and request.user.is_ag:
-        job_post = get_object_or_404(JobPost, id=id, job_post=request.user)
+        job_post = get_object_or_404(
+            JobPost.objects.with_applicants(), id=id, job_post=request.user)
         serializer = JobPostSerializer(job_post)
         return Response(serializer.data, status=status.HTTP_200_OK)
     else:
@@ -158,7 +388,8 @@ def getApplication(request, job_id, application_id):
         job_post = get_object_or_404(JobPost, id=job_id, job_post=request.user)
         print(job_id)
         application = get_object_or_404(
-            Application, profile_id=application_id, job_post=job_post)
+            Application.objects.with_cv(),
+            profile_id=application_id, job_post=job_post)
         serializer = ApplicationSerializer(application)
         return Response(serializer.data, status=status.HTTP_200_OK)
     else:
@@ -166,6 +397,29 @@ def getApplication(request, job_id, application_id):
                             status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(["GET"])
+def rankApplicants(request, id):
+    if request.user.is_authenticated and request.user.is_ag:
+        job_post = get_object_or_404(JobPost, id=id, job_post=request.user)
+        # Every applicant is scored from the text of their CV, only the
+        # applications on the requested page are loaded in full.
+        paginator = RankedPagination()
+        ranked = paginator.paginate_queryset(
+            matching.rank_applications(job_post), request)
+        applications = Application.objects.with_cv().in_bulk(
+            [application_id for application_id, _ in ranked])
+        page = []
+        for application_id, score in ranked:
+            application = applications[application_id]
+            application.score = round(score, 4)
+            page.append(application)
+        serializer = RankedApplicationSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    else:
+        return JsonResponse({"Error": "You are not logged in"},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+
 @api_view(["PATCH"])
 def updateJobSeekerInfo(request):
     if request.user.is_authenticated and not request.user.is_ag:
@@ -195,6 +449,7 @@ def updateJobSeekerInfo(request):
 
 
 @api_view(["GET"])
+@conditional_get(job_seeker_cv_version)
 def getJobSeekerCv(request):
     if request.user.is_authenticated and not request.user.is_ag:
         try:
@@ -212,6 +467,27 @@ def getJobSeekerCv(request):
                             status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(["PUT", "PATCH"])
+def saveJobSeekerCv(request):
+    if request.user.is_authenticated and not request.user.is_ag:
+        cvs = JobSeekerCv.objects.prefetch_related(
+            'work_experiences', 'educations')
+        cv = get_object_or_404(cvs, profile=request.user)
+        serializer = JobSeekerCvDocumentSerializer(
+            cv, data=request.data, partial=request.method == 'PATCH')
+        if serializer.is_valid():
+            serializer.save()
+            return Response(JobSeekerCVSerializer(cvs.get(pk=cv.pk)).data,
+                            status=status.HTTP_200_OK)
+        else:
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({"Error": "You are not logged in"},
+                        status=status.HTTP_401_UNAUTHORIZED)
+
+
 @api_view(["POST"])
 def createWorkExperince(request):
     if request.user.is_authenticated and not request.user.is_ag:
@@ -320,33 +596,19 @@ def deleteEducation(request, id):
 
 
 @api_view(["POST"])
+@idempotent
 def applyToJob(request, id):
     if request.user.is_authenticated and not request.user.is_ag:
-        job_post = get_object_or_404(JobPost, id=id)
+        try:
+            created = applying.apply(request.user, id)
+        except JobPost.DoesNotExist:
+            raise Http404
 
-        # Check if the user has already applied to this job
-        if Application.objects.filter(
-                profile_id=request.user,
-                job_post=job_post).exists():
+        if not created:
             return Response(
                 {"Error": "You have already applied for this job"},
                 status=status.HTTP_204_NO_CONTENT)
 
-        # Get or create the JobSeekerCv instance for the user
-        job_seeker_cv, created = JobSeekerCv.objects.get_or_create(
-            profile=request.user,
-            defaults={
-                'email': request.user.email,
-                'mobile_number': request.user.mobile_number
-            }
-        )
-
-        application = Application.objects.create(
-            profile_id=request.user,
-            job_post=job_post,
-            job_seeker_cv=job_seeker_cv
-        )
-
         return Response({"Message": "Application successful"},
                         status=status.HTTP_200_OK)
     else:
@@ -356,6 +618,27 @@ def applyToJob(request, id):
             status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(["POST"])
+@idempotent
+def applyToJobs(request):
+    if request.user.is_authenticated and not request.user.is_ag:
+        serializer = BatchApplicationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+        results = applying.apply_many(
+            request.user, serializer.validated_data['job_post_ids'])
+        return Response(
+            {"results": [{"job_post": pk, "status": result}
+                         for pk, result in results.items()]},
+            status=status.HTTP_200_OK)
+    else:
+        return Response(
+            {
+                "Error": "You are not authorized to apply for this job"},
+            status=status.HTTP_401_UNAUTHORIZED)
+
+
 @api_view(["DELETE"])
 def deleteApplicationEmployee(request, id):
     if request.user.is_authenticated:
@@ -420,12 +703,12 @@ class PasswordResetAPIView(APIView):
                 + "/"
                 + token
             )
-            send_mail(
+            # Delivered by the send_outbox command, not in the request.
+            outbox.queue_email(
                 'Password Reset',
                 f'Click the link to reset your password: {reset_url}',
+                email,
                 os.environ.get("DEFAULT_FROM_EMAIL"),
-                [email],
-                fail_silently=False,
             )
 
             return Response({'success': 'Password reset link sent to email'},
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault(
@@ -16,3 +17,8 @@ os.environ.setdefault(
     "job_match_backend_project.settings")
 
 application = get_asgi_application()
+
+if settings.ASYNC_READ_VIEWS:
+    from job_match_backend_app.asgi_static import StaticFilesApplication
+
+    application = StaticFilesApplication(application)
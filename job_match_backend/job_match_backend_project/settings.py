@@ -13,7 +13,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 import env
 
@@ -55,16 +57,25 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'job_match_backend_app.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Default page size of the paginated list endpoints, see pagination.py
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 20))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=60),
 }
 
+# Seconds an authenticated user is reused without a query, 0 disables it.
+# A change to a user reaches other worker processes after at most this long.
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
 MIDDLEWARE = [
+    "job_match_backend_app.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -96,6 +107,71 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "job_match_backend_project.wsgi.application"
 
+# Cache
+# Shared by all gunicorn workers, so that invalidating the job post feed
+# or the matching matrix in one worker is seen by the others. Run
+# `python manage.py createcachetable` once to create the table.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'job_match_cache',
+    }
+}
+
+# Seconds a worker keeps the serialized job seeker feed, 0 disables it
+FEED_CACHE_TIMEOUT = int(os.environ.get('FEED_CACHE_TIMEOUT', 300))
+
+# Seconds a worker keeps its typeahead index before rebuilding it even if
+# no change was announced
+AUTOCOMPLETE_MAX_AGE = int(os.environ.get('AUTOCOMPLETE_MAX_AGE', 300))
+
+# Seconds a worker answers typeahead lookups without checking the shared
+# cache for changes made by other workers
+AUTOCOMPLETE_CHECK_INTERVAL = int(
+    os.environ.get('AUTOCOMPLETE_CHECK_INTERVAL', 5))
+
+# Seconds the response to a request with an Idempotency-Key header is kept
+# for retries with the same key
+IDEMPOTENCY_KEY_TIMEOUT = int(
+    os.environ.get('IDEMPOTENCY_KEY_TIMEOUT', 24 * 60 * 60))
+
+# URL names of the list endpoints served by the values() based serializers
+# in fast_serializers.py. Set to an empty string to use DRF everywhere.
+FAST_SERIALIZERS = [
+    name for name in os.environ.get(
+        'FAST_SERIALIZERS', 'availableJobPosts,applications').split(',')
+    if name]
+
+# Serve the read endpoints from async_views.py. Only useful when the app runs
+# under an ASGI server (see DEPLOYMENT.md).
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '') == 'True'
+
+# WhiteNoiseMiddleware is sync only, which would make Django run every
+# request in a thread. Under ASGI the static files are served by
+# job_match_backend_app.asgi_static (see asgi.py) instead.
+if ASYNC_READ_VIEWS:
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
+# Seconds between rebuilds of the in-memory job post matching matrix
+MATCHING_REBUILD_INTERVAL = int(
+    os.environ.get('MATCHING_REBUILD_INTERVAL', 60))
+
+# Days after expiring that job posts are moved to the archive tables by
+# `manage.py archive_job_posts`, and days the archive keeps them (0 keeps
+# them forever)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', 730))
+
+# Bearer token Prometheus sends to scrape /metrics; the endpoint is off
+# without one. Workers write their request metrics to METRICS_DIR every
+# METRICS_FLUSH_INTERVAL seconds, and those of workers that stopped are
+# dropped after METRICS_RETENTION_DAYS.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'job_match_metrics'))
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 15))
+METRICS_RETENTION_DAYS = int(os.environ.get('METRICS_RETENTION_DAYS', 7))
+
 # Email Config
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -113,6 +189,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Transactions that read before they write, like the batch apply,
+        # take the write lock up front instead of failing with "database
+        # is locked" when another request writes at the same time.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
     }
 }
 
@@ -172,3 +252,5 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
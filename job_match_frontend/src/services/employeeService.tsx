@@ -8,8 +8,8 @@ export const retrieveAvailableJobPosts = async (
   try {
     const response = await api.get(
       location
-        ? `/jobseeker/availableJobPosts?location=${location}`
-        : `/jobseeker/availableJobPosts`,
+        ? `/jobseeker/availableJobPosts?location=${location}&paginate=false`
+        : `/jobseeker/availableJobPosts?paginate=false`,
       {
         headers: {
           Authorization: `Bearer ${token}`,
@@ -38,7 +38,7 @@ export const retrieveProfile = async (token: any) => {
 }
 export const retrieveApplications = async (token: any) => {
   try {
-    const response = await api.get('jobseeker/applications', {
+    const response = await api.get('jobseeker/applications?paginate=false', {
       headers: {
         Authorization: `Bearer ${token}`,
       },
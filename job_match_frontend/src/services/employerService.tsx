@@ -3,7 +3,7 @@ import api from './api'
 
 export const retrieveEmployerJobPosts = async (token: any) => {
   try {
-    const response = await api.get('employer/jobposts', {
+    const response = await api.get('employer/jobposts?paginate=false', {
       headers: {
         Authorization: `Bearer ${token}`,
       },